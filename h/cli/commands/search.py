@@ -1,6 +1,9 @@
+import os
+
 import click
 
 from h.search import config
+from h.search.reindex import ParallelReindexer
 
 
 @click.group()
@@ -24,3 +27,50 @@ def update_settings(ctx):
         config.update_index_settings(request.es)
     except RuntimeError as exc:
         raise click.ClickException(str(exc))  # noqa: B904
+
+
+@search.command("reindex")
+@click.option(
+    "--workers",
+    type=int,
+    default=os.cpu_count(),
+    show_default=True,
+    help="The number of worker processes to reindex with.",
+)
+@click.option(
+    "--partitions",
+    type=int,
+    help="The number of partitions to split the annotations into "
+    "(default: 4 per worker). Ignored when resuming.",
+)
+@click.pass_context
+def reindex(ctx, workers, partitions):
+    """
+    Reindex all annotations into a new index, and switch over to it.
+
+    The annotations are split into partitions by their updated time, which are
+    reindexed in parallel by a pool of worker processes. Progress is saved as
+    each partition completes, so if a reindex is interrupted or some
+    partitions fail, running this command again will resume it.
+    """
+    request = ctx.obj["bootstrap"]()
+
+    reindexer = ParallelReindexer(
+        request,
+        ctx.obj["bootstrap"],
+        workers=workers,
+        partitions=partitions or workers * 4,
+    )
+
+    try:
+        new_index = reindexer.reindex()
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc))  # noqa: B904
+    finally:
+        for pid, stats in reindexer.worker_stats.items():
+            click.echo(
+                f"Worker {pid}: {stats.indexed} annotations in "
+                f"{stats.partitions} partitions ({stats.rate:.0f}/s)"
+            )
+
+    click.echo(f"Reindexed into {new_index}")
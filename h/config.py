@@ -45,6 +45,9 @@ def configure(environ=None, settings=None):  # noqa: PLR0915
     settings_manager.set(
         "es.client.timeout", "ELASTICSEARCH_CLIENT_TIMEOUT", type_=float
     )
+    settings_manager.set(
+        "es.batch_indexing", "ELASTICSEARCH_BATCH_INDEXING", type_=asbool
+    )
     settings_manager.set("es.url", "ELASTICSEARCH_URL", required=True)
     settings_manager.set("es.index", "ELASTICSEARCH_INDEX")
     settings_manager.set(
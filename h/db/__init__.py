@@ -65,9 +65,9 @@ def post_create(engine):  # pragma: no cover
     _maybe_create_world_group(engine, authority, default_org)
 
 
-def create_engine(database_url):  # pragma: no cover
+def create_engine(database_url, **kwargs):  # pragma: no cover
     """Construct a sqlalchemy engine from the passed ``settings``."""
-    return sqlalchemy.create_engine(database_url)
+    return sqlalchemy.create_engine(database_url, **kwargs)
 
 
 def _session(request):  # pragma: no cover
@@ -0,0 +1,23 @@
+"""Add an index on job name and annotation ID."""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "3a9b4c7d2e1f"
+down_revision = "ec5c9a864c76"
+
+
+def upgrade():
+    # Creating a concurrent index does not work inside a transaction
+    op.execute("COMMIT")
+
+    op.create_index(
+        "ix__job_name_annotation_id",
+        "job",
+        ["name", sa.text("(kwargs ->> 'annotation_id')")],
+        postgresql_concurrently=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix__job_name_annotation_id", table_name="job")
@@ -56,7 +56,13 @@ class Job(Base):
 
     __tablename__ = "job"
 
-    __table_args__ = (Index("ix__job_priority_enqueued_at", "priority", "enqueued_at"),)
+    __table_args__ = (
+        Index("ix__job_priority_enqueued_at", "priority", "enqueued_at"),
+        # For finding pending jobs for the same annotation when queueing jobs
+        Index(
+            "ix__job_name_annotation_id", "name", text("(kwargs ->> 'annotation_id')")
+        ),
+    )
 
     id = Column(Integer, Sequence("job_id_seq", cycle=True), primary_key=True)
     name = Column(UnicodeText, nullable=False)
@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 from h.presenters.document_searchindex import DocumentSearchIndexPresenter
 from h.util.datetime import utc_iso8601
 from h.util.user import split_user
@@ -6,9 +9,123 @@ from h.util.user import split_user
 class AnnotationSearchIndexPresenter:
     """Present an annotation in the JSON format used in the search index."""
 
-    def __init__(self, annotation, request):
+    def __init__(self, annotation, request, hidden_ids=None, nipsa_userids=None):
+        """
+        Create a presenter for `annotation`.
+
+        :param hidden_ids: the ids of hidden annotations, prefetched for this
+            annotation and its thread. Looked up when not provided.
+        :param nipsa_userids: the NIPSA'd userids, prefetched for this
+            annotation's author. Looked up when not provided.
+        """
         self.annotation = annotation
         self.request = request
+        self._hidden_ids = hidden_ids
+        self._nipsa_userids = nipsa_userids
+
+    @classmethod
+    def present_all(cls, annotations, request):
+        """
+        Present many annotations in the search index format.
+
+        The moderation state of every annotation and its thread, and the NIPSA
+        state of every author, are each fetched with a single query for the
+        whole batch rather than per annotation.
+
+        :returns: a list of dicts in the same order as `annotations`
+        """
+        annotations = list(annotations)
+        hidden_ids = cls._fetch_hidden_ids(annotations, request)
+
+        nipsa_service = request.find_service(name="nipsa")
+        nipsa_userids = nipsa_service.flagged_userids(
+            {annotation.userid for annotation in annotations}
+        )
+
+        return [
+            cls(
+                annotation,
+                request,
+                hidden_ids=hidden_ids,
+                nipsa_userids=nipsa_userids,
+            ).asdict()
+            for annotation in annotations
+        ]
+
+    @classmethod
+    def present_thread_fields_all(cls, annotations, request):
+        """
+        Present only the fields derived from each annotation's thread.
+
+        These are the only fields of a thread root's document which change
+        when a reply is added, so they can be used to partially update it
+        rather than presenting and indexing the whole thing again.
+
+        :returns: a list of dicts in the same order as `annotations`
+        """
+        annotations = list(annotations)
+        hidden_ids = cls._fetch_hidden_ids(annotations, request)
+
+        return [
+            cls(annotation, request, hidden_ids=hidden_ids).thread_fields()
+            for annotation in annotations
+        ]
+
+    @staticmethod
+    def _fetch_hidden_ids(annotations, request):
+        ann_mod_svc = request.find_service(name="annotation_moderation")
+        return ann_mod_svc.all_hidden(
+            list(
+                {
+                    id_: None
+                    for annotation in annotations
+                    for id_ in [annotation.id, *annotation.thread_ids]
+                }
+            )
+        )
+
+    @staticmethod
+    def digest(annotation, nipsa):
+        """
+        Return a digest of the state of `annotation` that the index reflects.
+
+        This covers the annotation's own row and its author's NIPSA state, so
+        it can be computed cheaply from the DB and compared with the digest
+        stored in the search index to tell whether a document is out of date,
+        without presenting it. It doesn't cover document metadata (changes to
+        which force re-indexing) or the thread-derived fields (see
+        `thread_fields()`), which are updated separately and need to be
+        compared separately.
+
+        :param annotation: an `Annotation` (or anything with the same
+            attributes)
+        :param nipsa: whether the annotation's author is NIPSA'd
+        """
+        state = [
+            annotation.updated,
+            annotation.userid,
+            annotation.groupid,
+            annotation.shared,
+            annotation.target_uri,
+            annotation.target_selectors,
+            annotation.text,
+            annotation.tags,
+            annotation.references,
+            annotation.document_id,
+            annotation.moderation_status,
+            bool(nipsa),
+        ]
+
+        return hashlib.blake2b(
+            json.dumps(state, sort_keys=True, default=str).encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+
+    def thread_fields(self):
+        """Return the fields of `asdict()` which are derived from the thread."""
+        result = {"thread_ids": self.annotation.thread_ids}
+        self._add_hidden(result)
+        return result
 
     def asdict(self):
         docpresenter = DocumentSearchIndexPresenter(self.annotation.document)
@@ -41,6 +158,7 @@ class AnnotationSearchIndexPresenter:
 
         self._add_hidden(result)
         self._add_nipsa(result, self.annotation.userid)
+        result["digest"] = self.digest(self.annotation, result.get("nipsa"))
 
         return result
 
@@ -49,14 +167,21 @@ class AnnotationSearchIndexPresenter:
         # moderated and hidden.
         parents_and_replies = [self.annotation.id] + self.annotation.thread_ids  # noqa: RUF005
 
-        ann_mod_svc = self.request.find_service(name="annotation_moderation")
-        is_hidden = len(ann_mod_svc.all_hidden(parents_and_replies)) == len(
-            parents_and_replies
-        )
+        if self._hidden_ids is not None:
+            is_hidden = all(id_ in self._hidden_ids for id_ in parents_and_replies)
+        else:
+            ann_mod_svc = self.request.find_service(name="annotation_moderation")
+            is_hidden = len(ann_mod_svc.all_hidden(parents_and_replies)) == len(
+                parents_and_replies
+            )
 
         result["hidden"] = is_hidden
 
     def _add_nipsa(self, result, user_id):
-        nipsa_service = self.request.find_service(name="nipsa")
-        if nipsa_service.is_flagged(user_id):
+        if self._nipsa_userids is not None:
+            is_flagged = user_id in self._nipsa_userids
+        else:
+            is_flagged = self.request.find_service(name="nipsa").is_flagged(user_id)
+
+        if is_flagged:
             result["nipsa"] = True
@@ -30,6 +30,19 @@ class FilterGroupAnnotationsSchema(colander.Schema):
 
     moderation_status = ModerationStatusNode(missing=None, default=None)
 
+    page_after = colander.SchemaNode(
+        colander.String(),
+        name="page[after]",
+        missing=None,
+        description=(
+            "The id of the last annotation of the previous page. Pages after "
+            "the first can use this instead of `page[number]`, which is much "
+            "faster for groups with lots of annotations. Responses to requests "
+            "with `page[after]` don't include `meta.page.total`: use the total "
+            "from the first page."
+        ),
+    )
+
 
 class GroupAPISchema(JSONSchema):
     """Base class for validating group resource API data."""
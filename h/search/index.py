@@ -13,6 +13,7 @@ from h import models, presenters
 log = logging.getLogger(__name__)
 
 PG_WINDOW_SIZE = 2500
+ES_CHUNK_SIZE = 2500
 
 
 class BatchIndexer:
@@ -24,6 +25,9 @@ class BatchIndexer:
         self.request = request
         self.op_type = op_type
 
+        self.indexed = 0
+        """The number of annotations sent to Elasticsearch by this indexer."""
+
         # By default, index into the open index
         if target_index is None:
             self._target_index = self.es_client.index
@@ -42,18 +46,67 @@ class BatchIndexer:
         """
         annotations = _filtered_annotations(session=self.session, ids=annotation_ids)
 
+        return self._index(annotations, windowsize)
+
+    def index_updated_between(self, start, end, windowsize: int = PG_WINDOW_SIZE):
+        """
+        Reindex the annotations with `start <= updated < end`.
+
+        Either bound can be `None` for an open-ended range. Rather than holding
+        every annotation in the range in memory at once, the annotations are
+        loaded `windowsize` at a time.
+
+        :param start: the earliest `updated` time to reindex (inclusive)
+        :param end: the latest `updated` time to reindex (exclusive)
+        :param windowsize: the number of annotations to load at once, and to
+            index in between progress log statements
+
+        :returns: a set of errored ids
+        :rtype: set
+        """
+        query = (
+            sa.select(models.Annotation.id)
+            .where(_annotation_filter())
+            .order_by(models.Annotation.updated)
+            .execution_options(yield_per=windowsize)
+        )
+        if start is not None:
+            query = query.where(models.Annotation.updated >= start)
+        if end is not None:
+            query = query.where(models.Annotation.updated < end)
+
+        annotations = (
+            annotation
+            for window in _chunked(self.session.execute(query).scalars(), windowsize)
+            for annotation in _filtered_annotations(session=self.session, ids=window)
+        )
+
+        return self._index(annotations, windowsize)
+
+    def _index(self, annotations, windowsize):
         # Report indexing status as we go
         annotations = _log_status(annotations, log_every=windowsize)
 
+        # Present the annotations a bulk chunk at a time, so the lookups the
+        # presenter needs are made once per chunk rather than once per row
+        actions = (
+            action
+            for chunk in _chunked(annotations, ES_CHUNK_SIZE)
+            for action in self._prepare_all(chunk)
+        )
+
         indexing = es_helpers.streaming_bulk(
             self.es_client.conn,
-            annotations,
-            chunk_size=2500,
+            actions,
+            chunk_size=ES_CHUNK_SIZE,
             raise_on_error=False,
-            expand_action_callback=self._prepare,
+            # The actions are already expanded by `_prepare_all()`
+            expand_action_callback=lambda action: action,
         )
         errored = set()
         for ok, item in indexing:
+            self.indexed += 1
+
             if not ok:
                 status = item[self.op_type]
 
@@ -108,19 +161,21 @@ class BatchIndexer:
             # Elasticsearch).
             pass
 
-    def _prepare(self, annotation):
-        operation = {
-            "_index": self._target_index,
-            "_id": annotation.id,
-        }
-        if self._include_mapping_type():  # pragma: no cover
-            operation["_type"] = self.es_client.mapping_type
+    def _prepare_all(self, annotations):
+        include_type = self._include_mapping_type()
+        presented = presenters.AnnotationSearchIndexPresenter.present_all(
+            annotations, self.request
+        )
 
-        data = presenters.AnnotationSearchIndexPresenter(
-            annotation, self.request
-        ).asdict()
+        for annotation, data in zip(annotations, presented, strict=True):
+            operation = {
+                "_index": self._target_index,
+                "_id": annotation.id,
+            }
+            if include_type:  # pragma: no cover
+                operation["_type"] = self.es_client.mapping_type
 
-        return {self.op_type: operation}, data
+            yield {self.op_type: operation}, data
 
     def _include_mapping_type(self):
         """Return True if the `_type` field should be included in request payloads."""
@@ -153,6 +208,18 @@ def _eager_loaded_annotations(session):
     )
 
 
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
 def _log_status(stream, log_every=1000):
     i = 0
     then = time.time()
@@ -0,0 +1,330 @@
+"""Reindex every annotation into a new search index in parallel."""
+
+import json
+import logging
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from time import perf_counter
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from h import models
+from h.search import config
+from h.search.index import BatchIndexer
+from h.services.search_index import SearchIndexService
+
+log = logging.getLogger(__name__)
+
+
+class Partition(namedtuple("Partition", ["start", "end"])):  # noqa: PYI024, SLOT002
+    """
+    A range of annotations to reindex: those with `start <= updated < end`.
+
+    Either bound can be `None` for an open-ended range.
+    """
+
+    def asjson(self):
+        return [None if bound is None else bound.isoformat() for bound in self]
+
+    @classmethod
+    def fromjson(cls, value):
+        return cls(
+            *(
+                None if bound is None else datetime.fromisoformat(bound)
+                for bound in value
+            )
+        )
+
+
+@dataclass
+class PartitionResult:
+    """The outcome of reindexing one partition in a worker process."""
+
+    number: int
+    pid: int
+    indexed: int
+    errored: set[str]
+    seconds: float
+
+
+@dataclass
+class WorkerStats:
+    """Throughput statistics for one worker process."""
+
+    partitions: int = 0
+    indexed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self):
+        """Get the mean number of annotations indexed per second."""
+        return self.indexed / self.seconds if self.seconds else 0.0
+
+    def record(self, result: PartitionResult):
+        self.partitions += 1
+        self.indexed += result.indexed
+        self.seconds += result.seconds
+
+
+@dataclass
+class Checkpoint:
+    """The progress of a reindex, which is saved so it can be resumed."""
+
+    index: str
+    """The name of the new index being reindexed into."""
+
+    partitions: list[Partition]
+    completed: set[int] = field(default_factory=set)
+    """The numbers of the partitions which have been successfully reindexed."""
+
+    @property
+    def pending(self):
+        return [
+            number
+            for number in range(len(self.partitions))
+            if number not in self.completed
+        ]
+
+    def dumps(self):
+        return json.dumps(
+            {
+                "index": self.index,
+                "partitions": [partition.asjson() for partition in self.partitions],
+                "completed": sorted(self.completed),
+            }
+        )
+
+    @classmethod
+    def loads(cls, value):
+        data = json.loads(value)
+        return cls(
+            index=data["index"],
+            partitions=[Partition.fromjson(value) for value in data["partitions"]],
+            completed=set(data["completed"]),
+        )
+
+
+class ParallelReindexer:
+    """
+    Reindex every annotation into a new index using a pool of processes.
+
+    The annotation table is split into partitions by `updated` time, each of
+    which is reindexed by one of a pool of worker processes, with its own DB
+    session and Elasticsearch connection. Once every partition has been
+    reindexed the index alias is switched over to the new index.
+
+    Progress is checkpointed in the `setting` table as each partition is
+    completed. If a reindex is interrupted, running it again will carry on
+    from the checkpoint rather than starting again.
+    """
+
+    CHECKPOINT_SETTING_KEY = "reindex.checkpoint"
+    """The DB setting that stores the progress of an ongoing reindex."""
+
+    def __init__(self, request, bootstrap, workers, partitions):
+        """
+        Create a new reindexer.
+
+        :param request: the request to coordinate the reindex from
+        :param bootstrap: a picklable callable that returns a bootstrapped
+            request, which is called in each worker process
+        :param workers: the number of worker processes to run
+        :param partitions: the number of partitions to split a new reindex
+            into. More partitions than workers spreads the work more evenly
+        """
+        self._request = request
+        self._bootstrap = bootstrap
+        self._workers = workers
+        self._partitions = partitions
+        self._settings = request.find_service(name="settings")
+
+        self.worker_stats: dict[int, WorkerStats] = {}
+        """Throughput statistics for each worker process, by pid."""
+
+    def reindex(self):
+        """
+        Reindex every annotation, resuming a previous reindex if there is one.
+
+        :raises RuntimeError: if any partitions could not be reindexed. The
+            checkpoint is kept, so the reindex can be resumed to retry them
+        :returns: the name of the new index
+        """
+        checkpoint = self._start_or_resume()
+        failed = []
+
+        with ProcessPoolExecutor(
+            max_workers=self._workers,
+            # Don't fork the parent's DB connections and ES sockets
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._bootstrap,),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _reindex_partition,
+                    checkpoint.index,
+                    number,
+                    checkpoint.partitions[number],
+                ): number
+                for number in checkpoint.pending
+            }
+
+            for future in as_completed(futures):
+                number = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    log.exception("Reindexing partition %s failed", number)
+                    failed.append(number)
+                    continue
+
+                self._record(checkpoint, result)
+                if result.errored:
+                    failed.append(number)
+                    continue
+
+                checkpoint.completed.add(number)
+                self._save(checkpoint)
+
+        if failed:
+            raise RuntimeError(  # noqa: TRY003
+                f"Failed to reindex {len(failed)} partitions. Run the reindex "  # noqa: EM102
+                "again to retry them."
+            )
+
+        self._finish(checkpoint)
+        return checkpoint.index
+
+    def _start_or_resume(self):
+        self._request.tm.begin()
+
+        if value := self._settings.get(self.CHECKPOINT_SETTING_KEY):
+            checkpoint = Checkpoint.loads(value)
+            log.info(
+                "Resuming reindex into %s with %s of %s partitions left",
+                checkpoint.index,
+                len(checkpoint.pending),
+                len(checkpoint.partitions),
+            )
+        else:
+            checkpoint = Checkpoint(
+                index=config.configure_index(self._request.es),
+                partitions=partition_annotations(self._request.db, self._partitions),
+            )
+            log.info(
+                "Reindexing into %s in %s partitions",
+                checkpoint.index,
+                len(checkpoint.partitions),
+            )
+
+        # Annotations created or edited while we are reindexing are written to
+        # the new index as well as the current one, so they aren't missed
+        self._settings.put(SearchIndexService.REINDEX_SETTING_KEY, checkpoint.index)
+        self._settings.put(self.CHECKPOINT_SETTING_KEY, checkpoint.dumps())
+        self._request.tm.commit()
+
+        return checkpoint
+
+    def _record(self, checkpoint, result):
+        stats = self.worker_stats.setdefault(result.pid, WorkerStats())
+        stats.record(result)
+
+        log.info(
+            "Reindexed partition %s of %s in worker %s: %s annotations in "
+            "%.1fs (%.0f/s), %s errors",
+            result.number,
+            len(checkpoint.partitions),
+            result.pid,
+            result.indexed,
+            result.seconds,
+            result.indexed / result.seconds if result.seconds else 0.0,
+            len(result.errored),
+        )
+
+    def _save(self, checkpoint):
+        self._request.tm.begin()
+        self._settings.put(self.CHECKPOINT_SETTING_KEY, checkpoint.dumps())
+        self._request.tm.commit()
+
+    def _finish(self, checkpoint):
+        config.update_aliased_index(self._request.es, checkpoint.index)
+
+        self._request.tm.begin()
+        self._settings.delete(SearchIndexService.REINDEX_SETTING_KEY)
+        self._settings.delete(self.CHECKPOINT_SETTING_KEY)
+        self._request.tm.commit()
+
+
+def partition_annotations(session, count):
+    """
+    Split the annotations into `count` partitions of roughly equal size.
+
+    The boundaries are percentiles of `updated`, so the partitions contain
+    similar numbers of annotations even though annotations aren't spread
+    evenly over time. The first and last partitions are open-ended, so
+    annotations updated after partitioning are still included.
+
+    :rtype: list of Partition
+    """
+    fractions = [number / count for number in range(1, count)]
+
+    boundaries = []
+    if fractions:
+        boundaries = (
+            session.execute(
+                sa.select(
+                    sa.func.percentile_disc(
+                        sa.literal(fractions, ARRAY(sa.Float))
+                    ).within_group(models.Annotation.updated)
+                ).where(sa.not_(models.Annotation.deleted))
+            ).scalar()
+            # There are no boundaries if there are no annotations
+            or []
+        )
+        # Small tables can have several percentiles in the same place
+        boundaries = sorted(set(boundaries))
+
+    return [
+        Partition(start, end)
+        for start, end in zip([None, *boundaries], [*boundaries, None], strict=True)
+    ]
+
+
+# The request used by `_reindex_partition()` in each worker process
+_worker_request = None
+
+
+def _init_worker(bootstrap):  # pragma: no cover
+    global _worker_request  # noqa: PLW0603
+    _worker_request = bootstrap()
+
+
+def _reindex_partition(target_index, number, partition):
+    request = _worker_request
+    # Use `create` so we don't overwrite newer versions of annotations which
+    # were written to the new index while we were reindexing, and so that
+    # resuming a partially reindexed partition is harmless
+    indexer = BatchIndexer(
+        request.db, request.es, request, target_index=target_index, op_type="create"
+    )
+    started = perf_counter()
+
+    request.tm.begin()
+    errored = indexer.index_updated_between(partition.start, partition.end)
+    if errored:
+        # Give any annotations that failed (e.g. due to a timeout) another go
+        errored = indexer.index(list(errored))
+    request.tm.commit()
+
+    return PartitionResult(
+        number=number,
+        pid=os.getpid(),
+        indexed=indexer.indexed,
+        errored=errored,
+        seconds=perf_counter() - started,
+    )
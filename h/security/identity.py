@@ -48,6 +48,28 @@ class LongLivedUser:
     admin: bool
     memberships: list[LongLivedMembership] = field(default_factory=list)
 
+    group_roles: dict[int, tuple[str, ...]] = field(
+        init=False, repr=False, compare=False, default_factory=dict
+    )
+    """The user's roles in each of their groups, by group ID."""
+
+    def __post_init__(self):
+        if self.memberships:
+            self.index_memberships()
+
+    def index_memberships(self):
+        """
+        Rebuild `group_roles` from `memberships`.
+
+        Permission checks look up the user's roles in a group in `group_roles`
+        rather than scanning `memberships`, which can be very long for some
+        users. This must be called after changing `memberships`.
+        """
+        self.group_roles = {
+            membership.group.id: tuple(membership.roles or ())
+            for membership in self.memberships
+        }
+
     @classmethod
     def from_model(cls, user: User):
         """Create a long lived model from a DB model object."""
@@ -74,6 +96,8 @@ class LongLivedUser:
                 )
             )
 
+        long_lived_user.index_memberships()
+
         return long_lived_user
 
 
@@ -134,8 +158,4 @@ class Identity:
         if self.user is None:
             return []
 
-        for membership in self.user.memberships:
-            if membership.group.id == group.id:
-                return membership.roles  # type: ignore[return-value]
-
-        return []
+        return list(self.user.group_roles.get(group.id, ()))  # type: ignore[arg-type]
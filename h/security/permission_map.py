@@ -73,7 +73,9 @@ PERMISSION_MAP = {
     # --------------------------------------------------------------------- #
     # Annotations
     Permission.Annotation.CREATE: [[p.authenticated]],
-    # You can be notified about an annotation even if it's been deleted
+    # You can be notified about an annotation even if it's been deleted.
+    # N.B. `h.security.permits.RealtimeReaders` duplicates this for speed in
+    # the streamer, so it must be updated if this (or `Group.READ`) changes.
     Permission.Annotation.READ_REALTIME_UPDATES: [
         [p.annotation_not_shared, p.annotation_created_by_user],
         # For shared annotations the permissions are copied from the group
@@ -103,5 +105,7 @@ PERMISSION_MAP = {
 # it harder to read.
 
 # This turns the abstract predicates above into lists which include all of
-# their parents in the correct order to evaluate them.
+# their parents in the correct order to evaluate them, and replaces the
+# permissions they refer to with those permissions' predicates. This is done
+# once here, so checking a permission is just a matter of calling functions.
 PERMISSION_MAP = resolve_predicates(PERMISSION_MAP)
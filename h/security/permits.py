@@ -1,5 +1,8 @@
+from dataclasses import dataclass, fields, is_dataclass
+
 from pyramid.security import Allowed, Denied
 
+from h.models.group import ReadableBy
 from h.security.identity import Identity
 from h.security.permission_map import PERMISSION_MAP
 
@@ -20,8 +23,8 @@ def identity_permits(
     if clauses := PERMISSION_MAP.get(permission):  # noqa: SIM102
         # Grant the permissions if for *any* single clause...
         if any(
-            # .. *all* elements in it are true
-            all(_predicate_true(predicate, identity, context) for predicate in clause)
+            # .. *all* predicates in it are true
+            all(predicate(identity, context) for predicate in clause)
             for clause in clauses
         ):
             return Allowed("Allowed")
@@ -29,12 +32,116 @@ def identity_permits(
     return Denied("Denied")
 
 
-def _predicate_true(predicate, identity, context):
-    """Check whether a predicate is true."""
-    try:
-        return predicate(identity, context)
+class PermitsCache:
+    """
+    A memo of `identity_permits()` results.
+
+    Presenting a page of annotations can check the same permissions for the
+    same identity and objects many times over. Results are keyed by the
+    identity object and the objects in the context (rather than the context
+    object itself, as a new context is often made for each check).
+
+    Results aren't invalidated when the identity or the objects change, so a
+    cache should only be used for a batch of checks in which nothing changes,
+    like presenting a page of annotations.
+    """
+
+    def __init__(self):
+        self._results: dict = {}
+
+    def permits(
+        self, identity: Identity | None, context, permission
+    ) -> Allowed | Denied:
+        """Return `identity_permits()` for the arguments, memoizing the result."""
+        objects = _context_objects(context)
+        key = (id(identity), type(context), *map(id, objects), permission)
+
+        if (entry := self._results.get(key)) is None:
+            # Keep references to the objects in the key, so their ids can't be
+            # reused by other objects while the cache is alive
+            entry = self._results[key] = (
+                identity_permits(identity, context, permission),
+                identity,
+                objects,
+            )
+
+        return entry[0]
+
+
+def _context_objects(context):
+    if is_dataclass(context):
+        return tuple(getattr(context, field.name) for field in fields(context))
+
+    return (context,)
+
+
+@dataclass(frozen=True)
+class RealtimeReaders:
+    """
+    The identities which can receive realtime updates about an annotation.
+
+    Checking `RealtimeReaders.for_annotation(annotation).permits(identity)`
+    gives the same answer as calling `identity_permits()` with an
+    `AnnotationContext` and `Permission.Annotation.READ_REALTIME_UPDATES`.
+
+    The difference is that the work which only depends on the annotation is
+    done once, so checking each of the (potentially thousands of) identities
+    listening to the streamer is just a couple of lookups.
+
+    This must be kept in step with `READ_REALTIME_UPDATES` and `Group.READ`
+    in the `PERMISSION_MAP`.
+    """
+
+    everyone: bool = False
+    """Any identity (or none at all) can read the annotation."""
+
+    userid: str | None = None
+    """The user with this userid can read the annotation."""
+
+    group_id: int | None = None
+    """Members of the group with this id can read the annotation."""
+
+    client_authority: str | None = None
+    """Auth clients with this authority can read the annotation."""
+
+    @classmethod
+    def for_annotation(cls, annotation):
+        """Get the readers of realtime updates for an annotation."""
+
+        if not annotation.shared:
+            # Only the creator can see annotations which aren't shared
+            return cls(userid=annotation.userid)
+
+        # Shared annotations get their permissions from their group
+        if not (group := annotation.group):
+            return cls()
+
+        if group.readable_by == ReadableBy.world:
+            return cls(everyone=True)
+
+        return cls(
+            group_id=group.id if group.readable_by == ReadableBy.members else None,
+            client_authority=group.authority,
+        )
+
+    def permits(self, identity: Identity | None) -> bool:
+        """Check whether the given identity can read the annotation."""
+
+        if self.everyone:
+            return True
+
+        if not identity:
+            return False
+
+        if user := identity.user:
+            if self.userid is not None and user.userid == self.userid:
+                return True
+
+            if self.group_id is not None and self.group_id in user.group_roles:
+                return True
 
-    # If the "predicate" isn't callable, we'll assume it's a permission
-    # and work out if we have that permission
-    except TypeError:
-        return identity_permits(identity, context, predicate)
+        return bool(
+            self.client_authority is not None
+            and identity.auth_client
+            and identity.auth_client.authority == self.client_authority
+        )
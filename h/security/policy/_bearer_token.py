@@ -1,3 +1,4 @@
+import newrelic.agent
 from pyramid.request import RequestLocalCache
 
 from h.security.identity import Identity
@@ -54,6 +55,14 @@ class BearerTokenPolicy:
         if token_str is None:
             return None
 
+        identity_cache = request.find_service(name="identity_cache")
+        fingerprint = identity_cache.fingerprint(request.db, token_str)
+        if fingerprint and (identity := identity_cache.get(token_str, fingerprint)):
+            # Associates the userid with a given transaction/web request, as
+            # `LongLivedToken` does when the token is loaded from the DB
+            newrelic.agent.add_custom_attribute("userid", identity.user.userid)
+            return identity
+
         token = token_svc.validate(token_str)
         if token is None:
             return None
@@ -62,7 +71,13 @@ class BearerTokenPolicy:
         if user is None or user.deleted:
             return None
 
-        return Identity.from_models(user=user)
+        identity = Identity.from_models(user=user)
+
+        # Only cache the identity if nothing changed while it was loading
+        if identity_cache.fingerprint(request.db, token_str) == fingerprint:
+            identity_cache.set(token_str, token, fingerprint, identity)
+
+        return identity
 
     @staticmethod
     def _is_ws_request(request):
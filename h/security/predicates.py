@@ -154,18 +154,12 @@ def group_has_user_as_moderator(identity, context):
 
 
 def _group_has_user_as_role(identity, context, role):
-    return any(
-        membership.group.id == context.group.id and role in membership.roles
-        for membership in identity.user.memberships
-    )
+    return role in identity.user.group_roles.get(context.group.id, ())
 
 
 @requires(authenticated_user, group_found)
 def group_has_user_as_member(identity, context):
-    return any(
-        membership.group.id == context.group.id
-        for membership in identity.user.memberships
-    )
+    return context.group.id in identity.user.group_roles
 
 
 @requires(authenticated_user, group_found)
@@ -260,28 +254,64 @@ def group_member_edit(identity, context: EditGroupMembershipContext):  # noqa: P
 
 def resolve_predicates(mapping):
     """
-    Expand predicates with requirements into concrete lists of predicates.
+    Compile a permission map into flat lists of predicates.
 
     This takes a permission map which contains predicates which reference
     other ones (using `@requires`), and converts each clause to include the
     parents in parent first order. This means any parent which is referred to
     by a predicate is executed before it, and no predicate appears more than once.
+
+    Permissions referred to in a clause are replaced with their own clauses,
+    so a clause is split into one clause for each way the permission it
+    refers to could be granted. The result only contains predicates, which
+    can be called without any more lookups.
     """
+    resolved: dict = {}
+
+    def resolve(permission):
+        if permission not in resolved:
+            resolved[permission] = list(
+                chain.from_iterable(
+                    _expand_clause(clause, resolve)
+                    for clause in mapping.get(permission, [])
+                )
+            )
+
+        return resolved[permission]
+
+    for permission in mapping:
+        resolve(permission)
+
+    return resolved
+
+
+def _expand_clause(clause, resolve):
+    """Generate all of the clauses of predicates + parents a clause expands to."""
+
+    expansions = [[]]
+
+    for item in clause:
+        # Anything that isn't a predicate is a permission, which could be
+        # granted by any of its clauses
+        alternatives = [[item]] if callable(item) else resolve(item)
+
+        expansions = [
+            _extend(expansion, alternative)
+            for expansion in expansions
+            for alternative in alternatives
+        ]
 
-    return {
-        key: [_expand_clause(clause) for clause in clauses]
-        for key, clauses in mapping.items()
-    }
+    return expansions
 
 
-def _expand_clause(clause):
-    """Generate all of the predicates + parents in a clause without dupes."""
+def _extend(clause, predicates):
+    """Add predicates + parents to the end of a clause without dupes."""
 
-    seen_before = set()
+    seen_before = set(clause)
     # The chain.from_iterable here flattens nested iterables
-    return list(
+    return clause + list(
         chain.from_iterable(
-            _expand_predicate(predicate, seen_before) for predicate in clause
+            _expand_predicate(predicate, seen_before) for predicate in predicates
         )
     )
 
@@ -12,6 +12,7 @@ from h.services.bulk_api import (
     BulkLMSStatsService,
 )
 from h.services.email import EmailService
+from h.services.group_list import track_changes as track_group_list_changes
 from h.services.http import HTTPService
 from h.services.job_queue import JobQueueService
 from h.services.jwt import JWTService
@@ -106,6 +107,9 @@ def includeme(config):  # pragma: no cover  # noqa: PLR0915
     config.register_service_factory(
         "h.services.group_list.group_list_factory", name="group_list"
     )
+    config.register_service_factory(
+        "h.services.group_list.group_list_cache_factory", name="group_list_cache"
+    )
     config.register_service_factory(
         "h.services.group_members.group_members_factory", name="group_members"
     )
@@ -126,6 +130,12 @@ def includeme(config):  # pragma: no cover  # noqa: PLR0915
         "h.services.list_organizations.list_organizations_factory",
         name="list_organizations",
     )
+    config.register_service_factory(
+        "h.services.identity_cache.identity_cache_factory", name="identity_cache"
+    )
+    config.register_service_factory(
+        "h.services.profile_cache.profile_cache_factory", name="profile_cache"
+    )
     config.register_service_factory(
         "h.services.job_queue_metrics.factory", name="job_queue_metrics"
     )
@@ -191,3 +201,6 @@ def includeme(config):  # pragma: no cover  # noqa: PLR0915
     config.register_service_factory(
         "h.services.orcid_client.factory", iface=ORCIDClientService
     )
+
+    # Clear the cached group scopes when any session changes them
+    track_group_list_changes()
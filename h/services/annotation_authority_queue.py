@@ -1,14 +1,17 @@
 import json
 import logging
 from dataclasses import dataclass
+from functools import cache
 
 from celery import Celery
-from kombu import Connection
 
 from h.services.annotation_read import AnnotationReadService
 
 LOG = logging.getLogger(__name__)
 
+BROKER_POOL_LIMIT = 10
+"""The most connections to keep open to each authority's broker."""
+
 
 @dataclass(frozen=True)
 class AuthorityQueueConfiguration:
@@ -64,23 +67,21 @@ class AnnotationAuthorityQueueService:
             "annotation": annotation_dict,
         }
 
-        authority_celery = Celery(annotation.authority)
-        with Connection(authority_queue_config.broker_url) as connection:
-            authority_celery.send_task(
-                authority_queue_config.task_name,
-                queue=authority_queue_config.queue_name,
-                # We need to pass the connection explicitly to avoid using the default connection / broker
-                connection=connection,
-                # Expire these tasks just in case something prevents them from being processed
-                expires=60 * 60 * 24,
-                kwargs={"event": payload},
-            )
-            LOG.info(
-                "Published event %s for annotation %s to %s",
-                event_action,
-                annotation.id,
-                annotation.authority,
-            )
+        get_celery_app(
+            annotation.authority, authority_queue_config.broker_url
+        ).send_task(
+            authority_queue_config.task_name,
+            queue=authority_queue_config.queue_name,
+            # Expire these tasks just in case something prevents them from being processed
+            expires=60 * 60 * 24,
+            kwargs={"event": payload},
+        )
+        LOG.info(
+            "Published event %s for annotation %s to %s",
+            event_action,
+            annotation.id,
+            annotation.authority,
+        )
 
     def _parse_authority_queue_config(
         self, config_json: str | None
@@ -116,6 +117,20 @@ class AnnotationAuthorityQueueService:
         return parsed_config
 
 
+@cache
+def get_celery_app(authority: str, broker_url: str) -> Celery:
+    """
+    Get a Celery app for publishing tasks to an authority's broker.
+
+    Apps are created once per process and keep a bounded pool of connections
+    to the broker, so publishing doesn't need a new connection every time.
+    """
+    app = Celery(authority, broker=broker_url, set_as_current=False)
+    app.conf.broker_pool_limit = BROKER_POOL_LIMIT
+
+    return app
+
+
 def factory(_context, request) -> AnnotationAuthorityQueueService:
     return AnnotationAuthorityQueueService(
         authority_queue_config_json=request.registry.settings.get(
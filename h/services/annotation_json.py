@@ -5,7 +5,7 @@ from pyramid.request import Request
 from h.models import Annotation, ModerationStatus, User
 from h.presenters import DocumentJSONPresenter
 from h.presenters.mention_json import MentionJSONPresenter
-from h.security import Identity, identity_permits
+from h.security import Identity, PermitsCache, identity_permits
 from h.security.permissions import Permission
 from h.services import MentionService
 from h.services.annotation_read import AnnotationReadService
@@ -116,7 +116,22 @@ class AnnotationJSONService:
         :param user: User that the annotation is being presented to
         :return: A dict suitable for JSON serialisation
         """
+        return self._present_for_user(
+            annotation,
+            user,
+            Identity.from_models(user=user),
+            PermitsCache(),
+            with_metadata=with_metadata,
+        )
 
+    def _present_for_user(
+        self,
+        annotation: Annotation,
+        user: User,
+        identity: Identity,
+        permits_cache: PermitsCache,
+        with_metadata: bool = False,  # noqa: FBT002, FBT001
+    ):
         # Get the basic version which isn't user specific
         model = self.present(annotation, with_metadata=with_metadata)
 
@@ -124,10 +139,8 @@ class AnnotationJSONService:
         model["flagged"] = self._flag_service.flagged(user=user, annotation=annotation)
 
         # Only moderators see the full flag count
-        user_is_moderator = identity_permits(
-            identity=Identity.from_models(user=user),
-            context=AnnotationContext(annotation),
-            permission=Permission.Annotation.MODERATE,
+        user_is_moderator = permits_cache.permits(
+            identity, AnnotationContext(annotation), Permission.Annotation.MODERATE
         )
         if user_is_moderator:
             model["moderation"] = {
@@ -181,7 +194,15 @@ class AnnotationJSONService:
         # Optimise the user service `fetch()` call
         self._user_service.fetch_all([annotation.userid for annotation in annotations])
 
-        return [self.present_for_user(annotation, user) for annotation in annotations]
+        # Building an identity copies all of the user's group memberships, so
+        # build one for all of the annotations rather than one for each
+        identity = Identity.from_models(user=user)
+        permits_cache = PermitsCache()
+
+        return [
+            self._present_for_user(annotation, user, identity, permits_cache)
+            for annotation in annotations
+        ]
 
     @classmethod
     def _get_read_permission(cls, annotation):
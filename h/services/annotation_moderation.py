@@ -36,10 +36,14 @@ class AnnotationModerationService:
         if not annotation_ids:
             return set()
 
-        query = self._session.query(Annotation).filter(
-            Annotation.id.in_(annotation_ids)
+        # This mirrors `Annotation.is_hidden`, but in SQL so that we only
+        # fetch the ids of the annotations which are actually hidden.
+        query = self._session.query(Annotation.id).filter(
+            Annotation.id.in_(annotation_ids),
+            Annotation.moderation_status.is_not(None),
+            Annotation.moderation_status != ModerationStatus.APPROVED,
         )
-        return {a.id for a in query if a.is_hidden}
+        return {id_ for (id_,) in query}
 
     def set_status(
         self,
@@ -1,7 +1,8 @@
 from collections.abc import Iterable
 
-from sqlalchemy import Select, func, or_, select
+from sqlalchemy import Select, func, inspect, or_, select
 from sqlalchemy.orm import Session, subqueryload
+from sqlalchemy.orm.util import identity_key
 
 from h.db.types import InvalidUUID
 from h.models import Annotation, ModerationStatus
@@ -25,7 +26,10 @@ class AnnotationReadService:
             return None
 
     def get_annotations_by_id(
-        self, ids: list[str], eager_load: list | None = None
+        self,
+        ids: list[str],
+        eager_load: list | None = None,
+        use_identity_map: bool = True,  # noqa: FBT001, FBT002
     ) -> Iterable[Annotation]:
         """
         Get annotations in the same order as the provided ids.
@@ -33,21 +37,67 @@ class AnnotationReadService:
         :param ids: the list of annotation ids
         :param eager_load: A list of annotation relationships to eager load
             like `Annotation.document`
+        :param use_identity_map: Use annotations which have already been loaded
+            into the DB session, rather than fetching them again
         """
 
         if not ids:
             return []
 
-        annotations = self._db.execute(
-            self.annotation_search_query(
-                ids=ids,
-                eager_load=eager_load,
-                include_deleted=True,
-                include_private=True,
+        # De-duplicate the ids, keeping the first position of each
+        ids = list(dict.fromkeys(ids))
+
+        annotations: dict[str, Annotation] = {}
+        if use_identity_map:
+            annotations.update(
+                (annotation.id, annotation)
+                for annotation in self._get_loaded_annotations(ids, eager_load)
+            )
+
+        if missing_ids := [id_ for id_ in ids if id_ not in annotations]:
+            annotations.update(
+                (annotation.id, annotation)
+                for annotation in self._db.execute(
+                    self.annotation_search_query(
+                        ids=missing_ids,
+                        eager_load=eager_load,
+                        include_deleted=True,
+                        include_private=True,
+                    )
+                ).scalars()
             )
-        ).scalars()
 
-        return sorted(annotations, key=lambda annotation: ids.index(annotation.id))
+        return [annotations[id_] for id_ in ids if id_ in annotations]
+
+    def _get_loaded_annotations(self, ids, eager_load):
+        """Get annotations which are already fully loaded into the session."""
+        identity_map = self._db.identity_map
+        pending_deletes = self._db.deleted
+
+        for id_ in ids:
+            annotation = identity_map.get(identity_key(Annotation, id_))
+            if annotation is None:
+                continue
+
+            state = inspect(annotation)
+            if not state.expired_attributes.isdisjoint(
+                state.mapper.column_attrs.keys()
+            ):
+                # This would need a query per annotation to refresh it
+                continue
+
+            if state.was_deleted or annotation in pending_deletes:
+                # A query would flush the delete and not find the annotation
+                continue
+
+            if eager_load and not state.unloaded.isdisjoint(
+                prop.key for prop in eager_load
+            ):
+                # Using this would lazy load the relationships we were asked to
+                # eager load, with a query per annotation
+                continue
+
+            yield annotation
 
     @staticmethod
     def annotation_search_query(  # noqa: PLR0913
@@ -1,29 +1,76 @@
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
 
+import sqlalchemy as sa
 from dateutil.parser import isoparse
 
 from h.db.types import URLSafeUUID
 from h.models import Annotation, Job
+from h.presenters import AnnotationSearchIndexPresenter
 from h.search.index import BatchIndexer
 
 
+class BatchSizer:
+    """
+    Choose how many sync jobs to process per batch based on recent batches.
+
+    Each batch's duration gives an estimate of how long a job takes to sync,
+    and the next batch is sized to take around `target_seconds`. Changes are
+    smoothed so a single unusually fast or slow batch doesn't swing the size
+    too far, and the size is kept between `minimum` and `maximum`.
+    """
+
+    def __init__(
+        self,
+        initial=1000,
+        minimum=100,
+        maximum=10_000,
+        target_seconds=10.0,
+        smoothing=0.5,
+    ):
+        self.limit = initial
+        """The number of jobs to process in the next batch."""
+
+        self._minimum = minimum
+        self._maximum = maximum
+        self._target_seconds = target_seconds
+        self._smoothing = smoothing
+
+    def record(self, jobs, seconds):
+        """Record that a batch of `jobs` jobs took `seconds` to sync."""
+        if not jobs or seconds <= 0:
+            return
+
+        ideal = self._target_seconds * jobs / seconds
+        limit = round(self.limit + self._smoothing * (ideal - self.limit))
+        self.limit = max(self._minimum, min(self._maximum, limit))
+
+
+# Batch sizes are learnt over the lifetime of the (Celery worker) process
+_batch_sizer = BatchSizer()
+
+
 class AnnotationSyncService:
     """A service for synchronizing annotations from Postgres to Elasticsearch."""
 
-    def __init__(self, batch_indexer, db_helper, es_helper, queue_service):
+    def __init__(self, batch_indexer, db_helper, es_helper, queue_service, batch_sizer):
         self._batch_indexer = batch_indexer
         self._db_helper = db_helper
         self._es_helper = es_helper
         self._queue_service = queue_service
+        self._batch_sizer = batch_sizer
 
-    def sync(self, limit):
+    def sync(self, limit=None, on_full_batch=None):
         """
         Synchronize a batch of annotations from Postgres to Elasticsearch.
 
         Called periodically by a Celery task (see h-periodic).
 
-        Each time this method runs it considers a fixed number of sync
-        annotation jobs from the queue and for each job:
+        Each time this method runs it considers a batch of sync annotation
+        jobs from the queue. The batch size adapts to how long recent batches
+        took (see `BatchSizer`), up to `limit` jobs if it's given. For each
+        job:
 
         * If the annotation is already the same in Elastic as in the DB then
           remove the job from the queue
@@ -32,15 +79,28 @@ class AnnotationSyncService:
           than in the DB then re-sync the annotation into Elastic. Leave the
           job on the queue to be re-checked and removed the next time the
           method runs.
+
+        :param limit: the most jobs to sync
+        :param on_full_batch: called as soon as the jobs have been fetched if
+            there were enough to fill the batch, meaning more are probably
+            waiting in the queue. Parallel batches never sync the same jobs
+            because `JobQueueService.get()` skips jobs locked by other
+            transactions.
         """
-        jobs = self._queue_service.get(name="sync_annotation", limit=limit)
+        started = perf_counter()
+        jobs = self._get_jobs(limit, on_full_batch)
 
         if not jobs:
             return {}
 
         counter = Counter()
-        annotations_from_db = self._db_helper.get(jobs)
-        annotations_from_es = self._es_helper.get(jobs)
+
+        # Fetch the annotations from Elasticsearch in another thread while we
+        # query the DB. The DB session isn't thread safe so stays in this one.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            annotations_from_es = executor.submit(self._es_helper.get, jobs)
+            annotations_from_db = self._db_helper.get(jobs)
+            annotations_from_es = annotations_from_es.result()
 
         for job in jobs:
             annotation_id = _url_safe_annotation_id(job)
@@ -85,29 +145,65 @@ class AnnotationSyncService:
         if counter.annotation_ids_to_delete:
             self._batch_indexer.delete(counter.annotation_ids_to_delete)
 
+        self._batch_sizer.record(len(jobs), perf_counter() - started)
+
         return counter.counts
 
+    def _get_jobs(self, limit, on_full_batch):
+        batch_size = self._batch_sizer.limit
+        if limit:
+            batch_size = min(batch_size, limit)
+
+        jobs = self._queue_service.get(name="sync_annotation", limit=batch_size)
+
+        if on_full_batch and len(jobs) >= batch_size:
+            on_full_batch()
+
+        return jobs
+
     @staticmethod
     def _equal(annotation_from_es, annotation_from_db):
-        """Test if the annotations are equal."""
+        """
+        Test if the annotations are equal.
+
+        The digest covers the annotation itself, and the fields derived from
+        its thread are compared separately, as they're partially updated on
+        their own when replies change (see
+        `AnnotationSearchIndexPresenter.thread_fields()`).
+
+        Documents indexed before digests were added to the search index don't
+        have one, and are never considered equal, so they get re-indexed.
+        """
         return (
-            annotation_from_es["updated"] == annotation_from_db.updated
-            and annotation_from_es["user"] == annotation_from_db.userid
+            annotation_from_es.get("digest") == annotation_from_db.digest
+            and set(annotation_from_es.get("thread_ids", ()))
+            == annotation_from_db.thread_ids
+            and annotation_from_es.get("hidden") == annotation_from_db.hidden
         )
 
 
+# An annotation's state in the DB, as far as syncing is concerned
+DBAnnotation = namedtuple(  # noqa: PYI024
+    "DBAnnotation", ["id", "updated", "userid", "digest", "thread_ids", "hidden"]
+)
+
+
 class DBHelper:
     """Helper for woking with annotations in the DB."""
 
-    def __init__(self, db):
+    def __init__(self, db, nipsa_service, moderation_service):
         self._db = db
+        self._nipsa_service = nipsa_service
+        self._moderation_service = moderation_service
 
     def get(self, jobs: list[Job]) -> dict:
         """
         Return a dict of annotations from the DB for the given `jobs`.
 
-        Return a dict mapping annotation IDs to their (annotation_id,
-        annotation_updated_datetime, annotation_userid) tuples from the DB.
+        Return a dict mapping annotation IDs to their `DBAnnotation` tuples,
+        including the digest of each annotation's search index document (see
+        `AnnotationSearchIndexPresenter.digest()`) and the state of its thread
+        which the search index reflects.
 
         If `jobs` contains multiple jobs for the same annotation these will be
         deduplicated and only one copy of the annotation will be returned.
@@ -126,13 +222,55 @@ class DBHelper:
         if not annotation_ids:
             return {}
 
-        return {
-            annotation.id: annotation
-            for annotation in self._db.query(
-                Annotation.id, Annotation.updated, Annotation.userid
-            )
+        annotations = (
+            self._db.query(Annotation)
             .filter_by(deleted=False)
             .filter(Annotation.id.in_(annotation_ids))
+            .all()
+        )
+        nipsa_userids = self._nipsa_service.flagged_userids(
+            {annotation.userid for annotation in annotations}
+        )
+        thread_ids = self._thread_ids(annotation.id for annotation in annotations)
+        hidden_ids = self._moderation_service.all_hidden(
+            [
+                *thread_ids,
+                *(id_ for ids in thread_ids.values() for id_ in ids),
+            ]
+        )
+
+        return {
+            annotation.id: DBAnnotation(
+                annotation.id,
+                annotation.updated,
+                annotation.userid,
+                AnnotationSearchIndexPresenter.digest(
+                    annotation, nipsa=annotation.userid in nipsa_userids
+                ),
+                thread_ids[annotation.id],
+                # This mirrors `AnnotationSearchIndexPresenter._add_hidden()`
+                all(
+                    id_ in hidden_ids
+                    for id_ in [annotation.id, *thread_ids[annotation.id]]
+                ),
+            )
+            for annotation in annotations
+        }
+
+    def _thread_ids(self, annotation_ids):
+        """Return the ids of the replies in each annotation's thread."""
+        thread_ids = {annotation_id: set() for annotation_id in annotation_ids}
+
+        if thread_ids:
+            # This mirrors the `Annotation.thread` relationship
+            root_id = Annotation.references[0]
+            for id_, thread_root_id in self._db.execute(
+                sa.select(Annotation.id, root_id).where(root_id.in_(thread_ids))
+            ):
+                thread_ids[thread_root_id].add(id_)
+
+        return {
+            annotation_id: frozenset(ids) for annotation_id, ids in thread_ids.items()
         }
 
 
@@ -147,7 +285,9 @@ class ESHelper:
         Return a dict of annotations from Elasticsearch for the given `jobs`.
 
         Return a dict mapping annotation IDs to their {"updated": <datetime>,
-        "user": <userid>} dicts from Elasticsearch.
+        "user": <userid>, "digest": <digest>, "thread_ids": <ids>, "hidden":
+        <bool>} dicts from Elasticsearch. The digest is missing for documents
+        indexed before digests were added.
 
         If `jobs` contains multiple jobs for the same annotation this will be
         deduplicated and only one copy of the annotation will be returned.
@@ -165,7 +305,7 @@ class ESHelper:
 
         hits = self._es.conn.search(
             body={
-                "_source": ["updated", "user"],
+                "_source": ["updated", "user", "digest", "thread_ids", "hidden"],
                 "query": {"ids": {"values": list(annotation_ids)}},
                 "size": len(annotation_ids),
             },
@@ -271,7 +411,12 @@ def _url_safe_annotation_id(job):
 def factory(_context, request):
     return AnnotationSyncService(
         batch_indexer=BatchIndexer(request.db, request.es, request),
-        db_helper=DBHelper(db=request.db),
+        db_helper=DBHelper(
+            db=request.db,
+            nipsa_service=request.find_service(name="nipsa"),
+            moderation_service=request.find_service(name="annotation_moderation"),
+        ),
         es_helper=ESHelper(es=request.es),
         queue_service=request.find_service(name="queue_service"),
+        batch_sizer=_batch_sizer,
     )
@@ -150,15 +150,16 @@ class AnnotationWriteService:
         if annotation_metadata:
             self._annotation_metadata_service.set(annotation, annotation_metadata)
 
-        # The search index service by default does not reindex if the existing ES
-        # entry's timestamp matches the DB timestamp. If we're not changing this
-        # timestamp, we need to force reindexing.
+        # The sync job only reindexes the annotation if its search index digest
+        # has changed. The digest covers the annotation itself but not the
+        # document metadata, so if that changed without the timestamp changing
+        # we need to force reindexing.
         self._queue_service.add_by_id(
             name="sync_annotation",
             annotation_id=annotation.id,
             tag=reindex_tag,
             schedule_in=60,
-            force=not update_timestamp,
+            force=bool(document) and not update_timestamp,
         )
 
         self._mention_service.update_mentions(annotation)
@@ -1,9 +1,11 @@
+from collections.abc import Iterator
 from dataclasses import dataclass
 
 import sqlalchemy as sa
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import Select
 
+from h import db
 from h.models import AnnotationMetadata, AnnotationSlim, Group, GroupMembership, User
 from h.services.bulk_api._helpers import date_match
 
@@ -22,6 +24,9 @@ class BulkAnnotationService:
     _AUTHOR = sa.orm.aliased(User, name="author")
     _AUDIENCE = sa.orm.aliased(User, name="audience")
 
+    STREAM_BATCH_SIZE = 1000
+    """The number of rows to fetch from the DB at once when streaming."""
+
     def __init__(self, db_session: Session):
         """Initialise the service."""
 
@@ -33,9 +38,13 @@ class BulkAnnotationService:
         username: str,
         created: dict,
         limit=100000,
-    ) -> list[BulkAnnotation]:
+    ) -> Iterator[BulkAnnotation]:
         """
-        Get a list of annotations or rows viewable by a given user.
+        Get an iterator of annotations or rows viewable by a given user.
+
+        The annotations are streamed from the DB in batches with a server-side
+        cursor as they are iterated over, so memory use doesn't grow with
+        `limit`.
 
         :param authority: The authority to search by
         :param username: The username to search by
@@ -46,20 +55,27 @@ class BulkAnnotationService:
         :raises BadDateFilter: For poorly specified date conditions
         """
 
-        results = self._db.execute(
-            self._search_query(authority, username=username, created=created).limit(
-                limit
-            )
-        )
+        # Build the query now, so bad filters are reported when we are called
+        # rather than part way through iterating over the results
+        query = self._search_query(authority, username=username, created=created)
+
+        return self._stream(query.limit(limit))
 
-        return [
-            BulkAnnotation(
-                username=row.username,
-                authority_provided_id=row.authority_provided_id,
-                metadata=row.metadata,
+    def _stream(self, query) -> Iterator[BulkAnnotation]:
+        # Streamed responses are iterated over after the request's transaction
+        # has been committed and its session closed, so we read from a session
+        # of our own which lasts for as long as we are iterated over.
+        with db.Session(bind=self._db.get_bind()) as session:
+            results = session.execute(
+                query, execution_options={"yield_per": self.STREAM_BATCH_SIZE}
             )
-            for row in results.all()
-        ]
+
+            for row in results:
+                yield BulkAnnotation(
+                    username=row.username,
+                    authority_provided_id=row.authority_provided_id,
+                    metadata=row.metadata,
+                )
 
     @classmethod
     def _search_query(cls, authority, username, created) -> Select:
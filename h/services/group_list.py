@@ -1,5 +1,107 @@
+from collections import OrderedDict, defaultdict, namedtuple
+from functools import partial
+from itertools import chain
+from threading import Lock
+from time import monotonic
+
+import sqlalchemy
+
 from h import models
 from h.models import group
+from h.util.group_scope import parse_origin
+
+# A cached value, along with when it stops being valid
+_Entry = namedtuple("_Entry", ["value", "expires_at"])  # noqa: PYI024
+
+# The key in `Session.info` recording that groups or group scopes have changed
+_CHANGES_KEY = "h.services.group_list.changes"
+
+
+class ScopeIndex:
+    """
+    An index of the group scopes for a single origin.
+
+    Scopes are matched by prefix, so rather than checking a URL against every
+    scope this indexes the scopes by their length: a URL can then only match
+    the scopes equal to one of its prefixes of those lengths, which are found
+    with a dict lookup each.
+    """
+
+    def __init__(self, scopes):
+        """
+        Create a new index.
+
+        :param scopes: an iterable of ``(scope, group_id)`` tuples
+        """
+        self._group_ids = defaultdict(set)
+        for scope, group_id in scopes:
+            self._group_ids[scope].add(group_id)
+
+        self._lengths = sorted({len(scope) for scope in self._group_ids})
+
+    def group_ids(self, url):
+        """Return the set of IDs of groups with a scope that `url` is in."""
+        group_ids = set()
+
+        for length in self._lengths:
+            if length > len(url):
+                break
+
+            group_ids.update(self._group_ids.get(url[:length], ()))
+
+        return group_ids
+
+
+class GroupListCache:
+    """
+    A process-level cache of what `GroupListService` needs for every request.
+
+    This holds a `ScopeIndex` for each origin groups are scoped to, so
+    listing the groups for a page doesn't have to load every scope for the
+    page's origin. Entries are kept for `ttl` seconds and the least recently
+    used origins are dropped beyond `maxsize`.
+
+    Everything is cleared once a transaction which changed any groups or
+    group scopes commits (see `track_changes()`). As the cache is per process,
+    this only takes effect straight away in the process which made the
+    change: other processes can carry on using the old values for up to `ttl`
+    seconds.
+    """
+
+    def __init__(self, ttl=10, maxsize=1000):
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._scope_indexes: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = Lock()
+
+    def scope_index(self, origin, loader):
+        """
+        Return the `ScopeIndex` for `origin`.
+
+        :param origin: the origin to get the index for
+        :param loader: a function returning the index if it's not cached
+        """
+        with self._lock:
+            entry = self._scope_indexes.get(origin)
+            if entry and entry.expires_at > monotonic():
+                self._scope_indexes.move_to_end(origin)
+                return entry.value
+
+        index = loader()
+
+        with self._lock:
+            self._scope_indexes[origin] = _Entry(index, monotonic() + self._ttl)
+            self._scope_indexes.move_to_end(origin)
+
+            while len(self._scope_indexes) > self._maxsize:
+                self._scope_indexes.popitem(last=False)
+
+        return index
+
+    def clear(self):
+        """Remove everything from the cache."""
+        with self._lock:
+            self._scope_indexes.clear()
 
 
 class GroupListService:
@@ -11,15 +113,18 @@ class GroupListService:
     ALl public methods return relevant group model objects.
     """
 
-    def __init__(self, session, default_authority, group_scope_service):
+    def __init__(self, session, default_authority, group_scope_service, cache):
         """
         Create a new group_list service.
 
         :param session: the SQLAlchemy session object
         :param default_authority: the authority to use as a default
+        :param group_scope_service: the group_scope service
+        :param cache: the `GroupListCache` to use
         """
         self._session = session
         self._group_scope_service = group_scope_service
+        self._cache = cache
         self.default_authority = default_authority
 
     def _authority(self, user=None, authority=None):
@@ -161,8 +266,15 @@ class GroupListService:
     def scoped_groups(self, authority, document_uri):
         if not document_uri:
             return []
-        matching_scopes = self._group_scope_service.fetch_by_scope(document_uri)
-        matching_scope_groupids = [scope.group_id for scope in matching_scopes]
+
+        origin = parse_origin(document_uri)
+        if not origin:
+            return []
+
+        scope_index = self._cache.scope_index(
+            origin, lambda: self._load_scope_index(origin)
+        )
+        matching_scope_groupids = scope_index.group_ids(document_uri)
 
         if not matching_scope_groupids:
             return []
@@ -206,6 +318,12 @@ class GroupListService:
             .one_or_none()
         )
 
+    def _load_scope_index(self, origin):
+        return ScopeIndex(
+            (scope.scope, scope.group_id)
+            for scope in self._group_scope_service.fetch_by_origin(origin)
+        )
+
     @staticmethod
     def _sort(groups):
         """Sort a list of groups of a single type."""
@@ -219,4 +337,68 @@ def group_list_factory(_context, request):
         session=request.db,
         default_authority=request.default_authority,
         group_scope_service=group_scope_service,
+        cache=request.find_service(name="group_list_cache"),
+    )
+
+
+# The scope indexes are shared by all requests in the process
+_group_list_cache = GroupListCache()
+
+
+def group_list_cache_factory(_context, _request):
+    return _group_list_cache
+
+
+def track_changes(session_class=sqlalchemy.orm.Session, cache=_group_list_cache):
+    """
+    Clear the cached scope indexes when groups or scopes change.
+
+    Changes are recorded as sessions flush or execute bulk UPDATE and DELETE
+    statements, and are applied to the cache once the session's transaction
+    commits, so other requests can't re-cache the data from before the commit.
+    """
+    sqlalchemy.event.listen(session_class, "after_flush", _record_changes)
+    sqlalchemy.event.listen(session_class, "do_orm_execute", _record_bulk_changes)
+    sqlalchemy.event.listen(
+        session_class, "after_commit", partial(_apply_changes, cache)
     )
+    sqlalchemy.event.listen(session_class, "after_transaction_end", _forget_changes)
+
+
+def _record_changes(session, _flush_context):
+    for obj in chain(session.new, session.deleted):
+        _record_change(session, obj)
+
+    for obj in session.dirty:
+        # Groups are dirty whenever their memberships change, which doesn't
+        # affect the cached scopes
+        if isinstance(obj, models.Group) and not session.is_modified(
+            obj, include_collections=False
+        ):
+            continue
+
+        _record_change(session, obj)
+
+
+def _record_change(session, obj):
+    if isinstance(obj, models.Group | models.GroupScope):
+        session.info[_CHANGES_KEY] = True
+
+
+def _record_bulk_changes(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and (
+        orm_execute_state.statement.table
+        in (models.Group.__table__, models.GroupScope.__table__)
+    ):
+        orm_execute_state.session.info[_CHANGES_KEY] = True
+
+
+def _apply_changes(cache, session):
+    if session.info.pop(_CHANGES_KEY, False):
+        cache.clear()
+
+
+def _forget_changes(session, transaction):
+    # Changes which are left when the transaction ends were rolled back
+    if transaction.parent is None:
+        session.info.pop(_CHANGES_KEY, None)
@@ -17,15 +17,22 @@ class GroupScopeService:
         origin = scope_util.parse_origin(url)
         if not origin:
             return []
-        origin_scopes = (
-            self._session.query(GroupScope).filter(GroupScope.origin == origin).all()
-        )
         return [
             scope
-            for scope in origin_scopes
+            for scope in self.fetch_by_origin(origin)
             if scope_util.url_in_scope(url, [scope.scope])
         ]
 
+    def fetch_by_origin(self, origin):
+        """
+        Return all of the GroupScope records for the given origin.
+
+        :arg origin: the origin, as returned by `h.util.group_scope.parse_origin`
+        :type origin: str
+        :rtype: list(:class:`~h.models.group_scope.GroupScope`)
+        """
+        return self._session.query(GroupScope).filter(GroupScope.origin == origin).all()
+
 
 def group_scope_factory(_context, request):
     return GroupScopeService(session=request.db)
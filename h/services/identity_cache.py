@@ -0,0 +1,144 @@
+import copy
+import hashlib
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from time import monotonic
+
+from sqlalchemy import Text, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from h.models import GroupMembership, Token, User
+
+# A cached identity, along with the token it was loaded for and the
+# fingerprint of the rows it was loaded from
+_Entry = namedtuple("_Entry", ["identity", "token", "fingerprint", "expires_at"])  # noqa: PYI024
+
+
+class IdentityCache:
+    """
+    A process-level cache of the identities which bearer tokens belong to.
+
+    Loading the identity for a token takes several queries (for the token, the
+    user and the user's group memberships and their groups) and clients tend
+    to send the same token with many requests in a short time. Identities are
+    cached for up to `ttl` seconds, keyed by a digest of the token so the
+    tokens themselves aren't kept in memory.
+
+    Nothing has to remember to invalidate the cache. Each time an identity is
+    read from the cache it's checked against a fingerprint of the token, the
+    user and the user's memberships and roles, which is read from the DB with
+    a single query (see `fingerprint()`). Any change to those rows, committed
+    by any process, means the identity is loaded again.
+    """
+
+    def __init__(self, ttl=30, maxsize=10_000):
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def fingerprint(session, token_str):
+        """
+        Return a fingerprint of the rows `token_str`'s identity is loaded from.
+
+        Returns None if there's no such token.
+
+        :param session: the SQLAlchemy session object
+        :param token_str: the token string
+        """
+        memberships = (
+            select(
+                func.array_agg(
+                    aggregate_order_by(
+                        func.concat(
+                            GroupMembership.group_id,
+                            ":",
+                            GroupMembership.roles.cast(Text),
+                        ),
+                        GroupMembership.group_id,
+                    )
+                )
+            )
+            .where(GroupMembership.user_id == User.id)
+            .scalar_subquery()
+        )
+
+        row = session.execute(
+            select(
+                Token.expires,
+                User.username,
+                User.authority,
+                User.admin,
+                User.staff,
+                User.deleted,
+                memberships,
+            )
+            .join(User, Token.user_id == User.id)
+            .where(Token.value == token_str)
+        ).one_or_none()
+
+        return tuple(row) if row else None
+
+    def get(self, token_str, fingerprint):
+        """
+        Return a shallow copy of the cached identity for `token_str`, or None.
+
+        :param token_str: the token string
+        :param fingerprint: the current fingerprint for `token_str` (see
+            `fingerprint()`), which must match the cached identity's
+        """
+        digest = self._digest(token_str)
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+
+            if (
+                entry.expires_at <= monotonic()
+                or entry.fingerprint != fingerprint
+                or not entry.token.is_valid()
+            ):
+                del self._entries[digest]
+                return None
+
+        # Each request gets its own `Identity` but the user and auth client
+        # inside it are shared with other requests, so they must be replaced
+        # rather than changed in place (see `edit_member()`)
+        return copy.copy(entry.identity)
+
+    def set(self, token_str, token, fingerprint, identity):
+        """
+        Cache the identity that `token_str` belongs to.
+
+        :param token_str: the token string
+        :param token: the validated `LongLivedToken` for `token_str`, which is
+            checked for expiry each time the identity is read from the cache
+        :param fingerprint: the fingerprint for `token_str` (see
+            `fingerprint()`) from before the identity was loaded
+        :param identity: the `Identity` to cache
+        """
+        digest = self._digest(token_str)
+        identity = copy.copy(identity)
+
+        with self._lock:
+            self._entries.pop(digest, None)
+            self._entries[digest] = _Entry(
+                identity, token, fingerprint, monotonic() + self._ttl
+            )
+
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _digest(token_str):
+        return hashlib.sha256(token_str.encode("utf-8")).hexdigest()
+
+
+# Identities are shared by all requests in the process
+_identity_cache = IdentityCache()
+
+
+def identity_cache_factory(_context, _request):
+    return _identity_cache
@@ -1,6 +1,16 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 
-from sqlalchemy import and_, func, literal_column, select
+from sqlalchemy import (
+    Text,
+    and_,
+    cast,
+    func,
+    literal_column,
+    select,
+    true,
+    update,
+)
 from zope.sqlalchemy import mark_changed
 
 from h.models import Annotation, Job
@@ -13,17 +23,24 @@ class Priority:
     BETWEEN_TIMES = 1_000
     BY_IDS = 1_000
 
+    @classmethod
+    def values(cls):
+        """Return the distinct priority values."""
+        return {
+            value
+            for name, value in vars(cls).items()
+            if not name.startswith("_") and isinstance(value, int)
+        }
+
 
 class JobQueueService:
     def __init__(self, db):
         self._db = db
+        # How long each deleted job had been queued for, by tag
+        self._latencies = defaultdict(list)
 
     def get(self, name, limit):
-        now = datetime.utcnow()  # noqa: DTZ003
-
-        query = self._db.query(Job).filter(
-            Job.name == name, Job.expires_at >= now, Job.scheduled_at < now
-        )
+        query = self._db.query(Job).filter(*self._available(name))
 
         return (
             query.order_by(Job.priority, Job.enqueued_at)
@@ -33,9 +50,26 @@ class JobQueueService:
         )
 
     def delete(self, jobs):
+        now = datetime.utcnow()  # noqa: DTZ003
+
         for job in jobs:
+            if job.enqueued_at:
+                self._latencies[job.tag].append((now - job.enqueued_at).total_seconds())
             self._db.delete(job)
 
+    def take_latencies(self):
+        """
+        Get how long the jobs deleted since this was last called were queued.
+
+        :returns: a dict mapping each tag to a `(mean, max)` tuple of seconds
+        """
+        latencies = {
+            tag: (sum(seconds) / len(seconds), max(seconds))
+            for tag, seconds in self._latencies.items()
+        }
+        self._latencies.clear()
+        return latencies
+
     def add_between_times(self, name, start_time, end_time, tag, force=False):  # noqa: FBT002
         """
         Queue all annotations between two times.
@@ -109,10 +143,18 @@ class JobQueueService:
         priority,
         force=False,  # noqa: FBT002
         schedule_in=None,
+        deduplicate=True,  # noqa: FBT002
     ):
         """
         Queue annotations matching a filter .
 
+        By default this won't queue a second job for an annotation that
+        already has a pending job with the same name. The pending job is
+        updated instead: it takes the higher priority, the earlier scheduled
+        time and the later expiry time of the two, and is forced if either
+        is. Pending jobs that are locked (because they're being processed
+        right now) aren't updated, and a new job is queued as well.
+
         :param name : Name of the task in the queue
         :param where: A list of SQLAlchemy BinaryExpression objects to limit
             the annotations to be added
@@ -125,26 +167,88 @@ class JobQueueService:
         :param schedule_in: A number of seconds from now to wait before making
             the job available for processing. The annotation won't be synced
             until at least `schedule_in` seconds from now
+        :param deduplicate: Whether to update existing pending jobs rather
+            than queueing duplicates of them
         """
         where_clause = and_(*where) if len(where) > 1 else where[0]
         schedule_at = datetime.utcnow() + timedelta(seconds=schedule_in or 0)  # noqa: DTZ003
 
+        annotations = select(
+            literal_column(f"'{name}'"),
+            literal_column(f"'{schedule_at}'"),
+            literal_column(str(priority)),
+            literal_column(repr(tag)),
+            func.jsonb_build_object(
+                "annotation_id", Annotation.id, "force", bool(force)
+            ),
+        ).where(where_clause)
+
+        if deduplicate:
+            merged = self._merge_pending(
+                name, where_clause, priority, force, schedule_at
+            )
+            annotations = annotations.where(
+                cast(Annotation.id, Text).not_in(select(merged.c.annotation_id))
+            )
+
         query = Job.__table__.insert().from_select(
             [Job.name, Job.scheduled_at, Job.priority, Job.tag, Job.kwargs],
-            select(
-                literal_column(f"'{name}'"),
-                literal_column(f"'{schedule_at}'"),
-                literal_column(str(priority)),
-                literal_column(repr(tag)),
-                func.jsonb_build_object(
-                    "annotation_id", Annotation.id, "force", bool(force)
-                ),
-            ).where(where_clause),
+            annotations,
         )
 
+        if deduplicate:
+            # Postgres only allows a CTE that modifies data at the top level
+            query = query.add_cte(merged)
+
         self._db.execute(query)
         mark_changed(self._db)
 
+    def _merge_pending(self, name, where_clause, priority, force, schedule_at):
+        """
+        Return a CTE which merges a new job into any pending jobs.
+
+        The CTE returns the annotation IDs (in the DB's format) which had
+        pending jobs to merge into.
+        """
+        pending = (
+            select(Job.id)
+            .where(
+                Job.name == name,
+                Job.expires_at >= datetime.utcnow(),  # noqa: DTZ003
+                Job.kwargs["annotation_id"].astext.in_(
+                    select(cast(Annotation.id, Text)).where(where_clause)
+                ),
+            )
+            .with_for_update(skip_locked=True)
+        )
+
+        values = {
+            "priority": func.least(Job.priority, priority),
+            "scheduled_at": func.least(Job.scheduled_at, schedule_at),
+            # Expire when the new job would have (the column's default)
+            "expires_at": func.greatest(
+                Job.expires_at, Job.__table__.c.expires_at.server_default.arg
+            ),
+        }
+        if force:
+            values["kwargs"] = Job.kwargs.op("||")(
+                func.jsonb_build_object("force", true())
+            )
+
+        return (
+            update(Job)
+            .where(Job.id.in_(pending))
+            .values(values)
+            .returning(Job.kwargs["annotation_id"].astext.label("annotation_id"))
+            .cte("merged")
+        )
+
+    @staticmethod
+    def _available(name):
+        now = datetime.utcnow()  # noqa: DTZ003
+
+        return [Job.name == name, Job.expires_at >= now, Job.scheduled_at < now]
+
 
 def factory(_context, request):
     return JobQueueService(request.db)
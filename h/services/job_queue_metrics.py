@@ -1,16 +1,32 @@
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from datetime import datetime
+from time import monotonic
 
-from sqlalchemy import func
+from sqlalchemy import func, select, tablesample, text
+from sqlalchemy.orm import aliased
 
 from h.models import Job
 
+# Cumulative counts of jobs added to and removed from the queue, at a moment
+Sample = namedtuple("Sample", ["time", "enqueued", "dequeued"])  # noqa: PYI024
+
+# The previous sample taken in this process, for calculating rates
+_previous_sample = None
+
 
 class JobQueueMetrics:
     """A service for generating metrics about the job queue."""
 
-    def __init__(self, db):
+    def __init__(self, db, exact_count_limit=100_000):
+        """
+        Create a new metrics service.
+
+        :param exact_count_limit: above roughly this many jobs the counts
+            are estimated from a random sample of about this many jobs,
+            rather than counted exactly, as that has to scan the whole table
+        """
         self._db = db
+        self._exact_count_limit = exact_count_limit
 
     def metrics(self):
         """
@@ -22,39 +38,138 @@ class JobQueueMetrics:
         metrics = defaultdict(int)
         now = datetime.utcnow()  # noqa: DTZ003
 
-        # Expired jobs.
-        metrics["Custom/JobQueue/Count/Expired"] = (
-            self._db.query(Job).filter(Job.expires_at < now).count()
-        )
+        estimated = self._estimated_count()
+        metrics["Custom/JobQueue/Count/Estimated"] = estimated
 
-        # Unexpired jobs by tag and name.
-        name_tags = (
-            self._db.query(Job.name, Job.tag, func.count())
-            .filter(Job.expires_at >= now)
-            .group_by(Job.name)
-            .group_by(Job.tag)
-            .distinct()
-        )
-        for name, tag, count in name_tags:
-            metrics[f"Custom/JobQueue/Count/Name/{name}/Tag/{tag}"] = count
-            metrics[f"Custom/JobQueue/Count/Name/{name}/Total"] += count
-
-        # Unexpired jobs by priority.
-        priority_counts = (
-            self._db.query(Job.priority, func.count())
-            .filter(Job.expires_at >= now)
-            .group_by(Job.priority)
+        if estimated <= self._exact_count_limit:
+            self._add_counts(metrics, now)
+        else:
+            self._add_counts(
+                metrics, now, sample_percent=100 * self._exact_count_limit / estimated
+            )
+
+        self._add_ages(metrics, now)
+        self._add_rates(metrics)
+
+        return metrics.items()
+
+    def _estimated_count(self):
+        # Postgres's estimate from the last VACUUM or ANALYZE, which is -1 if
+        # the table has never been analyzed
+        reltuples = self._db.scalar(
+            text("SELECT reltuples FROM pg_class WHERE oid = 'job'::regclass")
         )
+        return max(int(reltuples), 0)
 
-        for priority, count in priority_counts:
-            metrics[f"Custom/JobQueue/Count/Priority/{priority}"] = count
+    def _add_counts(self, metrics, now, sample_percent=100):
+        """
+        Add counts of the jobs, in a single pass over the table.
+
+        :param sample_percent: count only a random sample of this percentage
+            of the table's pages, and scale the counts up to match
+        """
+        job = Job
+        if sample_percent < 100:
+            job = aliased(Job, tablesample(Job, func.system(sample_percent)))
 
-        # Total unexpired jobs.
-        metrics["Custom/JobQueue/Count/Total"] = sum(
-            count for _, count in priority_counts
+        rows = self._db.execute(
+            select(
+                job.name,
+                job.tag,
+                job.priority,
+                func.count().filter(job.expires_at < now),
+                func.count().filter(job.expires_at >= now),
+            ).group_by(job.name, job.tag, job.priority)
         )
 
-        return metrics.items()
+        counts = defaultdict(int)
+        counts["Custom/JobQueue/Count/Expired"] = 0
+        counts["Custom/JobQueue/Count/Total"] = 0
+
+        for name, tag, priority, expired, unexpired in rows:
+            counts["Custom/JobQueue/Count/Expired"] += expired
+
+            if unexpired:
+                counts[f"Custom/JobQueue/Count/Name/{name}/Tag/{tag}"] += unexpired
+                counts[f"Custom/JobQueue/Count/Name/{name}/Total"] += unexpired
+                counts[f"Custom/JobQueue/Count/Priority/{priority}"] += unexpired
+                counts["Custom/JobQueue/Count/Total"] += unexpired
+
+        for key, count in counts.items():
+            metrics[key] = round(count * 100 / sample_percent)
+
+    def _add_ages(self, metrics, now):
+        """Add the age in seconds of the oldest job waiting at each priority."""
+        for priority in self._priorities():
+            # One small query per priority can use the (priority, enqueued_at)
+            # index, where a single query for all priorities couldn't
+            enqueued_at = self._db.scalar(
+                select(Job.enqueued_at)
+                .where(
+                    Job.priority == priority,
+                    Job.expires_at >= now,
+                    Job.scheduled_at < now,
+                )
+                .order_by(Job.enqueued_at)
+                .limit(1)
+            )
+
+            if enqueued_at:
+                age = int((now - enqueued_at).total_seconds())
+                metrics[f"Custom/JobQueue/Age/Priority/{priority}"] = age
+                metrics["Custom/JobQueue/Age/Oldest"] = max(
+                    metrics["Custom/JobQueue/Age/Oldest"], age
+                )
+
+    def _priorities(self):
+        """
+        Return the distinct priorities of the jobs in the queue.
+
+        Jobs aren't only added with the `Priority` values (user purges are
+        added with priority 0, for example). Rather than scanning the whole
+        table, this finds each priority with one lookup in the (priority,
+        enqueued_at) index: a "loose index scan".
+        """
+        return self._db.scalars(
+            text(
+                "WITH RECURSIVE priorities(priority) AS ("
+                "SELECT min(priority) FROM job "
+                "UNION ALL "
+                "SELECT (SELECT min(priority) FROM job "
+                "WHERE priority > priorities.priority) "
+                "FROM priorities WHERE priorities.priority IS NOT NULL"
+                ") "
+                "SELECT priority FROM priorities WHERE priority IS NOT NULL"
+            )
+        ).all()
+
+    def _add_rates(self, metrics):
+        """Add the rates jobs have been added and removed since the last call."""
+        global _previous_sample
+
+        # Postgres already keeps counters of jobs added (the ID sequence) and
+        # removed (the table's statistics) which are cheap to read
+        enqueued, dequeued = self._db.execute(
+            text(
+                "SELECT "
+                "(SELECT last_value FROM job_id_seq), "
+                "(SELECT n_tup_del FROM pg_stat_user_tables "
+                "WHERE relid = 'job'::regclass)"
+            )
+        ).one()
+        sample = Sample(monotonic(), enqueued, dequeued)
+        previous, _previous_sample = _previous_sample, sample
+
+        if previous is None or sample.time <= previous.time:
+            return
+
+        seconds = sample.time - previous.time
+        for key in ("enqueued", "dequeued"):
+            count = getattr(sample, key) - getattr(previous, key)
+            # The counts go backwards if the sequence cycles or the statistics
+            # are reset, in which case we don't know the rate
+            if count >= 0:
+                metrics[f"Custom/JobQueue/Rate/{key.capitalize()}"] = count / seconds
 
 
 def factory(_context, request):
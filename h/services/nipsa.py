@@ -42,6 +42,29 @@ class NipsaService:
         user = self.session.query(User).filter_by(userid=userid).one_or_none()
         return user and user.nipsa
 
+    def flagged_userids(self, userids):
+        """
+        Return the subset of the given userids which are flagged as "NIPSA".
+
+        This looks up all of the userids in a single query (or uses the cache
+        if it's populated), which is much cheaper than calling `is_flagged`
+        for each of them when presenting many annotations at once.
+
+        :rtype: set of unicode strings
+        """
+        userids = set(userids)
+
+        if self._flagged_userids is not None:
+            return userids & self._flagged_userids
+
+        if not userids:
+            return set()
+
+        query = self.session.query(User).filter(
+            User.userid.in_(userids), User.nipsa.is_(True)
+        )
+        return {u.userid for u in query}
+
     def flag(self, user):
         """
         Add a NIPSA flag for a user.
@@ -74,7 +97,7 @@ class NipsaService:
 
     def _reindex_users_annotations(self, user, tag):
         tasks.job_queue.add_annotations_from_user.delay(
-            "sync_annotation", user.userid, tag=tag, force=True, schedule_in=30
+            "sync_annotation", user.userid, tag=tag, schedule_in=30
         )
 
 
@@ -0,0 +1,188 @@
+import hashlib
+import json
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from time import monotonic
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from h.models import Feature, FeatureCohortUser, Group, GroupMembership, User
+from h.models.feature_cohort import FEATURECOHORT_FEATURE_TABLE
+
+# A profile document, along with an ETag for its contents
+CachedProfile = namedtuple("CachedProfile", ["profile", "etag"])  # noqa: PYI024
+
+# A cached profile, along with the fingerprint of the rows it was built from
+_Entry = namedtuple("_Entry", ["cached_profile", "fingerprint", "expires_at"])  # noqa: PYI024
+
+
+class ProfileCache:
+    """
+    A process-level cache of the profile documents returned to the client.
+
+    Assembling a profile means loading the user's groups, evaluating every
+    feature flag for the user and reading their preferences, and the client
+    asks for it every time it boots and every time the session changes.
+    Profiles are cached for `ttl` seconds, keyed by the ID of the user (or
+    None for logged-out users) and whatever else the profile depends on.
+
+    Nothing has to remember to invalidate the cache. Each time a profile is
+    read from the cache it's checked against a fingerprint of the user, their
+    groups, the authority's world group and the feature flags, which is read
+    from the DB with a single query (see `fingerprint()`). Any change to those
+    rows, committed by any process, means the profile is built again, so its
+    ETag changes too.
+    """
+
+    def __init__(self, ttl=30, maxsize=10_000):
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def fingerprint(session, user_id, authority):
+        """
+        Return a fingerprint of the rows a profile is built from.
+
+        This must be read before the profile is built, so that any change
+        committed while the profile is being built changes the fingerprint
+        rather than being missed.
+
+        :param session: the SQLAlchemy session object
+        :param user_id: the ID of the profile's user, or None
+        :param authority: the authority of the profile's world group
+        """
+        user = (
+            select(
+                func.json_build_array(
+                    User.authority,
+                    User.admin,
+                    User.staff,
+                    User.display_name,
+                    User.sidebar_tutorial_dismissed,
+                )
+            )
+            .where(User.id == user_id)
+            .scalar_subquery()
+        )
+        groups = (
+            select(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_array(
+                            Group.id, Group.pubid, Group.name, Group.readable_by
+                        ),
+                        Group.id,
+                    )
+                )
+            )
+            .where(
+                or_(
+                    Group.id.in_(
+                        select(GroupMembership.group_id).where(
+                            GroupMembership.user_id == user_id
+                        )
+                    ),
+                    (Group.authority == authority) & (Group.pubid == "__world__"),
+                )
+            )
+            .scalar_subquery()
+        )
+        features = select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_array(
+                        Feature.name,
+                        Feature.everyone,
+                        Feature.first_party,
+                        Feature.admins,
+                        Feature.staff,
+                    ),
+                    Feature.id,
+                )
+            )
+        ).scalar_subquery()
+        cohort_features = (
+            select(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_array(
+                            FEATURECOHORT_FEATURE_TABLE.c.cohort_id,
+                            FEATURECOHORT_FEATURE_TABLE.c.feature_id,
+                        ),
+                        FEATURECOHORT_FEATURE_TABLE.c.id,
+                    )
+                )
+            )
+            .where(
+                FEATURECOHORT_FEATURE_TABLE.c.cohort_id.in_(
+                    select(FeatureCohortUser.cohort_id).where(
+                        FeatureCohortUser.user_id == user_id
+                    )
+                )
+            )
+            .scalar_subquery()
+        )
+
+        return tuple(
+            session.execute(select(user, groups, features, cohort_features)).one()
+        )
+
+    def get(self, key, fingerprint):
+        """
+        Return the cached `CachedProfile` for `key`, or None.
+
+        :param key: a tuple of everything the profile depends on
+        :param fingerprint: the current fingerprint for the profile (see
+            `fingerprint()`), which must match the cached profile's
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if entry.expires_at <= monotonic() or entry.fingerprint != fingerprint:
+                del self._entries[key]
+                return None
+
+            return entry.cached_profile
+
+    def set(self, key, profile, fingerprint):
+        """
+        Cache `profile` and return it as a `CachedProfile`.
+
+        :param key: a tuple of everything the profile depends on
+        :param profile: the profile document, which mustn't be modified once
+            it's cached
+        :param fingerprint: the fingerprint for the profile (see
+            `fingerprint()`) from before the profile was built
+        """
+        cached_profile = CachedProfile(profile, self.etag(profile))
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = _Entry(
+                cached_profile, fingerprint, monotonic() + self._ttl
+            )
+
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+        return cached_profile
+
+    @staticmethod
+    def etag(profile):
+        """Return an ETag which changes whenever `profile`'s contents do."""
+        return hashlib.sha256(
+            json.dumps(profile, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+
+# Profiles are shared by all requests in the process
+_profile_cache = ProfileCache()
+
+
+def profile_cache_factory(_context, _request):
+    return _profile_cache
@@ -1,3 +1,5 @@
+from elasticsearch import helpers as es_helpers
+from elasticsearch.exceptions import NotFoundError
 from h_pyramid_sentry import report_exception
 
 from h import tasks
@@ -12,7 +14,12 @@ class SearchIndexService:
     REINDEX_SETTING_KEY = "reindex.new_index"
 
     def __init__(
-        self, request, es, settings, annotation_read_service: AnnotationReadService
+        self,
+        request,
+        es,
+        settings,
+        annotation_read_service: AnnotationReadService,
+        batch_events=False,  # noqa: FBT002
     ):
         """
         Create an instance of the service.
@@ -21,11 +28,18 @@ class SearchIndexService:
         :param es: Elasticsearch client
         :param settings: Instance of settings (or other object with `get()`)
         :param annotation_read_service: AnnotationReadService instance
+        :param batch_events: Accumulate the annotation events handled during
+            the request and index them all with one bulk request at the end
+            of it, rather than indexing each one as it is handled
         """
         self._request = request
         self._es = es
         self._settings = settings
         self._annotation_read_service = annotation_read_service
+        self._batch_events = batch_events
+
+        # The action of the latest pending event for each annotation id
+        self._pending_events: dict[str, str] = {}
 
     def add_annotation_by_id(self, annotation_id):
         """
@@ -46,7 +60,46 @@ class SearchIndexService:
         self.add_annotation(annotation)
 
         if annotation.is_reply:
-            self.add_annotation_by_id(annotation.thread_root_id)
+            self.update_thread_root_by_id(annotation.thread_root_id)
+
+    def update_thread_root_by_id(self, annotation_id):
+        """
+        Refresh the thread fields of a thread root in the search index.
+
+        Adding a reply only changes the fields of the root's document which
+        are derived from its thread, so rather than presenting and indexing
+        the whole root again this sends a partial update of just those. If the
+        root isn't in the index yet it's indexed in full instead.
+
+        If no annotation is found, nothing happens.
+
+        :param annotation_id: Id of the thread root annotation.
+        """
+        annotation = self._annotation_read_service.get_annotation_by_id(annotation_id)
+        if not annotation or annotation.deleted:
+            return
+
+        fields = AnnotationSearchIndexPresenter(
+            annotation, self._request
+        ).thread_fields()
+
+        for index in self._target_indexes():
+            try:
+                self._es.conn.update(
+                    index=index,
+                    doc_type=self._es.mapping_type,
+                    id=annotation.id,
+                    body={"doc": fields},
+                )
+            except NotFoundError:
+                self._es.conn.index(
+                    index=index,
+                    doc_type=self._es.mapping_type,
+                    body=AnnotationSearchIndexPresenter(
+                        annotation, self._request
+                    ).asdict(),
+                    id=annotation.id,
+                )
 
     def add_annotation(self, annotation, *, refresh=False):
         """
@@ -104,6 +157,13 @@ class SearchIndexService:
         else:
             return False
 
+        if self._batch_events:
+            if not self._pending_events:
+                self._request.add_finished_callback(self._flush_events_callback)
+
+            self._pending_events[event.annotation_id] = event.action
+            return True
+
         try:
             return sync_handler(event.annotation_id)
 
@@ -113,6 +173,125 @@ class SearchIndexService:
         # Either the synchronous method was disabled, or failed...
         return async_task.delay(event.annotation_id)
 
+    def flush_events(self):
+        """
+        Index all pending annotation events with a single bulk request.
+
+        This covers the annotations from the events, partial updates of the
+        thread roots of any replies among them (one per root, however many
+        replies it has) and, if a reindex is in progress, the copies of all of
+        these in the new index too. Anything that fails to index is retried
+        with the async tasks.
+        """
+        events, self._pending_events = self._pending_events, {}
+        if not events:
+            return
+
+        try:
+            errored = self._bulk_index(
+                add_ids=[id_ for id_, action in events.items() if action != "delete"],
+                delete_ids=[
+                    id_ for id_, action in events.items() if action == "delete"
+                ],
+            )
+        except Exception as err:  # noqa: BLE001
+            report_exception(err)
+            errored = set(events)
+
+        for annotation_id in errored:
+            if events.get(annotation_id) == "delete":
+                tasks.indexer.delete_annotation.delay(annotation_id)
+            else:
+                tasks.indexer.add_annotation.delay(annotation_id)
+
+    def _flush_events_callback(self, request):
+        # Like the subscriber which handles the events, this runs after the
+        # main transaction has closed, so we need a new one
+        with request.tm:
+            self.flush_events()
+
+    def _bulk_index(self, add_ids, delete_ids):
+        annotations, roots = self._get_annotations_to_index(add_ids)
+        bodies = AnnotationSearchIndexPresenter.present_all(annotations, self._request)
+        root_fields = AnnotationSearchIndexPresenter.present_thread_fields_all(
+            roots, self._request
+        )
+
+        documents = (
+            [
+                ("index", annotation.id, {"_source": body})
+                for annotation, body in zip(annotations, bodies, strict=True)
+            ]
+            + [
+                ("update", root.id, {"doc": fields})
+                for root, fields in zip(roots, root_fields, strict=True)
+            ]
+            + [
+                ("index", annotation_id, {"_source": {"deleted": True}})
+                for annotation_id in delete_ids
+            ]
+        )
+
+        _, errors = es_helpers.bulk(
+            self._es.conn,
+            (
+                {
+                    "_op_type": op_type,
+                    "_index": index,
+                    "_type": self._es.mapping_type,
+                    "_id": annotation_id,
+                    **body,
+                }
+                for index in self._target_indexes()
+                for op_type, annotation_id, body in documents
+            ),
+            raise_on_error=False,
+        )
+
+        # Errors look like `{"index": {"_id": ..., "error": ...}}`, keyed by
+        # the op type. This includes partial updates of roots which haven't
+        # been indexed yet, which are retried by adding them in full
+        return {item["_id"] for error in errors for item in error.values()}
+
+    def _get_annotations_to_index(self, annotation_ids):
+        annotations = [
+            annotation
+            for annotation in self._annotation_read_service.get_annotations_by_id(
+                annotation_ids
+            )
+            if not annotation.deleted
+        ]
+
+        # Adding a reply changes its thread root's document too, so update the
+        # roots as well (as `add_annotation_by_id()` does)
+        loaded_ids = {annotation.id for annotation in annotations}
+        root_ids = list(
+            {
+                annotation.thread_root_id: None
+                for annotation in annotations
+                if annotation.is_reply and annotation.thread_root_id not in loaded_ids
+            }
+        )
+        roots = []
+        if root_ids:
+            roots = [
+                annotation
+                for annotation in self._annotation_read_service.get_annotations_by_id(
+                    root_ids
+                )
+                if not annotation.deleted
+            ]
+
+        return annotations, roots
+
+    def _target_indexes(self):
+        """Return the indexes to write to: the current one, and any new one."""
+        target_indexes = [self._es.index]
+        if future_index := self._settings.get(self.REINDEX_SETTING_KEY):
+            target_indexes.append(future_index)
+
+        return target_indexes
+
     def _index_annotation_body(self, annotation_id, body, refresh, target_index=None):
         self._es.conn.index(
             index=self._es.index if target_index is None else target_index,
@@ -140,4 +319,5 @@ def factory(_context, request):
         es=request.es,
         settings=request.find_service(name="settings"),
         annotation_read_service=request.find_service(AnnotationReadService),
+        batch_events=request.registry.settings.get("es.batch_indexing", False),
     )
@@ -9,12 +9,10 @@ from h.security.policy.top_level import HTML_AUTHCOOKIE_MAX_AGE
 
 
 def model(request):
-    session = {}
-    session["userid"] = request.authenticated_userid
-    session["groups"] = _current_groups(request, request.default_authority)
-    session["features"] = request.feature.all()
-    session["preferences"] = _user_preferences(request.user)
-    return session
+    profile_ = _cached_profile(request, request.default_authority).profile
+    return {
+        key: profile_[key] for key in ("userid", "groups", "features", "preferences")
+    }
 
 
 def profile(request, authority=None):
@@ -26,6 +24,16 @@ def profile(request, authority=None):
     used to find public groups (by default, this is the `authority` of the
     request). This parameter is ignored for authenticated requests.
 
+    """
+    return versioned_profile(request, authority).profile
+
+
+def versioned_profile(request, authority=None):
+    """
+    Return the current user's profile, along with an ETag for it.
+
+    This takes the same arguments as `profile()`, and returns a
+    `CachedProfile` whose `etag` changes whenever the profile does.
     """
     user = request.user
 
@@ -34,6 +42,30 @@ def profile(request, authority=None):
     else:
         authority = authority or request.default_authority
 
+    return _cached_profile(request, authority)
+
+
+def _cached_profile(request, authority):
+    """Return the profile for `authority`, from the cache if possible."""
+    user = request.user
+    cache = request.find_service(name="profile_cache")
+
+    fingerprint = cache.fingerprint(request.db, user.id if user else None, authority)
+    key = (
+        user.id if user else None,
+        request.authenticated_userid,
+        authority,
+        request.application_url,
+        tuple(sorted((request.find_service(name="feature").overrides or {}).items())),
+    )
+    return cache.get(key, fingerprint) or cache.set(
+        key, _profile(request, authority), fingerprint
+    )
+
+
+def _profile(request, authority):
+    user = request.user
+
     return dict(
         {
             "userid": request.authenticated_userid,
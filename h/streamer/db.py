@@ -1,26 +1,101 @@
 import logging
+import os
 from contextlib import contextmanager
+from time import monotonic
 
-from sqlalchemy import text
+from sqlalchemy import event, text
 
 from h import db
+from h.streamer.work_queue import LatencyStats
 
 LOG = logging.getLogger(__name__)
 
+# The statements used to start a transaction in each supported isolation level
+ISOLATION_LEVELS = {
+    "SERIALIZABLE": "SET TRANSACTION ISOLATION LEVEL SERIALIZABLE READ ONLY DEFERRABLE",
+    # DEFERRABLE serializable transactions can block waiting for a safe
+    # snapshot under contention. Repeatable read transactions never wait, at
+    # the cost of (very rarely) seeing a state which never existed serially.
+    "REPEATABLE READ": "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY",
+}
 
-def get_session(settings):
-    """Get a DB session from the provided settings."""
-    return db.Session(bind=db.create_engine(settings["sqlalchemy.url"]))
+# The isolation level to read from the database in
+ISOLATION_LEVEL = os.environ.get("STREAMER_ISOLATION_LEVEL", "SERIALIZABLE")
+
+# Options for the engine shared by all of the streamer's sessions. Each worker
+# holds a session, but only uses a connection while it's handling a message
+# which reads from the DB, so the pool only needs to be about as big as the
+# number of workers.
+ENGINE_OPTIONS = {
+    "pool_size": int(os.environ.get("STREAMER_DB_POOL_SIZE", "10")),
+    "max_overflow": 5,
+    # Recycle connections before any proxies between us and the DB close them
+    "pool_recycle": 3600,
+}
+
+
+class TransactionStats(LatencyStats):
+    """Timings of the transactions messages are handled in."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = 0
+        """The number of transactions which actually queried the DB."""
+
+    def merge(self, other):
+        super().merge(other)
+        self.started += other.started
+
+    def reset(self):
+        super().reset()
+        self.started = 0
+
+
+TRANSACTION_STATS = TransactionStats()
+
+_engines = {}
+
+
+def get_session(settings, isolation_level=None):
+    """
+    Get a DB session from the provided settings.
+
+    The session starts read only transactions in `isolation_level` (one of
+    `ISOLATION_LEVELS`), but only when it's first used to query the DB. This
+    means handling a message which doesn't touch the DB doesn't cost any
+    round trips to it.
+    """
+    set_transaction = text(ISOLATION_LEVELS[isolation_level or ISOLATION_LEVEL])
+
+    url = settings["sqlalchemy.url"]
+    if url not in _engines:
+        _engines[url] = db.create_engine(url, **ENGINE_OPTIONS)
+
+    session = db.Session(bind=_engines[url])
+
+    @event.listens_for(session, "after_begin")
+    def set_transaction_mode(_session, _transaction, connection):
+        connection.execute(set_transaction)
+        TRANSACTION_STATS.started += 1
+
+    return session
+
+
+def take_transaction_stats():
+    """Get the transaction timings since this was last called."""
+    stats = TransactionStats()
+    stats.merge(TRANSACTION_STATS)
+    TRANSACTION_STATS.reset()
+
+    return stats
 
 
 @contextmanager
 def read_only_transaction(session):
     """Wrap a call in a read only transaction context manager."""
-    try:
-        session.execute(
-            text("SET TRANSACTION ISOLATION LEVEL SERIALIZABLE READ ONLY DEFERRABLE")
-        )
+    start = monotonic()
 
+    try:
         yield
 
     except (KeyboardInterrupt, SystemExit):
@@ -33,3 +108,4 @@ def read_only_transaction(session):
         session.commit()
     finally:
         session.close()
+        TRANSACTION_STATS.record(monotonic() - start)
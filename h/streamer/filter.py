@@ -1,3 +1,10 @@
+import weakref
+from collections import OrderedDict, defaultdict
+from collections.abc import Hashable
+from datetime import datetime
+from time import monotonic
+from typing import ClassVar, NamedTuple
+
 from h import storage
 from h.util.uri import normalize as normalize_uri
 
@@ -25,9 +32,107 @@ FILTER_SCHEMA = {
 }
 
 
+class _CachedExpansion(NamedTuple):
+    expires: float
+    document_id: int | None
+    document_updated: datetime | None
+    uris: frozenset
+
+
+class URIExpansionCache:
+    """
+    A bounded, time limited cache of expanded (normalized) annotation URIs.
+
+    Bursts of annotation events on the same page would otherwise each need to
+    expand the same URI with `storage.expand_uri()`, which hits the DB.
+
+    Entries are keyed by the normalized and the raw target URI. The raw URI
+    is needed as well because `storage.expand_uri()` doesn't expand a URI
+    which exactly matches a document's rel-canonical URI, so URIs which
+    normalize to the same thing can still expand differently. Entries also
+    remember the document they were expanded for and when it was last
+    updated. They are discarded when:
+
+    * They are older than `ttl` seconds
+    * They are the least recently used and the cache is full
+    * An annotation event arrives for the URI with a different document to the
+      one we saw when caching it (e.g. because documents have been merged)
+    * The document has been updated since we cached the URI. Document URIs are
+      only added by `update_document_metadata()`, which always updates the
+      document, so this tells us when the expansion might have changed
+    """
+
+    def __init__(self, maxsize=4096, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple[str, str], _CachedExpansion] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def expand_uri(self, session, uri, document=None):
+        """
+        Return the normalized expansion of `uri` using the cache if possible.
+
+        :param session: DB session to use if the value isn't cached
+        :param uri: URI to expand
+        :param document: The document the URI is associated with
+        :return: A frozenset of normalized URIs
+        """
+        key = (normalize_uri(uri), uri)
+        document_id = document.id if document else None
+        document_updated = document.updated if document else None
+
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and entry.expires > monotonic()
+            and entry.document_id == document_id
+            and entry.document_updated == document_updated
+        ):
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.uris
+
+        self.misses += 1
+        uris = frozenset(storage.expand_uri(session, uri, normalized=True))
+
+        self._entries[key] = _CachedExpansion(
+            expires=monotonic() + self.ttl,
+            document_id=document_id,
+            document_updated=document_updated,
+            uris=uris,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+        return uris
+
+    def clear(self):
+        """Remove all entries from the cache and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
 class SocketFilter:
     KNOWN_FIELDS = {"/id", "/group", "/uri", "/references"}  # noqa: RUF012
 
+    # Inverted index of (field, value) pairs to the sockets which have a
+    # filter row for them. This is maintained by `set_filter()` and
+    # `remove_filter()` and lets `matching()` find interested sockets with a
+    # handful of dict lookups, rather than checking every row of every socket.
+    # Sockets are held weakly, so they can't leak if they are never removed.
+    _index: ClassVar[dict[tuple, weakref.WeakSet]] = defaultdict(weakref.WeakSet)
+
+    # Cache of expanded URIs, shared by every event processed by this process
+    uri_cache = URIExpansionCache()
+
     @classmethod
     def matching(cls, sockets, annotation, session):
         """
@@ -48,26 +153,28 @@ class SocketFilter:
             "/group": [annotation.groupid],
             # Expand the URI to ensure we match any variants of it. This should
             # match the normalization when searching (see `h.search.query`)
-            "/uri": set(
-                storage.expand_uri(session, annotation.target_uri, normalized=True)
+            "/uri": cls.uri_cache.expand_uri(
+                session, annotation.target_uri, annotation.document
             ),
             "/references": set(annotation.references),
         }
 
-        for socket in sockets:
-            # Some sockets might not yet have the filter applied (or had a non
-            # parsable filter etc.)
-            if not hasattr(socket, "filter_rows"):
-                continue
+        candidates = set()
+        for field, field_values in values.items():
+            for value in field_values:
+                if sockets_for_row := cls._index.get((field, value)):
+                    candidates.update(sockets_for_row)
+
+        if not candidates:
+            return
 
-            # Iterate over the filter_rows added by `set_filter()`
-            for field, value in socket.filter_rows:
-                try:
-                    if value in values[field]:
-                        yield socket
-                        break
-                except KeyError:
-                    continue
+        # Only return sockets we were asked about, in the order we were given
+        # them. Some sockets might not yet have had the filter applied (or had
+        # a non parsable filter etc.) in which case they will never have been
+        # added to the index.
+        for socket in sockets:
+            if socket in candidates:
+                yield socket
 
     @classmethod
     def set_filter(cls, socket, filter_):
@@ -77,8 +184,33 @@ class SocketFilter:
         :param socket: Socket to add filtering information too
         :param filter_: Filter JSON to process
         """
+        cls.remove_filter(socket)
+
         socket.filter_rows = tuple(cls._rows_for(filter_))
 
+        for row in socket.filter_rows:
+            cls._index[row].add(socket)
+
+    @classmethod
+    def remove_filter(cls, socket):
+        """
+        Remove any filtering information previously added to a socket.
+
+        After this the socket will no longer be returned by `matching()`.
+
+        :param socket: Socket to remove filtering information from
+        """
+        for row in getattr(socket, "filter_rows", ()):
+            sockets_for_row = cls._index.get(row)
+            if sockets_for_row is None:
+                continue
+
+            sockets_for_row.discard(socket)
+            if not sockets_for_row:
+                del cls._index[row]
+
+        socket.filter_rows = ()
+
     @classmethod
     def _rows_for(cls, filter_):
         """Convert a filter to field value pairs."""
@@ -90,7 +222,12 @@ class SocketFilter:
             values = clause["value"]
 
             # Normalize to an iterable of distinct values
-            values = set(values) if isinstance(values, list) else [values]
+            values = dict.fromkeys(
+                value
+                for value in (values if isinstance(values, list) else [values])
+                # Values we can't index (like objects) could never match
+                if isinstance(value, Hashable)
+            )
 
             for value in values:
                 if field == "/uri":
@@ -1,17 +1,19 @@
 import logging
+import os
 from collections import namedtuple
 from itertools import chain
+from time import monotonic
 
-from gevent.queue import Full
+from gevent.queue import Empty
 
 from h import realtime
+from h.models import Annotation
 from h.realtime import Consumer
-from h.security import Permission, identity_permits
+from h.security import RealtimeReaders
 from h.services.annotation_read import AnnotationReadService
 from h.streamer import websocket
 from h.streamer.contexts import request_context
 from h.streamer.filter import SocketFilter
-from h.traversal import AnnotationContext
 
 log = logging.getLogger(__name__)
 
@@ -19,6 +21,15 @@ log = logging.getLogger(__name__)
 # An incoming message from a subscribed realtime consumer
 Message = namedtuple("Message", ["topic", "payload"])  # noqa: PYI024
 
+# How long to wait for more messages from the same topic once a burst of them
+# has started, so bursts of events (like several quick edits to one annotation)
+# can be handled together. Set to 0 to only batch messages which are already
+# queued.
+COALESCE_WINDOW = float(os.environ.get("STREAMER_COALESCE_WINDOW", "0.05"))
+
+# The most messages to handle together in one batch
+COALESCE_MAX_BATCH = 100
+
 
 def process_messages(settings, routing_key, work_queue, raise_error=True):  # noqa: FBT002
     """
@@ -30,14 +41,8 @@ def process_messages(settings, routing_key, work_queue, raise_error=True):  # no
     """
 
     def _handler(payload):
-        message = Message(topic=routing_key, payload=payload)
-        try:
-            work_queue.put(message, timeout=0.1)
-        except Full:  # pragma: no cover
-            log.warning(
-                "Streamer work queue full! Unable to queue message from "
-                "h.realtime having waited 0.1s: giving up."
-            )
+        # If the queue is full this message will be dropped (and logged)
+        work_queue.put(Message(topic=routing_key, payload=payload))
 
     conn = realtime.get_connection(settings)
     consumer = Consumer(connection=conn, routing_key=routing_key, handler=_handler)
@@ -47,22 +52,60 @@ def process_messages(settings, routing_key, work_queue, raise_error=True):  # no
         raise RuntimeError("Realtime consumer quit unexpectedly!")  # noqa: EM101, TRY003
 
 
-def handle_message(message, registry, session, topic_handlers):
+def collect_messages(
+    message, queue, window=COALESCE_WINDOW, max_batch=COALESCE_MAX_BATCH
+):
+    """
+    Collect a batch of messages from the same topic as `message`.
+
+    This takes any messages from `message`'s topic which are already waiting
+    on `queue`. If there are some, we're in the middle of a burst of events,
+    so this then waits up to `window` seconds for more of them to arrive. A
+    lone message is returned straight away, so it isn't delayed.
+
+    Collection stops at the first message on the queue which isn't from the
+    same topic, which is left on the queue. This means messages are still
+    handled in the order they arrive.
+    """
+    batch = [message]
+    deadline = None
+
+    while len(batch) < max_batch:
+        remaining = deadline - monotonic() if deadline else 0
+        try:
+            next_message = queue.peek(block=remaining > 0, timeout=remaining)
+        except Empty:
+            break
+
+        if not (
+            isinstance(next_message, Message) and next_message.topic == message.topic
+        ):
+            break
+
+        batch.append(queue.get())
+
+        if deadline is None:
+            deadline = monotonic() + window
+
+    return batch
+
+
+def handle_messages(batch, registry, session, topic_handlers):
     """
-    Deserialize and process a message from the reader.
-
-    For each message, `handler` is called with the deserialized message and a
-    single :py:class:`h.streamer.WebSocket` instance, and should return the
-    message to be sent to the client on that socket. The handler can return
-    `None`, to signify that no message should be sent, or a JSON-serializable
-    object. It is assumed that there is a 1:1 request-reply mapping between
-    incoming messages and messages to be sent out over the websockets.
+    Deserialize and process a batch of messages from the reader.
+
+    All of the messages in `batch` must be from the same topic. The handler for
+    the topic is called with a list of the message payloads and a list of
+    :py:class:`h.streamer.WebSocket` instances, and is responsible for sending
+    any replies to the sockets.
     """
+    topic = batch[0].topic
+
     try:
-        handler = topic_handlers[message.topic]
+        handler = topic_handlers[topic]
     except KeyError as err:
         raise RuntimeError(  # noqa: TRY003
-            f"Don't know how to handle message from topic: {message.topic}"  # noqa: EM102
+            f"Don't know how to handle message from topic: {topic}"  # noqa: EM102
         ) from err
 
     # N.B. We iterate over a non-weak list of instances because there's nothing
@@ -74,38 +117,105 @@ def handle_message(message, registry, session, topic_handlers):
     # dependency of some of the authorization logic used to look up annotation
     # and group permissions.
     with request_context(registry) as request:
-        handler(message.payload, sockets, request, session)
+        handler([message.payload for message in batch], sockets, request, session)
 
 
-def handle_user_event(message, sockets, _request, _session):
+def handle_user_events(messages, sockets, _request, _session):
     # for session state change events, the full session model
     # is included so that clients can update themselves without
     # further API requests
 
-    reply = None
+    for message in messages:
+        reply = None
+
+        for socket in sockets:
+            if not socket.identity or socket.identity.user.userid != message["userid"]:
+                continue
+
+            if reply is None:
+                reply = websocket.encode_json(
+                    {
+                        "type": "session-change",
+                        "action": message["type"],
+                        "model": message["session_model"],
+                    }
+                )
+
+            socket.send_encoded(reply)
+
+
+def handle_annotation_events(messages, sockets, request, session):
+    messages = coalesce_annotation_events(messages)
+
+    # Fetch all of the annotations we need in one query, along with their
+    # documents which are needed to match and present them
+    annotations = {
+        annotation.id: annotation
+        for annotation in request.find_service(
+            AnnotationReadService
+        ).get_annotations_by_id(
+            list({message["annotation_id"] for message in messages}),
+            eager_load=[Annotation.document],
+        )
+    }
+
+    for message in messages:
+        id_ = message["annotation_id"]
+        annotation = annotations.get(id_)
 
-    for socket in sockets:
-        if not socket.identity or socket.identity.user.userid != message["userid"]:
+        if annotation is None:
+            log.warning("received annotation event for missing annotation: %s", id_)
             continue
 
-        if reply is None:
-            reply = {
-                "type": "session-change",
-                "action": message["type"],
-                "model": message["session_model"],
-            }
+        _send_annotation_event(message, annotation, sockets, request, session)
 
-        socket.send_json(reply)
 
+def coalesce_annotation_events(messages):
+    """
+    Collapse multiple events about the same annotation into one.
 
-def handle_annotation_event(message, sockets, request, session):
-    id_ = message["annotation_id"]
-    annotation = request.find_service(AnnotationReadService).get_annotation_by_id(id_)
+    As we always send the current state of the annotation, only the last event
+    about an annotation from each client needs to be sent. The exceptions are:
 
-    if annotation is None:
-        log.warning("received annotation event for missing annotation: %s", id_)
-        return
+    * If the annotation was created then updated in the batch, we send a
+      single `create` so clients still see it as a new annotation
+    * If the annotation was deleted, we always send a `delete`
 
+    Events from different clients are kept separate, as clients don't receive
+    notifications of their own events.
+    """
+    events = {}
+
+    for message in messages:
+        key = (message["annotation_id"], message["src_client_id"])
+        previous = events.pop(key, None)
+
+        if (
+            previous
+            and previous["action"] == "create"
+            and message["action"] != "delete"
+        ):
+            message = {**message, "action": "create"}  # noqa: PLW2901
+
+        # Re-inserting the event means events are ordered by when they last
+        # happened
+        events[key] = message
+
+    return list(events.values())
+
+
+def _send_annotation_event(message, annotation, sockets, request, session):
+    try:
+        _send_annotation_event_to_sockets(
+            message, annotation, sockets, request, session
+        )
+    except Exception:
+        # Events are handled in batches, so don't let a problem with one
+        # annotation stop the events for the others being sent
+        log.exception("failed to send annotation event: %s", message["annotation_id"])
+
+
+def _send_annotation_event_to_sockets(message, annotation, sockets, request, session):
     # Find connected clients which are interested in this annotation.
     matching_sockets = SocketFilter.matching(sockets, annotation, session)
 
@@ -119,10 +229,15 @@ def handle_annotation_event(message, sockets, request, session):
     # Create a generator which has the first socket back again
     matching_sockets = chain((first_socket,), matching_sockets)
 
-    reply = _generate_annotation_event(request, message, annotation)
+    # Serialize the reply once, rather than once for every socket we send it to
+    reply = websocket.encode_json(
+        _generate_annotation_event(request, message, annotation)
+    )
 
     annotator_nipsad = request.find_service(name="nipsa").is_flagged(annotation.userid)
-    annotation_context = AnnotationContext(annotation)
+    # Work out who can read the annotation once, rather than re-evaluating the
+    # permissions from scratch for every socket
+    readers = RealtimeReaders.for_annotation(annotation)
 
     for socket in matching_sockets:
         # Don't send notifications back to the person who sent them
@@ -138,14 +253,10 @@ def handle_annotation_event(message, sockets, request, session):
             continue
 
         # Check whether client is authorized to read this annotation.
-        if not identity_permits(
-            socket.identity,
-            annotation_context,
-            Permission.Annotation.READ_REALTIME_UPDATES,
-        ):
+        if not readers.permits(socket.identity):
             continue
 
-        socket.send_json(reply)
+        socket.send_encoded(reply)
 
 
 def _generate_annotation_event(request, message, annotation):
@@ -5,6 +5,7 @@ import importlib_resources
 import newrelic.agent
 
 from h.streamer import db
+from h.streamer.filter import SocketFilter
 from h.streamer.websocket import WebSocket
 from h.streamer.worker import WSGIServer
 
@@ -32,6 +33,29 @@ def websocket_metrics(queue):
     yield f"{PREFIX}/Connections/Anonymous", connections_anonymous
 
     yield f"{PREFIX}/WorkQueueSize", queue.qsize()
+    yield f"{PREFIX}/WorkQueue/Dropped", queue.dropped
+
+    for lane in queue.lanes:
+        latency = queue.take_latency(lane)
+
+        yield f"{PREFIX}/WorkQueue/{lane}/Size", queue.qsize(lane)
+        yield f"{PREFIX}/WorkQueue/{lane}/Processed", latency.count
+        # In milliseconds, since the last time we reported
+        yield f"{PREFIX}/WorkQueue/{lane}/Latency/Mean", latency.mean * 1000
+        yield f"{PREFIX}/WorkQueue/{lane}/Latency/Max", latency.max * 1000
+
+    transactions = db.take_transaction_stats()
+    yield f"{PREFIX}/Transactions/Count", transactions.count
+    # Transactions are only started for messages which read from the DB
+    yield f"{PREFIX}/Transactions/Started", transactions.started
+    # In milliseconds, since the last time we reported
+    yield f"{PREFIX}/Transactions/Duration/Mean", transactions.mean * 1000
+    yield f"{PREFIX}/Transactions/Duration/Max", transactions.max * 1000
+
+    uri_cache = SocketFilter.uri_cache
+    yield f"{PREFIX}/URIExpansionCache/Size", len(uri_cache)
+    yield f"{PREFIX}/URIExpansionCache/Hits", uri_cache.hits
+    yield f"{PREFIX}/URIExpansionCache/Misses", uri_cache.misses
 
     # There really only should be one server per instance
     for server in WSGIServer.instances:
@@ -7,24 +7,25 @@ from pyramid.events import ApplicationCreated, subscriber
 
 from h.streamer import db, messages, websocket
 from h.streamer.metrics import metrics_process
+from h.streamer.work_queue import WorkQueue
 
 log = logging.getLogger(__name__)
 
+# The number of worker greenlets to process each lane of the work queue.
+WORKERS = int(os.environ.get("STREAMER_WORKERS", "4"))
+
 # Queue of messages to process, from both client websockets and message queues
-# to which the streamer is subscribed.
-#
-# The maxsize ensures that memory used by this queue is bounded. Producers
-# writing to the queue must consider their behaviour when the queue is full,
-# using .put(...) with a timeout or .put_nowait(...) as appropriate.
-WORK_QUEUE = gevent.queue.Queue(maxsize=4096)
+# to which the streamer is subscribed. See `WorkQueue` for how these are split
+# between the workers.
+WORK_QUEUE = WorkQueue(shards=WORKERS, maxsize=4096)
 
 # Message queues that the streamer processes messages from
 ANNOTATION_TOPIC = "annotation"
 USER_TOPIC = "user"
 
 TOPIC_HANDLERS = {
-    ANNOTATION_TOPIC: messages.handle_annotation_event,
-    USER_TOPIC: messages.handle_user_event,
+    ANNOTATION_TOPIC: messages.handle_annotation_events,
+    USER_TOPIC: messages.handle_user_events,
 }
 
 
@@ -38,7 +39,8 @@ def start(event):  # pragma: no cover
     Start some greenlets to process the incoming data from the message queue.
 
     This subscriber is called when the application is booted, and kicks off
-    greenlets running `process_queue` for each message queue we subscribe to.
+    greenlets running `process_queue` for each message queue we subscribe to,
+    and workers running `process_work_queue` for each queue in the work queue.
     The function does not block.
     """
     registry = event.app.registry
@@ -48,8 +50,11 @@ def start(event):  # pragma: no cover
         # Start greenlets to process messages from RabbitMQ
         gevent.spawn(messages.process_messages, settings, ANNOTATION_TOPIC, WORK_QUEUE),
         gevent.spawn(messages.process_messages, settings, USER_TOPIC, WORK_QUEUE),
-        # And one to process the queued work
-        gevent.spawn(process_work_queue, registry, WORK_QUEUE),
+        # And one for each queue to process the queued work
+        *(
+            gevent.spawn(process_work_queue, registry, queue)
+            for queue in WORK_QUEUE.queues
+        ),
     ]
 
     if not os.environ.get("KILL_SWITCH_WEBSOCKET_METRICS"):
@@ -70,14 +75,21 @@ def process_work_queue(registry, queue):
     dispatching them as appropriate. The handling of each message is wrapped in
     code that ensures the database session is appropriately committed and
     closed between messages.
+
+    Bursts of realtime messages from the same topic are collected and handled
+    together as a batch (see `messages.collect_messages`).
     """
 
     session = db.get_session(registry.settings)
 
     for msg in queue:
+        if isinstance(msg, messages.Message):
+            # Wait for the rest of any burst before we start the transaction
+            batch = messages.collect_messages(msg, queue)
+
         with db.read_only_transaction(session):
             if isinstance(msg, messages.Message):
-                messages.handle_message(msg, registry, session, TOPIC_HANDLERS)
+                messages.handle_messages(batch, registry, session, TOPIC_HANDLERS)
             elif isinstance(msg, websocket.Message):
                 websocket.handle_message(msg, session)
             else:
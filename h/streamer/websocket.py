@@ -6,7 +6,6 @@ from collections import namedtuple
 from typing import Self
 
 import jsonschema
-from gevent.queue import Full
 from ws4py.websocket import WebSocket as _WebSocket
 
 from h.streamer.filter import FILTER_SCHEMA, SocketFilter
@@ -81,13 +80,8 @@ class WebSocket(_WebSocket):
             self.close(reason="invalid message format")
             return
 
-        try:
-            self._work_queue.put(Message(socket=self, payload=payload), timeout=0.1)
-        except Full:  # pragma: no cover
-            log.warning(
-                "Streamer work queue full! Unable to queue message from "
-                "WebSocket client having waited 0.1s: giving up."
-            )
+        # If the queue is full this message will be dropped (and logged)
+        self._work_queue.put(Message(socket=self, payload=payload))
 
     def closed(self, code, reason=None):
         if self.debug:
@@ -97,12 +91,32 @@ class WebSocket(_WebSocket):
         except KeyError:
             pass
 
+        SocketFilter.remove_filter(self)
+
     def send_json(self, payload):
         if self.debug:
             log.info("Sending message %s (terminated: %s)", payload, self.terminated)
         if not self.terminated:
             self.send(json.dumps(payload))
 
+    def send_encoded(self, data):
+        """
+        Send a message which has already been encoded with `encode_json()`.
+
+        This allows the same message to be sent to many sockets while only
+        serializing it once.
+        """
+        if self.debug:
+            log.info("Sending message %s (terminated: %s)", data, self.terminated)
+        if not self.terminated:
+            # Bytes sent without `binary=True` are sent as a text message
+            self.send(data)
+
+
+def encode_json(payload):
+    """Serialize a payload once, ready for sending with `send_encoded()`."""
+    return json.dumps(payload).encode("utf-8")
+
 
 def handle_message(message, session=None):
     """
@@ -0,0 +1,149 @@
+import logging
+from time import monotonic
+
+from gevent.queue import Full, Queue
+
+from h.streamer import messages, websocket
+
+log = logging.getLogger(__name__)
+
+
+class TimedQueue(Queue):
+    """A gevent queue which records how long items spend waiting in it."""
+
+    def __init__(self, maxsize=None):
+        super().__init__(maxsize)
+        self.latency = LatencyStats()
+
+    # We wrap items with the time they were queued as they go in, and unwrap
+    # them as they come out. These are the hooks gevent's `Queue` provides
+    # for customising storage.
+    def _put(self, item):
+        super()._put((monotonic(), item))
+
+    def _get(self):
+        queued_at, item = super()._get()
+        self.latency.record(monotonic() - queued_at)
+        return item
+
+    def _peek(self):
+        return super()._peek()[1]
+
+
+class LatencyStats:
+    """Running statistics about how long items wait in a queue."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class WorkQueue:
+    """
+    The queues of work for the streamer to process.
+
+    Work is split into two lanes, each of which is processed by separate
+    workers:
+
+    * A fast lane for messages from websocket clients (like `ping`, `filter`
+      and `whoami`) which are cheap and which clients wait for replies to
+    * A lane for messages from the realtime topics, which can be slow
+
+    Each lane is sharded into a number of queues, each of which should have a
+    single worker. Messages are routed to a shard by key (the socket for
+    websocket messages, and the annotation or user for realtime messages) so
+    messages with the same key are always processed in the order they arrive.
+
+    The maxsize of each queue ensures the memory used is bounded. When a queue
+    is full, messages are dropped after waiting for `timeout` seconds.
+    """
+
+    WEBSOCKET_LANE = "WebSocket"
+    REALTIME_LANE = "Realtime"
+
+    def __init__(self, shards=1, maxsize=4096, timeout=0.1):
+        self.timeout = timeout
+
+        self.lanes = {
+            lane: [TimedQueue(maxsize) for _ in range(shards)]
+            for lane in (self.WEBSOCKET_LANE, self.REALTIME_LANE)
+        }
+
+        self.dropped = 0
+        """The number of messages dropped because the queue was full."""
+
+    @property
+    def queues(self):
+        """Get every queue in the work queue."""
+        return [queue for queues in self.lanes.values() for queue in queues]
+
+    def put(self, message):
+        """
+        Add a message to the queue, routing it to the appropriate lane & shard.
+
+        :return: True if the message was queued or False if it was dropped
+        """
+        lane, key = self._route(message)
+        queues = self.lanes[lane]
+        queue = queues[hash(key) % len(queues)]
+
+        try:
+            queue.put(message, block=self.timeout > 0, timeout=self.timeout)
+        except Full:
+            self.dropped += 1
+            log.warning(
+                "Streamer work queue full! Unable to queue %s message having "
+                "waited %ss: giving up.",
+                lane,
+                self.timeout,
+            )
+            return False
+
+        return True
+
+    def qsize(self, lane=None):
+        """Get the number of messages queued in total, or in one lane."""
+        queues = self.lanes[lane] if lane else self.queues
+
+        return sum(queue.qsize() for queue in queues)
+
+    def take_latency(self, lane):
+        """Get the latency stats for a lane since this was last called."""
+        stats = LatencyStats()
+
+        for queue in self.lanes[lane]:
+            stats.merge(queue.latency)
+            queue.latency.reset()
+
+        return stats
+
+    def _route(self, message):
+        if isinstance(message, websocket.Message):
+            return self.WEBSOCKET_LANE, id(message.socket)
+
+        if isinstance(message, messages.Message) and isinstance(message.payload, dict):
+            return self.REALTIME_LANE, (
+                message.payload.get("annotation_id") or message.payload.get("userid")
+            )
+
+        return self.REALTIME_LANE, None
@@ -28,10 +28,26 @@ def delete_annotation(id_):
 
 
 @celery.task
-def sync_annotations(limit):
+def sync_annotations(limit=None, max_batches=1):
+    """
+    Sync a batch of annotations from the job queue into Elasticsearch.
+
+    :param limit: the most jobs to sync, below which the batch size adapts to
+        how long recent batches took
+    :param max_batches: if the queue is deep, sync up to this many batches in
+        parallel by starting extra tasks alongside this one
+    """
     annotation_sync_service = celery.request.find_service(AnnotationSyncService)
 
-    counts = annotation_sync_service.sync(limit)
+    def start_extra_batches():
+        # The extra tasks don't fan out any further themselves
+        for _ in range(max_batches - 1):
+            sync_annotations.delay(limit)
+
+    counts = annotation_sync_service.sync(
+        limit, on_full_batch=start_extra_batches if max_batches > 1 else None
+    )
+    latencies = celery.request.find_service(name="queue_service").take_latencies()
 
     log.info(dict(counts))
     newrelic.agent.record_custom_metrics(
@@ -39,6 +55,11 @@ def sync_annotations(limit):
             (f"Custom/SyncAnnotations/Queue/{key}", value)
             for key, value in counts.items()
         ]
+        + [
+            (f"Custom/SyncAnnotations/Latency/{tag}/{stat}", value)
+            for tag, (mean, max_) in latencies.items()
+            for stat, value in (("Mean", mean), ("Max", max_))
+        ]
     )
 
 
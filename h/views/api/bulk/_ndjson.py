@@ -1,9 +1,21 @@
 import json
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from itertools import chain
 
 from pyramid.response import Response
 
+CHUNK_SIZE = 64 * 1024
+"""The size of the chunks to gather rows into before sending them."""
+
+
+# Re-using an encoder is much faster than passing options to `json.dumps()`
+_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps(obj) -> bytes:
+    """Serialize an object to compact JSON bytes."""
+    return _ENCODER.encode(obj).encode("utf-8")
+
 
 def get_ndjson_response(results: Iterable | None) -> Response:
     """
@@ -26,7 +38,28 @@ def get_ndjson_response(results: Iterable | None) -> Response:
 
     # An NDJSON response is required
     return Response(
-        app_iter=((json.dumps(result) + "\n").encode("utf-8") for result in results),
+        app_iter=ndjson_chunks(results),
         status=200,
         content_type="application/x-ndjson",
     )
+
+
+def ndjson_chunks(results: Iterable, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Serialize `results` as NDJSON, in chunks of around `chunk_size` bytes.
+
+    Sending a few large chunks rather than one tiny one for every row saves a
+    lot of overhead in the WSGI server.
+    """
+    buffer = bytearray()
+
+    for result in results:
+        buffer += dumps(result)
+        buffer += b"\n"
+
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
@@ -6,6 +6,7 @@ from pyramid.response import Response
 from h.schemas.base import JSONSchema
 from h.security import Permission
 from h.services.bulk_api.lms_stats import BulkLMSStatsService, CountsGroupBy
+from h.views.api.bulk._ndjson import dumps
 from h.views.api.config import api_config
 
 
@@ -35,19 +36,23 @@ def get_annotation_counts(request):
         h_userids=query_filter.get("h_userids"),
     )
 
+    # This returns a single JSON list rather than NDJSON, but can still use
+    # the faster JSON backend
     return Response(
-        json=[
-            {
-                "assignment_id": row.assignment_id,
-                "userid": row.userid,
-                "display_name": row.display_name,
-                "annotations": row.annotations,
-                "replies": row.replies,
-                "page_notes": row.page_notes,
-                "last_activity": row.last_activity.isoformat(),
-            }
-            for row in stats
-        ],
+        body=dumps(
+            [
+                {
+                    "assignment_id": row.assignment_id,
+                    "userid": row.userid,
+                    "display_name": row.display_name,
+                    "annotations": row.annotations,
+                    "replies": row.replies,
+                    "page_notes": row.page_notes,
+                    "last_activity": row.last_activity.isoformat(),
+                }
+                for row in stats
+            ]
+        ),
         status=200,
         content_type="application/x-ndjson",
     )
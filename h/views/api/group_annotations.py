@@ -1,5 +1,9 @@
+import sqlalchemy as sa
+
+from h.db.types import InvalidUUID, URLSafeUUID
 from h.models import Annotation
 from h.models.annotation import ModerationStatus
+from h.schemas import ValidationError
 from h.schemas.api.group import FilterGroupAnnotationsSchema
 from h.schemas.pagination import Pagination
 from h.schemas.util import validate_query_params
@@ -34,16 +38,58 @@ def list_annotations(context: GroupContext, request):
         groupid=group.pubid, moderation_status=moderation_status_filter
     )
 
-    total = request.db.execute(AnnotationReadService.count_query(query)).scalar_one()
-    annotations = request.db.scalars(
-        query.order_by(Annotation.created.desc())
-        .offset(pagination.offset)
+    page_meta: dict[str, int] = {}
+
+    if after_id := params.get("page[after]"):
+        # Keyset pagination: carry on from the last annotation of the previous
+        # page. This avoids skipping over all of the earlier pages with an
+        # offset, which gets slower the further into the group we get. For the
+        # same reason these pages don't count the annotations in the group
+        # again: the client already has the total from the first page.
+        after = _get_page_after_annotation(request, group, after_id)
+        query = query.where(
+            sa.tuple_(Annotation.created, Annotation.id)
+            < sa.tuple_(
+                sa.literal(after.created, Annotation.created.type),
+                sa.literal(after.id, Annotation.id.type),
+            )
+        )
+    else:
+        page_meta["total"] = request.db.execute(
+            AnnotationReadService.count_query(query)
+        ).scalar_one()
+        query = query.offset(pagination.offset)
+
+    annotation_ids = request.db.scalars(
+        query.with_only_columns(Annotation.id)
+        .order_by(Annotation.created.desc(), Annotation.id.desc())
         .limit(pagination.limit)
+    ).all()
+
+    # Present the whole page at once, which loads everything we need for all
+    # of the annotations in a few queries rather than a few per annotation
+    annotations_dicts = annotation_json_service.present_all_for_user(
+        annotation_ids, request.user
     )
 
-    annotations_dicts = [
-        annotation_json_service.present_for_user(annotation, request.user)
-        for annotation in annotations
-    ]
+    return {"meta": {"page": page_meta}, "data": annotations_dicts}
+
+
+def _get_page_after_annotation(request, group, after_id):
+    """Return the annotation a `page[after]` param refers to."""
+    try:
+        URLSafeUUID.url_safe_to_hex(after_id)
+    except InvalidUUID as err:
+        raise ValidationError(f"page[after]: Invalid id {after_id!r}") from err  # noqa: EM102, TRY003
+
+    after = request.db.execute(
+        sa.select(Annotation.id, Annotation.created).where(
+            Annotation.id == after_id, Annotation.groupid == group.pubid
+        )
+    ).one_or_none()
+    if after is None:
+        raise ValidationError(  # noqa: TRY003
+            f"page[after]: No annotation with id {after_id!r} in this group"  # noqa: EM102
+        )
 
-    return {"meta": {"page": {"total": total}}, "data": annotations_dicts}
+    return after
@@ -1,4 +1,5 @@
 import logging
+from dataclasses import replace
 
 from pyramid.config import not_
 from pyramid.httpexceptions import HTTPConflict, HTTPNoContent, HTTPNotFound
@@ -161,9 +162,18 @@ def edit_member(context: EditGroupMembershipContext, request):
     if context.user == request.user:
         # Update request.identity.user.memberships so permissions checks done
         # by GroupMembershipJSONPresenter below return the right results.
-        # Otherwise permissions checks will be based on the old roles.
-        for membership in request.identity.user.memberships:
-            if membership.group.id == context.group.id:
-                membership.roles = context.new_roles
+        # Otherwise permissions checks will be based on the old roles. The
+        # user can be shared with other requests (see `IdentityCache`) so it's
+        # replaced with an updated copy rather than changed in place.
+        user = request.identity.user
+        request.identity.user = replace(
+            user,
+            memberships=[
+                replace(membership, roles=context.new_roles)
+                if membership.group.id == context.group.id
+                else membership
+                for membership in user.memberships
+            ],
+        )
 
     return GroupMembershipJSONPresenter(request, context.membership).asdict()
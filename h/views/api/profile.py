@@ -15,7 +15,19 @@ from h.views.api.config import api_config
 )
 def profile(request):
     authority = request.params.get("authority")
-    return h_session.profile(request, authority)
+    profile_, etag = h_session.versioned_profile(request, authority)
+
+    # Let clients revalidate the profile they already have with If-None-Match
+    # and get a 304 Not Modified response if it hasn't changed
+    response = request.response
+    response.etag = etag
+    response.conditional_response = True
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    # The cookie policy adds Cookie to this
+    response.vary = ("Authorization",)
+
+    return profile_
 
 
 @api_config(
@@ -34,9 +34,10 @@ from h.services.group import GroupService
 from h.services.group_create import GroupCreateService
 from h.services.group_delete import GroupDeleteService
 from h.services.group_links import GroupLinksService
-from h.services.group_list import GroupListService
+from h.services.group_list import GroupListCache, GroupListService
 from h.services.group_members import GroupMembersService
 from h.services.group_update import GroupUpdateService
+from h.services.identity_cache import IdentityCache
 from h.services.job_queue import JobQueueService
 from h.services.links import LinksService
 from h.services.list_organizations import ListOrganizationsService
@@ -76,11 +77,13 @@ __all__ = (
     "group_create_service",
     "group_delete_service",
     "group_links_service",
+    "group_list_cache",
     "group_list_service",
     "group_members_service",
     "group_service",
     "group_update_service",
     "http_service",
+    "identity_cache",
     "links_service",
     "list_organizations_service",
     "mention_service",
@@ -248,11 +251,24 @@ def group_service(mock_service):
     return mock_service(GroupService, name="group")
 
 
+@pytest.fixture
+def group_list_cache(mock_service):
+    return mock_service(GroupListCache, name="group_list_cache")
+
+
 @pytest.fixture
 def group_update_service(mock_service):
     return mock_service(GroupUpdateService, name="group_update")
 
 
+@pytest.fixture
+def identity_cache(mock_service):
+    identity_cache = mock_service(IdentityCache, name="identity_cache")
+    identity_cache.get.return_value = None
+
+    return identity_cache
+
+
 @pytest.fixture
 def moderation_service(mock_service):
     return mock_service(AnnotationModerationService, name="annotation_moderation")
@@ -262,6 +278,7 @@ def moderation_service(mock_service):
 def nipsa_service(mock_service):
     nipsa_service = mock_service(NipsaService, name="nipsa")
     nipsa_service.is_flagged.return_value = False
+    nipsa_service.flagged_userids.return_value = set()
 
     return nipsa_service
 
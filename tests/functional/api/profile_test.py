@@ -46,6 +46,36 @@ class TestGetProfile:
         # (The client gets open groups from the groups API instead.)
         assert group_ids == []
 
+    def test_it_returns_304_if_the_profile_has_not_changed(self, app, user_with_token):
+        _, token = user_with_token
+        headers = {"Authorization": f"Bearer {token.value}"}
+        res = app.get("/api/profile", headers=headers)
+
+        res = app.get(
+            "/api/profile",
+            headers=dict(headers, **{"If-None-Match": res.headers["ETag"]}),
+            status=304,
+        )
+
+        assert not res.body
+
+    def test_it_returns_the_new_profile_once_it_has_changed(self, app, user_with_token):
+        _, token = user_with_token
+        headers = {"Authorization": f"Bearer {token.value}"}
+        res = app.get("/api/profile", headers=headers)
+        app.patch_json(
+            "/api/profile",
+            {"preferences": {"show_sidebar_tutorial": False}},
+            headers=headers,
+        )
+
+        res = app.get(
+            "/api/profile",
+            headers=dict(headers, **{"If-None-Match": res.headers["ETag"]}),
+        )
+
+        assert res.json["preferences"] == {}
+
 
 class TestGetProfileGroups:
     def test_it_returns_empty_list_when_not_authed(self, app):
@@ -3,6 +3,7 @@ from unittest import mock
 import pytest
 
 from h.cli.commands import search
+from h.search.reindex import WorkerStats
 
 pytestmark = [
     pytest.mark.xdist_group("elasticsearch"),
@@ -32,6 +33,46 @@ class TestUpdateSettingsCommand:
         return patch("h.cli.commands.search.config.update_index_settings")
 
 
+class TestReindexCommand:
+    def test_it(self, cli, cliconfig, pyramid_request, ParallelReindexer):
+        reindexer = ParallelReindexer.return_value
+        reindexer.reindex.return_value = "new-index"
+        reindexer.worker_stats = {1234: WorkerStats(2, 100, 4)}
+
+        result = cli.invoke(search.reindex, ["--workers", "3"], obj=cliconfig)
+
+        assert not result.exit_code
+        ParallelReindexer.assert_called_once_with(
+            pyramid_request, cliconfig["bootstrap"], workers=3, partitions=12
+        )
+        reindexer.reindex.assert_called_once_with()
+        assert result.output == (
+            "Worker 1234: 100 annotations in 2 partitions (25/s)\n"
+            "Reindexed into new-index\n"
+        )
+
+    def test_it_with_partitions(self, cli, cliconfig, ParallelReindexer):
+        cli.invoke(
+            search.reindex, ["--workers", "3", "--partitions", "5"], obj=cliconfig
+        )
+
+        assert ParallelReindexer.call_args.kwargs["partitions"] == 5
+
+    def test_it_handles_runtimeerror(self, cli, cliconfig, ParallelReindexer):
+        reindexer = ParallelReindexer.return_value
+        reindexer.reindex.side_effect = RuntimeError("Failed to reindex")
+        reindexer.worker_stats = {}
+
+        result = cli.invoke(search.reindex, [], obj=cliconfig)
+
+        assert result.exit_code == 1
+        assert "Failed to reindex" in result.output
+
+    @pytest.fixture
+    def ParallelReindexer(self, patch):
+        return patch("h.cli.commands.search.ParallelReindexer")
+
+
 @pytest.fixture
 def cliconfig(pyramid_request, mock_es_client):
     pyramid_request.es = mock_es_client
@@ -8,6 +8,7 @@ from h.config import configure
     [
         (None, None, "h.db_session_checks", True),
         ("DB_SESSION_CHECKS", "False", "h.db_session_checks", False),
+        ("ELASTICSEARCH_BATCH_INDEXING", "true", "es.batch_indexing", True),
         ("SECRET_KEY", "dont_tell_anyone", "secret_key", b"dont_tell_anyone"),
         ("SECRET_SALT", "best_with_pepper", "secret_salt", b"best_with_pepper"),
         ("SENTRY_ENVIRONMENT", "test-env", "h.sentry_environment", "test-env"),
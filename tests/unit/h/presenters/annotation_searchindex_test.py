@@ -1,6 +1,7 @@
 import pytest
 from h_matchers import Any
 
+from h.models.annotation import ModerationStatus
 from h.presenters.annotation_searchindex import AnnotationSearchIndexPresenter
 from h.util.datetime import utc_iso8601
 
@@ -41,6 +42,7 @@ class TestAnnotationSearchIndexPresenter:
             "references": annotation.references,
             "thread_ids": Any.list.containing([reply.id for reply in replies]).only(),
             "hidden": False,
+            "digest": AnnotationSearchIndexPresenter.digest(annotation, nipsa=False),
         }
 
     @pytest.mark.parametrize("is_moderated", [True, False])
@@ -87,6 +89,121 @@ class TestAnnotationSearchIndexPresenter:
         else:
             assert "nipsa" not in annotation_dict
 
+    def test_digest_is_stable(self, factories):
+        annotation = factories.Annotation.build()
+
+        digest = AnnotationSearchIndexPresenter.digest(annotation, nipsa=False)
+
+        assert digest == AnnotationSearchIndexPresenter.digest(annotation, nipsa=False)
+        assert len(digest) == 32
+
+    @pytest.mark.parametrize(
+        "field,value",
+        (
+            ("groupid", "other_group"),
+            ("shared", False),
+            ("target_uri", "http://example.com/migrated"),
+            ("text", "edited"),
+            ("tags", ["edited"]),
+            ("moderation_status", ModerationStatus.DENIED),
+        ),
+    )
+    def test_digest_changes_with_the_annotation(self, factories, field, value):
+        annotation = factories.Annotation.build()
+        before = AnnotationSearchIndexPresenter.digest(annotation, nipsa=False)
+
+        setattr(annotation, field, value)
+
+        assert AnnotationSearchIndexPresenter.digest(annotation, nipsa=False) != before
+
+    def test_digest_changes_with_nipsa(self, factories):
+        annotation = factories.Annotation.build()
+
+        assert AnnotationSearchIndexPresenter.digest(
+            annotation, nipsa=True
+        ) != AnnotationSearchIndexPresenter.digest(annotation, nipsa=False)
+
+    def test_present_all(
+        self, pyramid_request, moderation_service, nipsa_service, factories
+    ):
+        annotations = [
+            factories.Annotation(userid="acct:flagged@example.com"),
+            factories.Annotation(userid="acct:other@example.com"),
+        ]
+        replies = factories.Annotation.create_batch(2, references=[annotations[0].id])
+        moderation_service.all_hidden.return_value = {
+            annotations[0].id,
+            *[reply.id for reply in replies],
+        }
+        nipsa_service.flagged_userids.return_value = {"acct:flagged@example.com"}
+
+        results = AnnotationSearchIndexPresenter.present_all(
+            annotations, pyramid_request
+        )
+
+        moderation_service.all_hidden.assert_called_once_with(
+            Any.list.containing(
+                [annotation.id for annotation in annotations]
+                + [reply.id for reply in replies]
+            ).only()
+        )
+        nipsa_service.flagged_userids.assert_called_once_with(
+            {"acct:flagged@example.com", "acct:other@example.com"}
+        )
+        assert [result["id"] for result in results] == [
+            annotation.id for annotation in annotations
+        ]
+        assert [result["hidden"] for result in results] == [True, False]
+        assert [result.get("nipsa", False) for result in results] == [True, False]
+        nipsa_service.is_flagged.assert_not_called()
+
+    def test_present_all_with_a_hidden_reply(
+        self, pyramid_request, moderation_service, factories
+    ):
+        annotation = factories.Annotation()
+        replies = factories.Annotation.create_batch(2, references=[annotation.id])
+        moderation_service.all_hidden.return_value = {annotation.id, replies[0].id}
+
+        (result,) = AnnotationSearchIndexPresenter.present_all(
+            [annotation], pyramid_request
+        )
+
+        assert not result["hidden"]
+
+    def test_thread_fields(self, pyramid_request, moderation_service, factories):
+        annotation = factories.Annotation()
+        replies = factories.Annotation.create_batch(2, references=[annotation.id])
+        moderation_service.all_hidden.return_value = [annotation.id]
+
+        fields = AnnotationSearchIndexPresenter(
+            annotation, pyramid_request
+        ).thread_fields()
+
+        assert fields == {
+            "thread_ids": Any.list.containing([reply.id for reply in replies]).only(),
+            "hidden": False,
+        }
+
+    def test_present_thread_fields_all(
+        self, pyramid_request, moderation_service, nipsa_service, factories
+    ):
+        annotations = factories.Annotation.create_batch(2)
+        reply = factories.Annotation(references=[annotations[0].id])
+        moderation_service.all_hidden.return_value = {annotations[1].id}
+
+        results = AnnotationSearchIndexPresenter.present_thread_fields_all(
+            annotations, pyramid_request
+        )
+
+        moderation_service.all_hidden.assert_called_once_with(
+            Any.list.containing([annotations[0].id, annotations[1].id, reply.id]).only()
+        )
+        nipsa_service.flagged_userids.assert_not_called()
+        assert results == [
+            {"thread_ids": [reply.id], "hidden": False},
+            {"thread_ids": [], "hidden": True},
+        ]
+
     @pytest.fixture(autouse=True)
     def DocumentSearchIndexPresenter(self, patch):
         class_ = patch(
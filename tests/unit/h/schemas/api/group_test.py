@@ -222,14 +222,21 @@ class TestFilterGroupAnnotationsSchema:
 
         validated_data = validate_query_params(schema, data)
 
-        assert validated_data == {"moderation_status": "PENDING"}
+        assert validated_data == {"moderation_status": "PENDING", "page[after]": None}
+
+    def test_page_after(self, schema):
+        data = MultiDict({"page[after]": "ANNOTATION_ID"})
+
+        validated_data = validate_query_params(schema, data)
+
+        assert validated_data["page[after]"] == "ANNOTATION_ID"
 
     def test_it_when_empty(self, schema):
         data = MultiDict({})
 
         validated_data = validate_query_params(schema, data)
 
-        assert validated_data == {"moderation_status": None}
+        assert validated_data == {"moderation_status": None, "page[after]": None}
 
     @pytest.fixture
     def schema(self):
@@ -1,3 +1,4 @@
+import datetime
 import logging
 from unittest.mock import sentinel
 
@@ -60,6 +61,43 @@ class TestBatchIndexer:
         with pytest.raises(NotFoundError):
             get_indexed_ann(ann_del.id)
 
+    def test_index_updated_between(self, batch_indexer, factories, get_indexed_ann):
+        annotations = [
+            factories.Annotation(updated=datetime.datetime(2020, 1, day))  # noqa: DTZ001
+            for day in range(1, 7)
+        ]
+
+        errored = batch_indexer.index_updated_between(
+            annotations[1].updated,
+            annotations[5].updated,
+            # Check that loading annotations a window at a time works
+            windowsize=3,
+        )
+
+        assert not errored
+        assert batch_indexer.indexed == 4
+        for annotation in annotations[1:5]:
+            assert get_indexed_ann(annotation.id) is not None
+        for annotation in (annotations[0], annotations[5]):
+            with pytest.raises(NotFoundError):
+                get_indexed_ann(annotation.id)
+
+    @pytest.mark.parametrize("start,end", ((None, 3), (3, None), (None, None)))
+    def test_index_updated_between_with_open_ranges(
+        self, batch_indexer, factories, start, end
+    ):
+        annotations = [
+            factories.Annotation(updated=datetime.datetime(2020, 1, day))  # noqa: DTZ001
+            for day in range(1, 7)
+        ]
+
+        batch_indexer.index_updated_between(
+            None if start is None else annotations[start].updated,
+            None if end is None else annotations[end].updated,
+        )
+
+        assert batch_indexer.indexed == len(annotations[start:end])
+
     def test_it_logs_indexing_status(self, caplog, batch_indexer, factories):
         num_annotations = 10
         window_size = 3
@@ -132,6 +170,28 @@ class TestBatchIndexer:
 
         assert errored == expected_errored_ids
 
+    def test_it_presents_annotations_a_chunk_at_a_time(
+        self, batch_indexer, factories, es_helpers, patch, monkeypatch
+    ):
+        monkeypatch.setattr("h.search.index.ES_CHUNK_SIZE", 2)
+        AnnotationSearchIndexPresenter = patch(
+            "h.search.index.presenters.AnnotationSearchIndexPresenter"
+        )
+        AnnotationSearchIndexPresenter.present_all.side_effect = (
+            lambda annotations, _request: [{} for _ in annotations]
+        )
+        es_helpers.streaming_bulk.side_effect = lambda _conn, actions, **_kwargs: [
+            (True, action) for action in actions
+        ]
+        annotations = factories.Annotation.create_batch(5)
+
+        batch_indexer.index([annotation.id for annotation in annotations])
+
+        assert [
+            len(call.args[0])
+            for call in AnnotationSearchIndexPresenter.present_all.call_args_list
+        ] == [2, 2, 1]
+
     def test_delete(self, batch_indexer, factories, get_indexed_ann):
         annotations = factories.Annotation.create_batch(2)
         batch_indexer.index([annotation.id for annotation in annotations])
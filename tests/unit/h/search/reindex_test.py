@@ -0,0 +1,315 @@
+import datetime
+from concurrent.futures import Future
+from unittest import mock
+from unittest.mock import sentinel
+
+import pytest
+
+from h.search import reindex
+from h.search.reindex import (
+    Checkpoint,
+    ParallelReindexer,
+    Partition,
+    PartitionResult,
+    partition_annotations,
+)
+from h.services.search_index import SearchIndexService
+from h.services.settings import SettingsService
+
+
+class TestPartitionAnnotations:
+    def test_it_splits_annotations_into_even_partitions(self, db_session, factories):
+        annotations = [
+            factories.Annotation(updated=datetime.datetime(2020, 1, day))  # noqa: DTZ001
+            for day in range(1, 9)
+        ]
+        # Deleted annotations aren't reindexed, so don't count towards the split
+        factories.Annotation(deleted=True, updated=datetime.datetime(2020, 1, 2))  # noqa: DTZ001
+        db_session.flush()
+
+        partitions = partition_annotations(db_session, 4)
+
+        assert partitions == [
+            Partition(None, annotations[1].updated),
+            Partition(annotations[1].updated, annotations[3].updated),
+            Partition(annotations[3].updated, annotations[5].updated),
+            Partition(annotations[5].updated, None),
+        ]
+
+    def test_it_removes_duplicate_boundaries(self, db_session, factories):
+        updated = datetime.datetime(2020, 1, 1)  # noqa: DTZ001
+        factories.Annotation.create_batch(3, updated=updated)
+        db_session.flush()
+
+        partitions = partition_annotations(db_session, 4)
+
+        assert partitions == [Partition(None, updated), Partition(updated, None)]
+
+    @pytest.mark.parametrize("count", (1, 4))
+    def test_it_with_one_partition_or_no_annotations(self, db_session, count):
+        assert partition_annotations(db_session, count) == [Partition(None, None)]
+
+
+class TestCheckpoint:
+    def test_it_round_trips(self):
+        checkpoint = Checkpoint(
+            index="new-index",
+            partitions=[
+                Partition(None, datetime.datetime(2020, 1, 1)),  # noqa: DTZ001
+                Partition(datetime.datetime(2020, 1, 1), None),  # noqa: DTZ001
+            ],
+            completed={1},
+        )
+
+        assert Checkpoint.loads(checkpoint.dumps()) == checkpoint
+
+    def test_pending(self):
+        checkpoint = Checkpoint(
+            index="new-index", partitions=[Partition(None, None)] * 3, completed={1}
+        )
+
+        assert checkpoint.pending == [0, 2]
+
+
+class TestParallelReindexer:
+    def test_it_reindexes_into_a_new_index(
+        self,
+        reindexer,
+        config,
+        executor,
+        reindex_partition,
+        partition_annotations,
+        settings_service,
+        req,
+    ):
+        new_index = reindexer.reindex()
+
+        config.configure_index.assert_called_once_with(req.es)
+        partition_annotations.assert_called_once_with(req.db, 2)
+        assert executor.submit.call_args_list == [
+            mock.call(reindex_partition, "new-index", number, partition)
+            for number, partition in enumerate(partition_annotations.return_value)
+        ]
+        config.update_aliased_index.assert_called_once_with(req.es, "new-index")
+        assert new_index == "new-index"
+        # Everything is tidied up once the reindex is done
+        assert settings_service.get(SearchIndexService.REINDEX_SETTING_KEY) is None
+        assert settings_service.get(ParallelReindexer.CHECKPOINT_SETTING_KEY) is None
+
+    def test_it_runs_the_workers_in_a_process_pool(
+        self, reindexer, ProcessPoolExecutor, multiprocessing
+    ):
+        reindexer.reindex()
+
+        multiprocessing.get_context.assert_called_once_with("spawn")
+        ProcessPoolExecutor.assert_called_once_with(
+            max_workers=3,
+            mp_context=multiprocessing.get_context.return_value,
+            initializer=reindex._init_worker,  # noqa: SLF001
+            initargs=(sentinel.bootstrap,),
+        )
+
+    def test_it_records_worker_stats(self, reindexer):
+        reindexer.reindex()
+
+        stats = reindexer.worker_stats[1234]
+        assert (stats.partitions, stats.indexed, stats.seconds) == (2, 20, 4)
+        assert stats.rate == 5
+
+    def test_it_checkpoints_while_reindexing(
+        self, reindexer, reindex_partition, settings_service
+    ):
+        checkpoints = []
+
+        def side_effect(target_index, number, _partition):
+            # Capture the checkpoint as each partition starts
+            checkpoints.append(
+                Checkpoint.loads(
+                    settings_service.get(ParallelReindexer.CHECKPOINT_SETTING_KEY)
+                )
+            )
+            assert (
+                settings_service.get(SearchIndexService.REINDEX_SETTING_KEY)
+                == target_index
+            )
+            return PartitionResult(number, 1234, 10, set(), 2)
+
+        reindex_partition.side_effect = side_effect
+
+        reindexer.reindex()
+
+        assert [checkpoint.completed for checkpoint in checkpoints] == [set(), {0}]
+
+    def test_it_resumes_from_a_checkpoint(
+        self, reindexer, config, executor, settings_service
+    ):
+        partitions = [
+            Partition(None, datetime.datetime(2020, 1, 1)),  # noqa: DTZ001
+            Partition(None, None),
+        ]
+        settings_service.put(
+            ParallelReindexer.CHECKPOINT_SETTING_KEY,
+            Checkpoint(
+                index="old-new-index", partitions=partitions, completed={0}
+            ).dumps(),
+        )
+
+        new_index = reindexer.reindex()
+
+        config.configure_index.assert_not_called()
+        executor.submit.assert_called_once_with(
+            mock.ANY, "old-new-index", 1, partitions[1]
+        )
+        assert new_index == "old-new-index"
+
+    def test_it_raises_if_partitions_have_errors(
+        self, reindexer, config, reindex_partition, settings_service
+    ):
+        reindex_partition.side_effect = [
+            PartitionResult(0, 1234, 10, {"error_id"}, 2),
+            PartitionResult(1, 1234, 10, set(), 2),
+        ]
+
+        with pytest.raises(RuntimeError, match="Failed to reindex 1 partitions"):
+            reindexer.reindex()
+
+        config.update_aliased_index.assert_not_called()
+        checkpoint = Checkpoint.loads(
+            settings_service.get(ParallelReindexer.CHECKPOINT_SETTING_KEY)
+        )
+        assert checkpoint.completed == {1}
+        assert settings_service.get(SearchIndexService.REINDEX_SETTING_KEY)
+
+    def test_it_raises_if_workers_crash(self, reindexer, config, reindex_partition):
+        reindex_partition.side_effect = ValueError
+
+        with pytest.raises(RuntimeError, match="Failed to reindex 2 partitions"):
+            reindexer.reindex()
+
+        config.update_aliased_index.assert_not_called()
+
+    @pytest.fixture
+    def reindexer(self, req, settings_service):  # noqa: ARG002
+        return ParallelReindexer(req, sentinel.bootstrap, workers=3, partitions=2)
+
+    @pytest.fixture
+    def req(self, pyramid_request):
+        pyramid_request.tm = mock.MagicMock()
+        pyramid_request.es = mock.MagicMock()
+        return pyramid_request
+
+    @pytest.fixture
+    def settings_service(self, pyramid_config, db_session):
+        settings_service = SettingsService(db_session)
+        pyramid_config.register_service(settings_service, name="settings")
+        return settings_service
+
+    @pytest.fixture(autouse=True)
+    def config(self, patch):
+        config = patch("h.search.reindex.config")
+        config.configure_index.return_value = "new-index"
+        return config
+
+    @pytest.fixture(autouse=True)
+    def partition_annotations(self, patch):
+        partition_annotations = patch("h.search.reindex.partition_annotations")
+        partition_annotations.return_value = [
+            Partition(None, datetime.datetime(2020, 1, 1)),  # noqa: DTZ001
+            Partition(datetime.datetime(2020, 1, 1), None),  # noqa: DTZ001
+        ]
+        return partition_annotations
+
+    @pytest.fixture(autouse=True)
+    def reindex_partition(self, patch):
+        reindex_partition = patch("h.search.reindex._reindex_partition")
+        reindex_partition.side_effect = (
+            lambda _target_index, number, _partition: PartitionResult(
+                number, 1234, 10, set(), 2
+            )
+        )
+        return reindex_partition
+
+    @pytest.fixture(autouse=True)
+    def multiprocessing(self, patch):
+        return patch("h.search.reindex.multiprocessing")
+
+    @pytest.fixture(autouse=True)
+    def ProcessPoolExecutor(self, patch):
+        return patch("h.search.reindex.ProcessPoolExecutor")
+
+    @pytest.fixture(autouse=True)
+    def executor(self, ProcessPoolExecutor):
+        executor = ProcessPoolExecutor.return_value.__enter__.return_value
+
+        def submit(fn, *args):
+            future = Future()
+            future.work = lambda: fn(*args)
+            return future
+
+        executor.submit.side_effect = submit
+        return executor
+
+    @pytest.fixture(autouse=True)
+    def as_completed(self, patch):
+        # Run the work synchronously as it's waited for, rather than in other
+        # processes
+        def as_completed(futures):
+            for future in futures:
+                try:
+                    future.set_result(future.work())
+                except Exception as err:  # noqa: BLE001
+                    future.set_exception(err)
+                yield future
+
+        return patch("h.search.reindex.as_completed", side_effect=as_completed)
+
+
+class TestReindexPartition:
+    def test_it(self, req, BatchIndexer, os):
+        partition = Partition(sentinel.start, sentinel.end)
+
+        result = reindex._reindex_partition("new-index", 3, partition)  # noqa: SLF001
+
+        BatchIndexer.assert_called_once_with(
+            req.db, req.es, req, target_index="new-index", op_type="create"
+        )
+        indexer = BatchIndexer.return_value
+        indexer.index_updated_between.assert_called_once_with(
+            sentinel.start, sentinel.end
+        )
+        indexer.index.assert_not_called()
+        req.tm.commit.assert_called_once_with()
+        assert result == PartitionResult(
+            number=3,
+            pid=os.getpid.return_value,
+            indexed=10,
+            errored=set(),
+            seconds=mock.ANY,
+        )
+
+    def test_it_retries_errored_annotations(self, BatchIndexer):
+        indexer = BatchIndexer.return_value
+        indexer.index_updated_between.return_value = {"id_1"}
+
+        result = reindex._reindex_partition("new-index", 3, Partition(None, None))  # noqa: SLF001
+
+        indexer.index.assert_called_once_with(["id_1"])
+        assert result.errored == indexer.index.return_value
+
+    @pytest.fixture(autouse=True)
+    def req(self, pyramid_request, monkeypatch):
+        pyramid_request.tm = mock.MagicMock()
+        pyramid_request.es = mock.MagicMock()
+        monkeypatch.setattr(reindex, "_worker_request", pyramid_request)
+        return pyramid_request
+
+    @pytest.fixture
+    def BatchIndexer(self, patch):
+        BatchIndexer = patch("h.search.reindex.BatchIndexer")
+        BatchIndexer.return_value.index_updated_between.return_value = set()
+        BatchIndexer.return_value.indexed = 10
+        return BatchIndexer
+
+    @pytest.fixture
+    def os(self, patch):
+        return patch("h.search.reindex.os")
@@ -1,4 +1,4 @@
-from unittest.mock import call, sentinel
+from unittest.mock import Mock, call, sentinel
 
 import pytest
 from h_matchers import Any
@@ -33,10 +33,8 @@ class TestLongLivedUser:
                 GroupMembership(group=groups[1], roles=[GroupMembershipRoles.ADMIN]),
             ]
         )
-        LongLivedGroup.from_model.side_effect = [
-            sentinel.long_lived_group_1,
-            sentinel.long_lived_group_2,
-        ]
+        long_lived_groups = [Mock(id=groups[0].id), Mock(id=groups[1].id)]
+        LongLivedGroup.from_model.side_effect = long_lived_groups
         db_session.flush()
 
         model = LongLivedUser.from_model(user)
@@ -54,19 +52,62 @@ class TestLongLivedUser:
             staff=user.staff,
             memberships=[
                 LongLivedMembership(
-                    group=sentinel.long_lived_group_1,
+                    group=long_lived_groups[0],
                     user=model,
                     roles=[GroupMembershipRoles.MEMBER],
                 ),
                 LongLivedMembership(
-                    group=sentinel.long_lived_group_2,
+                    group=long_lived_groups[1],
                     user=model,
                     roles=[GroupMembershipRoles.ADMIN],
                 ),
             ],
         )
+        assert model.group_roles == {
+            groups[0].id: (GroupMembershipRoles.MEMBER,),
+            groups[1].id: (GroupMembershipRoles.ADMIN,),
+        }
+
+    def test_index_memberships(self):
+        user = LongLivedUser(
+            id=sentinel.id,
+            userid=sentinel.userid,
+            authority=sentinel.authority,
+            staff=False,
+            admin=False,
+        )
+        user.memberships.append(
+            LongLivedMembership(
+                group=LongLivedGroup(id=42, pubid="pubid"),
+                user=user,
+                roles=[GroupMembershipRoles.MEMBER],
+            )
+        )
+        assert not user.group_roles
 
-    @pytest.fixture(autouse=True)
+        user.index_memberships()
+
+        assert user.group_roles == {42: (GroupMembershipRoles.MEMBER,)}
+
+    def test_it_indexes_memberships_passed_to_the_constructor(self):
+        group = LongLivedGroup(id=42, pubid="pubid")
+
+        user = LongLivedUser(
+            id=sentinel.id,
+            userid=sentinel.userid,
+            authority=sentinel.authority,
+            staff=False,
+            admin=False,
+            memberships=[
+                LongLivedMembership(
+                    group=group, user=None, roles=[GroupMembershipRoles.MEMBER]
+                )
+            ],
+        )
+
+        assert user.group_roles == {42: (GroupMembershipRoles.MEMBER,)}
+
+    @pytest.fixture
     def LongLivedGroup(self, patch):
         return patch("h.security.identity.LongLivedGroup")
 
@@ -145,9 +186,24 @@ class TestGetRoles:
                 user=identity.user, group=group, roles=[GroupMembershipRoles.MODERATOR]
             ),
         )
+        identity.user.index_memberships()
 
         assert identity.get_roles(group) == [GroupMembershipRoles.MODERATOR]
 
+    def test_it_returns_the_roles_in_order(self, identity, group):
+        roles = [
+            GroupMembershipRoles.OWNER,
+            GroupMembershipRoles.ADMIN,
+            GroupMembershipRoles.MODERATOR,
+            GroupMembershipRoles.MEMBER,
+        ]
+        identity.user.memberships.append(
+            LongLivedMembership(user=identity.user, group=group, roles=roles)
+        )
+        identity.user.index_memberships()
+
+        assert identity.get_roles(group) == roles
+
     def test_when_no_membership(self, identity, group):
         assert identity.get_roles(group) == []
 
@@ -174,6 +230,7 @@ class TestGetRoles:
                 roles=[GroupMembershipRoles.MEMBER],
             )
         ]
+        identity.user.index_memberships()
         return identity
 
     @pytest.fixture
@@ -0,0 +1,103 @@
+from time import perf_counter
+
+import pytest
+
+from h import models
+from h.models.group import JoinableBy, ReadableBy, WriteableBy
+from h.security import Identity, PermitsCache, identity_permits
+from h.security.permissions import Permission
+from h.traversal import AnnotationContext
+
+
+@pytest.mark.skip("Only of use during development")
+class TestPresentAllForUserPermitsSpeed:  # pragma: no cover
+    """
+    Time the permission checks done when presenting a page of annotations.
+
+    This is the `READ` check for each annotation's read permission and the
+    `MODERATE` check for the user, which `AnnotationJSONService` does for every
+    annotation on the page. Everything is in memory: nothing touches the DB.
+    """
+
+    @pytest.mark.parametrize("group_count", (10, 5000))
+    @pytest.mark.parametrize("row_count", (200,))
+    def test_with_an_identity_per_row(self, user, annotations):
+        start = perf_counter()
+
+        for annotation in annotations:
+            identity_permits(
+                None, AnnotationContext(annotation), Permission.Annotation.READ
+            )
+            identity_permits(
+                Identity.from_models(user=user),
+                AnnotationContext(annotation),
+                Permission.Annotation.MODERATE,
+            )
+
+        self.report("Identity per row", user, annotations, start)
+
+    @pytest.mark.parametrize("group_count", (10, 5000))
+    @pytest.mark.parametrize("row_count", (200,))
+    def test_with_a_shared_identity_and_cache(self, user, annotations):
+        start = perf_counter()
+
+        identity = Identity.from_models(user=user)
+        permits_cache = PermitsCache()
+
+        for annotation in annotations:
+            identity_permits(
+                None, AnnotationContext(annotation), Permission.Annotation.READ
+            )
+            permits_cache.permits(
+                identity, AnnotationContext(annotation), Permission.Annotation.MODERATE
+            )
+
+        self.report("Shared identity and cache", user, annotations, start)
+
+    def report(self, label, user, annotations, start):
+        millis = (perf_counter() - start) * 1000
+        print(  # noqa: T201
+            f"{label} ({len(user.memberships)} groups) x {len(annotations)}: "
+            f"{millis} ms"
+        )
+
+    @pytest.fixture
+    def user(self, group_count):
+        user = models.User(id=1, username="speed_test", authority="example.com")
+
+        for number in range(group_count):
+            group = models.Group(
+                id=number,
+                pubid=f"group{number}",
+                name=f"Group {number}",
+                authority="example.com",
+                joinable_by=JoinableBy.authority,
+                readable_by=ReadableBy.members,
+                writeable_by=WriteableBy.members,
+            )
+            role = (
+                models.GroupMembershipRoles.MODERATOR
+                if number % 2
+                else models.GroupMembershipRoles.MEMBER
+            )
+            user.memberships.append(models.GroupMembership(group=group, roles=[role]))
+
+        return user
+
+    @pytest.fixture
+    def annotations(self, user, row_count):
+        groups = [membership.group for membership in user.memberships[:10]]
+        annotations = []
+
+        for number in range(row_count):
+            group = groups[number % len(groups)]
+            annotation = models.Annotation(
+                userid="acct:other@example.com",
+                groupid=group.pubid,
+                shared=True,
+                deleted=False,
+            )
+            annotation.group = group
+            annotations.append(annotation)
+
+        return annotations
@@ -4,9 +4,15 @@ import pytest
 from pyramid.security import Allowed, Denied
 
 from h.models import GroupMembership, GroupMembershipRoles
+from h.models.group import ReadableBy
 from h.security import Identity, Permission
-from h.security.permits import PERMISSION_MAP, identity_permits
-from h.traversal import AnnotationContext
+from h.security.permits import (
+    PERMISSION_MAP,
+    PermitsCache,
+    RealtimeReaders,
+    identity_permits,
+)
+from h.traversal import AnnotationContext, GroupContext
 
 
 def always_true(_identity, _context):
@@ -66,6 +72,59 @@ class TestIdentityPermits:
             yield mapping
 
 
+class TestPermitsCache:
+    def test_it(self, cache, identity_permits):
+        result = cache.permits(sentinel.identity, sentinel.context, sentinel.permission)
+
+        identity_permits.assert_called_once_with(
+            sentinel.identity, sentinel.context, sentinel.permission
+        )
+        assert result == identity_permits.return_value
+
+    def test_it_memoizes_results(self, cache, identity_permits, factories):
+        group = factories.Group.build()
+
+        for _ in range(2):
+            cache.permits(sentinel.identity, GroupContext(group), sentinel.permission)
+
+        identity_permits.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "identity,context,permission",
+        (
+            (sentinel.other_identity, sentinel.context, sentinel.permission),
+            (sentinel.identity, sentinel.other_context, sentinel.permission),
+            (sentinel.identity, sentinel.context, sentinel.other_permission),
+        ),
+    )
+    def test_it_doesnt_share_results_between_different_arguments(
+        self, cache, identity_permits, identity, context, permission
+    ):
+        cache.permits(sentinel.identity, sentinel.context, sentinel.permission)
+
+        cache.permits(identity, context, permission)
+
+        assert identity_permits.call_count == 2
+
+    def test_it_doesnt_share_results_between_contexts_with_different_objects(
+        self, cache, identity_permits, factories
+    ):
+        groups = factories.Group.build_batch(size=2)
+
+        for group in groups:
+            cache.permits(sentinel.identity, GroupContext(group), sentinel.permission)
+
+        assert identity_permits.call_count == 2
+
+    @pytest.fixture
+    def cache(self):
+        return PermitsCache()
+
+    @pytest.fixture
+    def identity_permits(self, patch):
+        return patch("h.security.permits.identity_permits")
+
+
 class TestIdentityPermitsIntegrated:
     def test_it(self, user, annotation):
         # We aren't going to go bonkers here, but a couple of tests to show
@@ -84,6 +143,7 @@ class TestIdentityPermitsIntegrated:
             identity, anno_context, Permission.Annotation.MODERATE
         )
         identity.user.memberships[0].roles = [GroupMembershipRoles.OWNER]
+        identity.user.index_memberships()
         assert identity_permits(identity, anno_context, Permission.Annotation.MODERATE)
 
         # Once a user is an admin they can do admin things
@@ -102,3 +162,102 @@ class TestIdentityPermitsIntegrated:
     @pytest.fixture
     def annotation(self, factories, group, user):
         return factories.Annotation(group=group, userid=user.userid, shared=True)
+
+
+class TestRealtimeReaders:
+    @pytest.mark.parametrize("shared", (True, False))
+    @pytest.mark.parametrize(
+        "readable_by", (ReadableBy.world, ReadableBy.members, None)
+    )
+    @pytest.mark.parametrize(
+        "identity_type",
+        (
+            "none",
+            "empty",
+            "creator",
+            "member",
+            "non_member",
+            "matching_client",
+            "other_client",
+            "non_member_with_matching_client",
+        ),
+    )
+    def test_it_matches_identity_permits(
+        self, factories, creator, get_identity, shared, readable_by, identity_type
+    ):
+        group = factories.Group(authority="example.com", readable_by=readable_by)
+        annotation = factories.Annotation(
+            group=group, userid=creator.userid, shared=shared
+        )
+        identity = get_identity(identity_type, group)
+
+        result = RealtimeReaders.for_annotation(annotation).permits(identity)
+
+        assert result == bool(
+            identity_permits(
+                identity,
+                AnnotationContext(annotation),
+                Permission.Annotation.READ_REALTIME_UPDATES,
+            )
+        )
+
+    @pytest.mark.parametrize("identity_type", ("none", "empty", "non_member"))
+    def test_it_denies_shared_annotations_without_a_group(
+        self, factories, get_identity, identity_type
+    ):
+        annotation = factories.Annotation.build(shared=True, group=None)
+
+        readers = RealtimeReaders.for_annotation(annotation)
+
+        assert not readers.permits(get_identity(identity_type, group=None))
+
+    def test_it_allows_everyone_to_read_world_readable_groups(self, factories):
+        annotation = factories.Annotation(
+            group=factories.Group(readable_by=ReadableBy.world), shared=True
+        )
+
+        assert RealtimeReaders.for_annotation(annotation).permits(None)
+
+    def test_it_only_allows_the_creator_to_read_unshared_annotations(
+        self, factories, creator, get_identity
+    ):
+        group = factories.Group()
+        annotation = factories.Annotation(
+            group=group, userid=creator.userid, shared=False
+        )
+
+        readers = RealtimeReaders.for_annotation(annotation)
+
+        assert readers.permits(get_identity("creator", group))
+        assert not readers.permits(get_identity("member", group))
+
+    @pytest.fixture
+    def creator(self, factories):
+        return factories.User()
+
+    @pytest.fixture
+    def get_identity(self, factories, creator):
+        def get_identity(identity_type, group):
+            identities = {
+                "none": lambda: None,
+                "empty": Identity,
+                "creator": lambda: Identity.from_models(user=creator),
+                "member": lambda: Identity.from_models(
+                    user=factories.User(memberships=[GroupMembership(group=group)])
+                ),
+                "non_member": lambda: Identity.from_models(user=factories.User()),
+                "matching_client": lambda: Identity.from_models(
+                    auth_client=factories.AuthClient(authority="example.com")
+                ),
+                "other_client": lambda: Identity.from_models(
+                    auth_client=factories.AuthClient(authority="other.example.com")
+                ),
+                "non_member_with_matching_client": lambda: Identity.from_models(
+                    user=factories.User(),
+                    auth_client=factories.AuthClient(authority="example.com"),
+                ),
+            }
+
+            return identities[identity_type]()
+
+        return get_identity
@@ -1,11 +1,11 @@
-from unittest.mock import sentinel
+from unittest.mock import Mock, call, sentinel
 
 import pytest
 
 from h.security.policy._bearer_token import BearerTokenPolicy
 
 
-@pytest.mark.usefixtures("user_service", "auth_token_service")
+@pytest.mark.usefixtures("user_service", "auth_token_service", "identity_cache")
 class TestBearerTokenPolicy:
     @pytest.mark.parametrize(
         "is_api_request_return_value,expected_result",
@@ -42,6 +42,63 @@ class TestBearerTokenPolicy:
         )
         assert identity == Identity.from_models.return_value
 
+    def test_identity_adds_the_identity_to_the_identity_cache(
+        self, pyramid_request, auth_token_service, identity_cache
+    ):
+        identity = BearerTokenPolicy().identity(pyramid_request)
+
+        token_str = auth_token_service.get_bearer_token.return_value
+        assert identity_cache.fingerprint.call_args_list == [
+            call(pyramid_request.db, token_str),
+            call(pyramid_request.db, token_str),
+        ]
+        identity_cache.get.assert_called_once_with(
+            token_str, identity_cache.fingerprint.return_value
+        )
+        identity_cache.set.assert_called_once_with(
+            token_str,
+            auth_token_service.validate.return_value,
+            identity_cache.fingerprint.return_value,
+            identity,
+        )
+
+    def test_identity_doesnt_cache_identities_which_changed_while_loading(
+        self, pyramid_request, identity_cache
+    ):
+        identity_cache.fingerprint.side_effect = [sentinel.before, sentinel.after]
+
+        BearerTokenPolicy().identity(pyramid_request)
+
+        identity_cache.set.assert_not_called()
+
+    def test_identity_doesnt_check_the_identity_cache_for_unknown_tokens(
+        self, pyramid_request, auth_token_service, identity_cache
+    ):
+        identity_cache.fingerprint.return_value = None
+        auth_token_service.validate.return_value = None
+
+        assert BearerTokenPolicy().identity(pyramid_request) is None
+        identity_cache.get.assert_not_called()
+
+    def test_identity_uses_the_identity_cache(
+        self,
+        pyramid_request,
+        auth_token_service,
+        user_service,
+        identity_cache,
+        newrelic,
+    ):
+        identity_cache.get.return_value = cached_identity = Mock()
+
+        identity = BearerTokenPolicy().identity(pyramid_request)
+
+        auth_token_service.validate.assert_not_called()
+        user_service.fetch.assert_not_called()
+        newrelic.agent.add_custom_attribute.assert_called_once_with(
+            "userid", cached_identity.user.userid
+        )
+        assert identity == cached_identity
+
     def test_identity_caches(self, pyramid_request, auth_token_service):
         policy = BearerTokenPolicy()
 
@@ -98,3 +155,8 @@ def Identity(mocker):
     return mocker.patch(
         "h.security.policy._bearer_token.Identity", autospec=True, spec_set=True
     )
+
+
+@pytest.fixture(autouse=True)
+def newrelic(mocker):
+    return mocker.patch("h.security.policy._bearer_token.newrelic", autospec=True)
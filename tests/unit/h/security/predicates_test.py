@@ -465,6 +465,7 @@ class TestGroupMemberRemove:
                     roles=[authenticated_users_role],
                 )
             )
+            identity.user.index_memberships()
         context.membership.roles = [target_users_role]
 
         assert predicates.group_member_remove(identity, context) == expected_result
@@ -489,6 +490,7 @@ class TestGroupMemberRemove:
                 roles=[role],
             )
         )
+        identity.user.index_memberships()
         context.membership.roles = [role]
 
         assert predicates.group_member_remove(identity, context) is True
@@ -983,6 +985,7 @@ class TestGroupMemberEdit:
                     roles=authenticated_users_roles,
                 )
             )
+            identity.user.index_memberships()
 
         assert predicates.group_member_edit(identity, context) == expected_result
 
@@ -1022,6 +1025,7 @@ class TestGroupMemberEdit:
                 roles=old_roles,
             )
         )
+        identity.user.index_memberships()
         identity.user.userid = context.user.userid
 
         assert predicates.group_member_edit(identity, context) == expected_result
@@ -1112,6 +1116,38 @@ class TestResolvePredicates:
 
         assert result == {"permission": [expansion]}
 
+    def test_it_replaces_permissions_with_their_predicates(self):
+        result = predicates.resolve_predicates(
+            {
+                "outer": [[predicates.annotation_live, "inner"]],
+                "inner": [[predicates.user_is_staff], [predicates.user_is_admin]],
+            }
+        )
+
+        assert result["outer"] == [
+            [
+                predicates.annotation_found,
+                predicates.annotation_live,
+                predicates.authenticated,
+                predicates.authenticated_user,
+                predicates.user_is_staff,
+            ],
+            [
+                predicates.annotation_found,
+                predicates.annotation_live,
+                predicates.authenticated,
+                predicates.authenticated_user,
+                predicates.user_is_admin,
+            ],
+        ]
+
+    def test_it_drops_clauses_with_unknown_permissions(self):
+        result = predicates.resolve_predicates(
+            {"permission": [[predicates.authenticated, "unknown"]]}
+        )
+
+        assert not result["permission"]
+
 
 @pytest.fixture
 def annotation_context(factories):
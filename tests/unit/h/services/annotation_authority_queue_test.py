@@ -4,9 +4,11 @@ from unittest.mock import sentinel
 import pytest
 
 from h.services.annotation_authority_queue import (
+    BROKER_POOL_LIMIT,
     AnnotationAuthorityQueueService,
     AuthorityQueueConfiguration,
     factory,
+    get_celery_app,
 )
 
 
@@ -42,7 +44,6 @@ class TestAnnotationAuthorityQueueService:
         annotation_read_service,
         annotation_json_service,
         annotation,
-        Connection,
     ):
         annotation_presented = {"id": annotation.id}
         annotation_json_service.present_for_user.return_value = annotation_presented
@@ -62,12 +63,12 @@ class TestAnnotationAuthorityQueueService:
         assert annotation_presented["quote"] == annotation.quote
         Celery.assert_called_once_with(
             annotation_read_service.get_annotation_by_id.return_value.authority,
+            broker="url",
+            set_as_current=False,
         )
-        Connection.assert_called_once_with("url")
         Celery.return_value.send_task.assert_called_once_with(
             "task",
             queue="queue",
-            connection=Connection.return_value.__enter__.return_value,
             expires=60 * 60 * 24,
             kwargs={
                 "event": {
@@ -77,6 +78,17 @@ class TestAnnotationAuthorityQueueService:
             },
         )
 
+    def test_publish_reuses_the_celery_app(
+        self, svc, Celery, annotation_read_service, annotation
+    ):
+        annotation_read_service.get_annotation_by_id.return_value = annotation
+
+        svc.publish("create", sentinel.annotation_id)
+        svc.publish("update", sentinel.annotation_id)
+
+        Celery.assert_called_once()
+        assert Celery.return_value.send_task.call_count == 2
+
     def test_publish_with_invalid_annotation(
         self, svc, Celery, annotation_read_service
     ):
@@ -111,10 +123,6 @@ class TestAnnotationAuthorityQueueService:
     def Celery(self, patch):
         return patch("h.services.annotation_authority_queue.Celery")
 
-    @pytest.fixture
-    def Connection(self, patch):
-        return patch("h.services.annotation_authority_queue.Connection")
-
     @pytest.fixture
     def valid_config(self):
         return json.dumps(
@@ -145,6 +153,21 @@ class TestAnnotationAuthorityQueueService:
         )
 
 
+class TestGetCeleryApp:
+    def test_it(self):
+        app = get_celery_app("lms", "memory://")
+
+        assert app.main == "lms"
+        assert app.conf.broker_url == "memory://"
+        assert app.conf.broker_pool_limit == BROKER_POOL_LIMIT
+
+    def test_it_caches_apps(self):
+        assert get_celery_app("lms", "memory://") is get_celery_app("lms", "memory://")
+        assert get_celery_app("lms", "memory://") is not get_celery_app(
+            "other", "memory://"
+        )
+
+
 class TestFactory:
     def test_it(
         self,
@@ -170,3 +193,8 @@ class TestFactory:
         return patch(
             "h.services.annotation_authority_queue.AnnotationAuthorityQueueService"
         )
+
+
+@pytest.fixture(autouse=True)
+def clear_celery_app_cache():
+    get_celery_app.cache_clear()
@@ -1,5 +1,5 @@
 from datetime import datetime
-from unittest.mock import sentinel
+from unittest.mock import call, sentinel
 
 import pytest
 from h_matchers import Any
@@ -158,19 +158,17 @@ class TestAnnotationJSONService:
         )
 
     def test_present_for_user_only_shows_moderation_to_moderators(
-        self, service, annotation, user, identity_permits, Identity
+        self, service, annotation, user, permits_cache, Identity
     ):
-        identity_permits.return_value = False
+        permits_cache.permits.return_value = False
 
         result = service.present_for_user(annotation, user)
 
         Identity.from_models.assert_called_once_with(user=user)
-        identity_permits.assert_called_once_with(
-            identity=Identity.from_models.return_value,
-            context=Any.instance_of(AnnotationContext).with_attrs(
-                {"annotation": annotation}
-            ),
-            permission=Permission.Annotation.MODERATE,
+        permits_cache.permits.assert_called_once_with(
+            Identity.from_models.return_value,
+            Any.instance_of(AnnotationContext).with_attrs({"annotation": annotation}),
+            Permission.Annotation.MODERATE,
         )
 
         assert "moderation" not in result
@@ -187,9 +185,9 @@ class TestAnnotationJSONService:
 
     @pytest.mark.usefixtures("with_hidden_annotation")
     def test_present_for_user_hidden_censors_content_for_normal_users(
-        self, service, annotation, user, identity_permits
+        self, service, annotation, user, permits_cache
     ):
-        identity_permits.return_value = False
+        permits_cache.permits.return_value = False
 
         result = service.present_for_user(annotation, user)
 
@@ -199,9 +197,9 @@ class TestAnnotationJSONService:
 
     @pytest.mark.usefixtures("with_hidden_annotation")
     def test_present_for_user_hidden_shows_everything_to_moderators(
-        self, service, annotation, user, identity_permits
+        self, service, annotation, user, permits_cache
     ):
-        identity_permits.return_value = True
+        permits_cache.permits.return_value = True
 
         result = service.present_for_user(annotation, user)
 
@@ -217,8 +215,12 @@ class TestAnnotationJSONService:
         annotation_read_service,
         flag_service,
         user_service,
+        Identity,
+        PermitsCache,
+        factories,
     ):
-        annotation_read_service.get_annotations_by_id.return_value = [annotation]
+        annotations = [annotation, factories.Annotation()]
+        annotation_read_service.get_annotations_by_id.return_value = annotations
 
         result = service.present_all_for_user(sentinel.annotation_ids, user)
 
@@ -232,12 +234,22 @@ class TestAnnotationJSONService:
         )
         flag_service.all_flagged.assert_called_once_with(user, sentinel.annotation_ids)
         flag_service.flag_counts.assert_called_once_with(sentinel.annotation_ids)
-        user_service.fetch_all.assert_called_once_with([annotation.userid])
+        user_service.fetch_all.assert_called_once_with(
+            [annotation.userid for annotation in annotations]
+        )
+        # The identity and permissions are shared between all the annotations
+        Identity.from_models.assert_called_once_with(user=user)
+        PermitsCache.assert_called_once_with()
+        assert PermitsCache.return_value.permits.call_args_list == [
+            call(
+                Identity.from_models.return_value, Any(), Permission.Annotation.MODERATE
+            )
+        ] * len(annotations)
 
         assert result == [
             # A few indicative fields to show we are serializing
             Any.dict.containing({"id": Any(), "hidden": False})
-        ]
+        ] * len(annotations)
 
     @pytest.fixture
     def service(
@@ -282,6 +294,14 @@ class TestAnnotationJSONService:
     def identity_permits(self, patch):
         return patch("h.services.annotation_json.identity_permits")
 
+    @pytest.fixture(autouse=True)
+    def PermitsCache(self, patch):
+        return patch("h.services.annotation_json.PermitsCache")
+
+    @pytest.fixture
+    def permits_cache(self, PermitsCache):
+        return PermitsCache.return_value
+
     @pytest.fixture(autouse=True)
     def DocumentJSONPresenter(self, patch):
         return patch("h.services.annotation_json.DocumentJSONPresenter")
@@ -0,0 +1,46 @@
+from time import perf_counter
+
+import pytest
+
+from h.services.annotation_read import AnnotationReadService
+
+
+@pytest.mark.skip("Only of use during development")
+class TestGetAnnotationsByIdSpeed:  # pragma: no cover
+    """Compare the old `ids.index()` ordering with the current implementation."""
+
+    @pytest.mark.parametrize("count", (200, 2000, 20000))
+    def test_sorting_with_index(self, annotations, count):
+        ids = [annotation.id for annotation in annotations]
+        rows = list(reversed(annotations))
+
+        start = perf_counter()
+        sorted(rows, key=lambda annotation: ids.index(annotation.id))
+        self.report("Sorting with ids.index()", count, start)
+
+    @pytest.mark.parametrize("count", (200, 2000, 20000))
+    @pytest.mark.parametrize("use_identity_map", (True, False))
+    def test_get_annotations_by_id(self, svc, annotations, count, use_identity_map):
+        ids = [annotation.id for annotation in annotations]
+
+        start = perf_counter()
+        results = svc.get_annotations_by_id(ids, use_identity_map=use_identity_map)
+        self.report(f"use_identity_map={use_identity_map}", count, start)
+
+        assert results == annotations
+
+    def report(self, label, count, start):
+        millis = (perf_counter() - start) * 1000
+        print(f"{label} x {count}: {millis} ms")  # noqa: T201
+
+    @pytest.fixture
+    def annotations(self, factories, db_session, count):
+        annotations = factories.Annotation.build_batch(count)
+        db_session.add_all(annotations)
+        db_session.flush()
+
+        return annotations
+
+    @pytest.fixture
+    def svc(self, db_session):
+        return AnnotationReadService(db_session)
@@ -26,6 +26,99 @@ class TestAnnotationReadService:
 
         assert results == annotations
 
+    def test_get_annotations_by_id_with_duplicate_and_missing_ids(self, svc, factories):
+        annotations = factories.Annotation.create_batch(2)
+        ids = [annotation.id for annotation in annotations]
+
+        results = svc.get_annotations_by_id(
+            [ids[1], ids[0], "AAAAAAAAAAAAAAAAAAAAAA", ids[1]]
+        )
+
+        assert results == [annotations[1], annotations[0]]
+
+    def test_get_annotations_by_id_uses_the_identity_map(
+        self, svc, factories, db_session, query_counter
+    ):
+        annotations = factories.Annotation.create_batch(3)
+        db_session.flush()
+        query_counter.reset()
+
+        results = svc.get_annotations_by_id(
+            [annotation.id for annotation in annotations]
+        )
+
+        assert results == annotations
+        assert not query_counter.count
+
+    def test_get_annotations_by_id_without_the_identity_map(
+        self, svc, factories, db_session, query_counter
+    ):
+        annotations = factories.Annotation.create_batch(3)
+        db_session.flush()
+        query_counter.reset()
+
+        results = svc.get_annotations_by_id(
+            [annotation.id for annotation in annotations], use_identity_map=False
+        )
+
+        assert results == annotations
+        assert query_counter.count == 1
+
+    def test_get_annotations_by_id_fetches_expired_annotations(
+        self, svc, factories, db_session, query_counter
+    ):
+        annotations = factories.Annotation.create_batch(3)
+        db_session.flush()
+        ids = [annotation.id for annotation in annotations]
+        db_session.expire(annotations[1])
+        query_counter.reset()
+
+        results = svc.get_annotations_by_id(ids)
+
+        assert results == annotations
+        assert query_counter.count == 1
+        assert "text" not in sa.inspect(annotations[1]).expired_attributes
+        # Expired relationships are lazy loaded if needed, like unloaded ones
+        query_counter.reset()
+        assert svc.get_annotations_by_id(ids) == annotations
+        assert not query_counter.count
+
+    @pytest.mark.parametrize("flush", (True, False))
+    def test_get_annotations_by_id_skips_deleted_annotations(
+        self, svc, factories, db_session, flush
+    ):
+        annotations = factories.Annotation.create_batch(2)
+        db_session.flush()
+        db_session.delete(annotations[0])
+        if flush:
+            db_session.flush()
+
+        results = svc.get_annotations_by_id(
+            [annotation.id for annotation in annotations]
+        )
+
+        assert results == [annotations[1]]
+
+    def test_get_annotations_by_id_fetches_annotations_to_eager_load(
+        self, svc, factories, db_session, query_counter
+    ):
+        annotation_id = factories.Annotation().id
+        db_session.flush()
+        db_session.expunge_all()
+        # Load the annotation without any of its relationships
+        annotation = db_session.get(Annotation, annotation_id)
+        query_counter.reset()
+
+        results = svc.get_annotations_by_id(
+            [annotation_id], eager_load=[Annotation.document]
+        )
+
+        assert results == [annotation]
+        assert query_counter.count
+        query_counter.reset()
+        assert annotation.document
+        assert not query_counter.count
+
     def test_get_annotations_by_id_with_no_input(self, svc):
         assert not svc.get_annotations_by_id(ids=[])
 
@@ -1,13 +1,17 @@
 import datetime
-from unittest.mock import create_autospec, sentinel
+from unittest.mock import Mock, create_autospec, sentinel
 
 import pytest
 from h_matchers import Any
 
 from h.db.types import URLSafeUUID
+from h.models.annotation import ModerationStatus
+from h.presenters import AnnotationSearchIndexPresenter
 from h.search.index import BatchIndexer
+from h.services import annotation_sync
 from h.services.annotation_sync import (
     AnnotationSyncService,
+    BatchSizer,
     Counter,
     DBHelper,
     ESHelper,
@@ -220,6 +224,57 @@ class TestAnnotationSyncService:
         }
         batch_indexer.index.assert_called_once_with([annotation.id])
 
+    def test_if_the_annotation_has_been_moderated_in_the_DB_it_indexes_it(
+        self, batch_indexer, factories, index, svc, queue_service
+    ):
+        annotation = factories.Annotation()
+        index(annotation)
+        job = factories.SyncAnnotationJob(annotation=annotation)
+        queue_service.get.return_value = [job]
+        # Moderation doesn't change the annotation's updated time
+        annotation.moderation_status = ModerationStatus.DENIED
+
+        counts = svc.sync(1)
+
+        assert counts[Counter.Result.SYNCED_DIFFERENT.format(tag="test_tag")] == 1
+        batch_indexer.index.assert_called_once_with([annotation.id])
+
+    def test_if_the_annotations_thread_has_changed_in_the_DB_it_indexes_it(
+        self, batch_indexer, factories, index, svc, queue_service
+    ):
+        annotation = factories.Annotation()
+        index(annotation)
+        job = factories.SyncAnnotationJob(annotation=annotation)
+        queue_service.get.return_value = [job]
+        # Adding a reply doesn't change the annotation itself
+        factories.Annotation(references=[annotation.id])
+
+        counts = svc.sync(1)
+
+        assert counts[Counter.Result.SYNCED_DIFFERENT.format(tag="test_tag")] == 1
+        batch_indexer.index.assert_called_once_with([annotation.id])
+
+    def test_if_the_annotation_has_no_digest_in_Elastic_it_indexes_it(
+        self, batch_indexer, factories, index, svc, queue_service, es_client
+    ):
+        annotation = factories.Annotation()
+        index(annotation)
+        # Simulate a document indexed before digests were added
+        es_client.conn.update(
+            index=es_client.index,
+            doc_type=es_client.mapping_type,
+            id=annotation.id,
+            body={"script": "ctx._source.remove('digest')"},
+            refresh=True,
+        )
+        job = factories.SyncAnnotationJob(annotation=annotation)
+        queue_service.get.return_value = [job]
+
+        counts = svc.sync(1)
+
+        assert counts[Counter.Result.SYNCED_DIFFERENT.format(tag="test_tag")] == 1
+        batch_indexer.index.assert_called_once_with([annotation.id])
+
     def test_if_there_are_multiple_jobs_with_the_same_annotation_id(
         self, batch_indexer, factories, svc, queue_service
     ):
@@ -296,6 +351,50 @@ class TestAnnotationSyncService:
             "Completed/test_tag/Up_to_date_in_Elastic": 1,
         }
 
+    def test_it_uses_the_adaptive_batch_size_by_default(
+        self, svc, queue_service, batch_sizer
+    ):
+        queue_service.get.return_value = []
+
+        svc.sync()
+
+        queue_service.get.assert_called_once_with(
+            name="sync_annotation", limit=batch_sizer.limit
+        )
+
+    def test_it_records_how_long_batches_take(
+        self, factories, svc, queue_service, batch_sizer
+    ):
+        queue_service.get.return_value = factories.SyncAnnotationJob.create_batch(2)
+
+        svc.sync(2)
+
+        batch_sizer.record.assert_called_once_with(2, Any.float())
+
+    @pytest.mark.parametrize("limit,expected", ((None, 200), (100, 100), (300, 200)))
+    def test_the_limit_caps_the_adaptive_batch_size(
+        self, svc, queue_service, batch_sizer, limit, expected
+    ):
+        batch_sizer.limit = 200
+        queue_service.get.return_value = []
+
+        svc.sync(limit)
+
+        queue_service.get.assert_called_once_with(
+            name="sync_annotation", limit=expected
+        )
+
+    @pytest.mark.parametrize("jobs,called", ((1, False), (2, True)))
+    def test_it_calls_on_full_batch_if_the_batch_is_full(
+        self, factories, svc, queue_service, jobs, called
+    ):
+        queue_service.get.return_value = factories.SyncAnnotationJob.create_batch(jobs)
+        on_full_batch = Mock()
+
+        svc.sync(2, on_full_batch=on_full_batch)
+
+        assert on_full_batch.called == called
+
     @pytest.fixture
     def now(self):
         """Return the current UTC time."""
@@ -320,15 +419,77 @@ class TestAnnotationSyncService:
         return create_autospec(BatchIndexer, spec_set=True, instance=True)
 
     @pytest.fixture
-    def svc(self, batch_indexer, db_session, es_client, queue_service):
+    def batch_sizer(self):
+        batch_sizer = create_autospec(BatchSizer, instance=True)
+        batch_sizer.limit = 1000
+        return batch_sizer
+
+    @pytest.fixture
+    def svc(
+        self,
+        batch_indexer,
+        db_session,
+        es_client,
+        queue_service,
+        batch_sizer,
+        nipsa_service,
+        moderation_service,
+    ):
         return AnnotationSyncService(
             batch_indexer=batch_indexer,
-            db_helper=DBHelper(db=db_session),
+            db_helper=DBHelper(
+                db=db_session,
+                nipsa_service=nipsa_service,
+                moderation_service=moderation_service,
+            ),
             es_helper=ESHelper(es=es_client),
             queue_service=queue_service,
+            batch_sizer=batch_sizer,
         )
 
 
+class TestBatchSizer:
+    def test_it_starts_at_the_initial_size(self):
+        assert BatchSizer(initial=500).limit == 500
+
+    def test_it_grows_when_batches_are_fast(self, batch_sizer):
+        # 1000 jobs in 5s: 2000 would take the 10s target
+        batch_sizer.record(1000, 5)
+
+        assert batch_sizer.limit == 1500
+
+    def test_it_shrinks_when_batches_are_slow(self, batch_sizer):
+        # 1000 jobs in 20s: 500 would take the 10s target
+        batch_sizer.record(1000, 20)
+
+        assert batch_sizer.limit == 750
+
+    def test_it_uses_the_rate_of_partial_batches(self, batch_sizer):
+        # A batch that drained the queue is still a good estimate of the rate
+        batch_sizer.record(100, 0.5)
+
+        assert batch_sizer.limit == 1500
+
+    @pytest.mark.parametrize(
+        "jobs,seconds,expected", ((1000, 0.001, 10_000), (1000, 1000, 100))
+    )
+    def test_it_stays_within_bounds(self, batch_sizer, jobs, seconds, expected):
+        for _ in range(10):
+            batch_sizer.record(jobs, seconds)
+
+        assert batch_sizer.limit == expected
+
+    @pytest.mark.parametrize("jobs,seconds", ((0, 1), (10, 0)))
+    def test_it_ignores_empty_batches(self, batch_sizer, jobs, seconds):
+        batch_sizer.record(jobs, seconds)
+
+        assert batch_sizer.limit == 1000
+
+    @pytest.fixture
+    def batch_sizer(self):
+        return BatchSizer()
+
+
 class TestDBHelper:
     def test_get_with_no_jobs(self, db_helper):
         assert db_helper.get([]) == {}
@@ -375,23 +536,82 @@ class TestDBHelper:
         result = db_helper.get(jobs)
 
         assert result == {
-            annotations[0].id: (
-                annotations[0].id,
-                annotations[0].updated,
-                annotations[0].userid,
-            ),
-            annotations[1].id: (
-                annotations[1].id,
-                annotations[1].updated,
-                annotations[1].userid,
-            ),
+            annotation.id: (
+                annotation.id,
+                annotation.updated,
+                annotation.userid,
+                AnnotationSearchIndexPresenter.digest(annotation, nipsa=False),
+                frozenset(),
+                False,
+            )
+            for annotation in annotations
         }
 
+    def test_get_includes_the_thread(
+        self, db_helper, db_session, factories, moderation_service
+    ):
+        annotation = factories.Annotation()
+        replies = factories.Annotation.create_batch(2, references=[annotation.id])
+        # A reply to a reply is still part of the root's thread
+        replies.append(factories.Annotation(references=[annotation.id, replies[0].id]))
+        # A reply to a different annotation isn't
+        factories.Annotation(references=[factories.Annotation().id])
+        job = factories.SyncAnnotationJob(annotation=annotation)
+        db_session.flush()
+        moderation_service.all_hidden.return_value = set()
+
+        result = db_helper.get([job])
+
+        assert result[annotation.id].thread_ids == {reply.id for reply in replies}
+        moderation_service.all_hidden.assert_called_once_with(
+            Any.list.containing(
+                [annotation.id, *(reply.id for reply in replies)]
+            ).only()
+        )
+        assert not result[annotation.id].hidden
+
+    @pytest.mark.parametrize("hidden_replies,expected", ((False, False), (True, True)))
+    def test_get_includes_whether_the_thread_is_hidden(
+        self,
+        db_helper,
+        db_session,
+        factories,
+        moderation_service,
+        hidden_replies,
+        expected,
+    ):
+        annotation = factories.Annotation()
+        reply = factories.Annotation(references=[annotation.id])
+        job = factories.SyncAnnotationJob(annotation=annotation)
+        db_session.flush()
+        moderation_service.all_hidden.return_value = (
+            {annotation.id, reply.id} if hidden_replies else {annotation.id}
+        )
+
+        result = db_helper.get([job])
+
+        assert result[annotation.id].hidden == expected
+
+    def test_get_includes_nipsa_in_the_digest(
+        self, db_helper, db_session, factories, nipsa_service
+    ):
+        annotation = factories.Annotation()
+        job = factories.SyncAnnotationJob(annotation=annotation)
+        db_session.flush()
+        nipsa_service.flagged_userids.return_value = {annotation.userid}
+
+        result = db_helper.get([job])
+
+        nipsa_service.flagged_userids.assert_called_once_with({annotation.userid})
+        assert result[annotation.id].digest == AnnotationSearchIndexPresenter.digest(
+            annotation, nipsa=True
+        )
+
     # TODO: Annotations that don't exist in the DB.  # noqa: FIX002, TD002, TD003
 
     @pytest.fixture
-    def db_helper(self, db_session):
-        return DBHelper(db_session)
+    def db_helper(self, db_session, nipsa_service, moderation_service):
+        return DBHelper(db_session, nipsa_service, moderation_service)
 
 
 class TestESHelper:
@@ -455,14 +675,16 @@ class TestESHelper:
         result = es_helper.get(jobs)
 
         assert result == {
-            annotations[0].id: {
-                "updated": annotations[0].updated,
-                "user": annotations[0].userid,
-            },
-            annotations[1].id: {
-                "updated": annotations[1].updated,
-                "user": annotations[1].userid,
-            },
+            annotation.id: {
+                "updated": annotation.updated,
+                "user": annotation.userid,
+                "digest": AnnotationSearchIndexPresenter.digest(
+                    annotation, nipsa=False
+                ),
+                "thread_ids": [],
+                "hidden": False,
+            }
+            for annotation in annotations
         }
 
     @pytest.fixture
@@ -618,19 +840,26 @@ class TestFactory:
         db_session,
         pyramid_request,
         queue_service,
+        nipsa_service,
+        moderation_service,
     ):
         svc = factory(sentinel.context, pyramid_request)
 
         BatchIndexer.assert_called_once_with(
             pyramid_request.db, pyramid_request.es, pyramid_request
         )
-        DBHelper.assert_called_once_with(db=db_session)
+        DBHelper.assert_called_once_with(
+            db=db_session,
+            nipsa_service=nipsa_service,
+            moderation_service=moderation_service,
+        )
         ESHelper.assert_called_once_with(es=pyramid_request.es)
         AnnotationSyncService.assert_called_once_with(
             batch_indexer=BatchIndexer.return_value,
             db_helper=DBHelper.return_value,
             es_helper=ESHelper.return_value,
             queue_service=queue_service,
+            batch_sizer=annotation_sync._batch_sizer,  # noqa: SLF001
         )
         assert svc == AnnotationSyncService.return_value
 
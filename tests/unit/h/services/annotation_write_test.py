@@ -160,10 +160,27 @@ class TestAnnotationWriteService:
             annotation_id=Any(),
             tag="custom_tag",
             schedule_in=Any(),
-            force=True,
+            force=False,
         )
         assert result.updated == then
 
+    def test_update_annotation_forces_reindexing_document_changes_without_timestamp(
+        self, svc, annotation, queue_service
+    ):
+        svc.update_annotation(
+            annotation,
+            {"document": {"document_meta_dicts": {"meta": 1}}},
+            update_timestamp=False,
+        )
+
+        queue_service.add_by_id.assert_called_once_with(
+            "sync_annotation",
+            annotation_id=Any(),
+            tag=Any(),
+            schedule_in=Any(),
+            force=True,
+        )
+
     def test_update_annotation_with_metadata(
         self, svc, annotation, annotation_metadata_service
     ):
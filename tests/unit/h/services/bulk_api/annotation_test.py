@@ -1,9 +1,11 @@
-from unittest.mock import sentinel  # noqa: INP001
+from collections.abc import Iterator  # noqa: INP001
+from unittest.mock import sentinel
 
 import pytest
 from h_matchers import Any
 
 from h.models import GroupMembership
+from h.services.bulk_api import BadDateFilter
 from h.services.bulk_api.annotation import (
     BulkAnnotation,
     BulkAnnotationService,
@@ -32,7 +34,7 @@ class TestBulkAnnotationService:
     )
     @pytest.mark.parametrize("username", ["USERNAME", "username", "user.name"])
     def test_it_with_single_annotation(
-        self, svc, factories, key, value, visible, username
+        self, svc, factories, db_session, key, value, visible, username
     ):
         values = {
             "shared": True,
@@ -66,10 +68,14 @@ class TestBulkAnnotationService:
                 annotation_slim=anno_slim, data={"some": "value"}
             )
 
-        annotations = svc.annotation_search(
-            authority=self.AUTHORITY,
-            username="USERNAME",
-            created={"gt": "2020-01-01", "lte": "2022-01-01"},
+        db_session.flush()
+
+        annotations = list(
+            svc.annotation_search(
+                authority=self.AUTHORITY,
+                username="USERNAME",
+                created={"gt": "2020-01-01", "lte": "2022-01-01"},
+            )
         )
 
         if visible:
@@ -83,7 +89,7 @@ class TestBulkAnnotationService:
         else:
             assert not annotations
 
-    def test_it_with_more_complex_grouping(self, svc, factories):
+    def test_it_with_more_complex_grouping(self, svc, factories, db_session):
         viewer, author = factories.User.create_batch(2, authority=self.AUTHORITY)
 
         annotations = [
@@ -105,10 +111,14 @@ class TestBulkAnnotationService:
             )
         ]
 
-        matched_annos = svc.annotation_search(
-            authority=self.AUTHORITY,
-            username=viewer.username,
-            created={"gt": "2020-01-01", "lte": "2099-01-01"},
+        db_session.flush()
+
+        matched_annos = list(
+            svc.annotation_search(
+                authority=self.AUTHORITY,
+                username=viewer.username,
+                created={"gt": "2020-01-01", "lte": "2099-01-01"},
+            )
         )
 
         # Only the first two annotations should match
@@ -126,6 +136,36 @@ class TestBulkAnnotationService:
             ).only()
         )
 
+    def test_it_streams_the_results(self, svc, factories, db_session):
+        viewer, author = factories.User.create_batch(2, authority=self.AUTHORITY)
+        group = factories.Group(
+            memberships=[GroupMembership(user=author), GroupMembership(user=viewer)]
+        )
+        factories.AnnotationSlim.create_batch(
+            5, user=author, group=group, shared=True, deleted=False
+        )
+        db_session.flush()
+        svc.STREAM_BATCH_SIZE = 2
+
+        annotations = svc.annotation_search(
+            authority=self.AUTHORITY,
+            username=viewer.username,
+            created={"gt": "2020-01-01", "lte": "2099-01-01"},
+            limit=4,
+        )
+
+        assert isinstance(annotations, Iterator)
+        assert next(annotations).username == author.username
+        assert len(list(annotations)) == 3
+
+    def test_it_raises_for_bad_date_filters_immediately(self, svc):
+        with pytest.raises(BadDateFilter):
+            svc.annotation_search(
+                authority=self.AUTHORITY,
+                username="username",
+                created={"bad_operator": "2020-01-01"},
+            )
+
     @pytest.fixture
     def svc(self, db_session):
         return BulkAnnotationService(db_session)
@@ -1,12 +1,22 @@
 from unittest import mock
-from unittest.mock import sentinel
+from unittest.mock import create_autospec, sentinel
 
 import pytest
 from h_matchers import Any
+from sqlalchemy import delete, update
 
+from h.models import GroupScope, Setting
 from h.models.group import Group, GroupMembership
-from h.services.group_list import GroupListService, group_list_factory
+from h.services.group_list import (
+    GroupListCache,
+    GroupListService,
+    ScopeIndex,
+    group_list_cache_factory,
+    group_list_factory,
+    track_changes,
+)
 from h.services.group_scope import GroupScopeService
+from h.util import group_scope as scope_util
 
 
 class TestListGroupsSessionGroups:
@@ -123,7 +133,7 @@ class TestListGroupsRequestGroups:
     ):
         svc.request_groups(authority=default_authority)
 
-        assert not group_scope_service.fetch_by_scope.call_count
+        assert not group_scope_service.fetch_by_origin.call_count
 
     def test_it_returns_private_groups_if_user(
         self, svc, user, default_authority, sample_groups
@@ -218,17 +228,33 @@ class TestScopedGroups:
     ):
         svc.scoped_groups(default_authority, document_uri)
 
-        group_scope_service.fetch_by_scope.assert_called_once_with(document_uri)
+        group_scope_service.fetch_by_origin.assert_called_once_with("http://foo.com")
+
+    def test_it_caches_the_scopes_for_the_origin(
+        self, svc, default_authority, document_uri, group_scope_service
+    ):
+        svc.scoped_groups(default_authority, document_uri)
+        svc.scoped_groups(default_authority, "http://foo.com/other.html")
+
+        group_scope_service.fetch_by_origin.assert_called_once_with("http://foo.com")
 
     def test_it_returns_empty_list_if_no_document_url(self, svc):
         results = svc.scoped_groups(sentinel.authority, document_uri=None)
 
         assert results == []
 
+    def test_it_returns_empty_list_if_the_document_url_has_no_origin(
+        self, svc, group_scope_service
+    ):
+        results = svc.scoped_groups(sentinel.authority, "urn:x-pdf:abc123")
+
+        assert results == []
+        group_scope_service.fetch_by_origin.assert_not_called()
+
     def test_it_returns_empty_list_if_no_matching_scopes(
         self, svc, default_authority, document_uri, group_scope_service
     ):
-        group_scope_service.fetch_by_scope.return_value = []
+        group_scope_service.fetch_by_origin.return_value = []
 
         results = svc.scoped_groups(default_authority, document_uri)
 
@@ -286,7 +312,190 @@ class TestWorldGroup:
         assert w_group is None
 
 
-@pytest.mark.usefixtures("group_scope_service")
+class TestScopeIndex:
+    @pytest.mark.parametrize(
+        "url,group_ids",
+        (
+            ("http://example.com", {1}),
+            ("http://example.com/", {1}),
+            ("http://example.com/foo", {1, 2}),
+            ("http://example.com/foo/bar.html", {1, 2, 3}),
+            ("http://example.com/foobar", {1, 2}),
+            ("http://example.com/bar", {1}),
+            ("http://example.co", set()),
+        ),
+    )
+    def test_group_ids(self, url, group_ids):
+        index = ScopeIndex(
+            [
+                ("http://example.com", 1),
+                ("http://example.com/foo", 2),
+                ("http://example.com/foo/bar", 3),
+                ("http://example.com/foo/", 3),
+            ]
+        )
+
+        assert index.group_ids(url) == group_ids
+
+    def test_it_matches_the_same_urls_as_url_in_scope(self):
+        scopes = [
+            ("http://example.com/a", 1),
+            ("http://example.com/ab", 2),
+            ("http://example.com/b/c", 3),
+        ]
+        index = ScopeIndex(scopes)
+
+        for url in ("http://example.com/abc", "http://example.com/b/c/d"):
+            assert index.group_ids(url) == {
+                group_id
+                for scope, group_id in scopes
+                if scope_util.url_in_scope(url, [scope])
+            }
+
+
+class TestGroupListCache:
+    def test_scope_index(self, cache):
+        loader = mock.Mock(return_value=sentinel.index)
+
+        assert cache.scope_index("http://example.com", loader) == sentinel.index
+        assert cache.scope_index("http://example.com", loader) == sentinel.index
+        loader.assert_called_once_with()
+
+    def test_scope_index_expires(self, cache, monotonic):
+        cache.scope_index("http://example.com", lambda: sentinel.index)
+
+        monotonic.return_value = 60
+
+        assert (
+            cache.scope_index("http://example.com", lambda: sentinel.new_index)
+            == sentinel.new_index
+        )
+
+    def test_scope_index_evicts_the_least_recently_used_origins(self):
+        cache = GroupListCache(maxsize=2)
+        cache.scope_index("http://first.com", lambda: sentinel.first)
+        cache.scope_index("http://second.com", lambda: sentinel.second)
+        cache.scope_index("http://first.com", lambda: None)
+
+        cache.scope_index("http://third.com", lambda: sentinel.third)
+
+        assert cache.scope_index("http://first.com", lambda: None) == sentinel.first
+        assert cache.scope_index("http://second.com", lambda: None) is None
+
+    def test_clear(self, cache):
+        cache.scope_index("http://example.com", lambda: sentinel.index)
+
+        cache.clear()
+
+        assert cache.scope_index("http://example.com", lambda: None) is None
+
+    @pytest.fixture(autouse=True)
+    def monotonic(self, patch):
+        monotonic = patch("h.services.group_list.monotonic")
+        monotonic.return_value = 0
+        return monotonic
+
+
+class TestTrackChanges:
+    def test_it_clears_the_cache_when_groups_are_created(
+        self, db_session, factories, cache
+    ):
+        factories.Group()
+        db_session.commit()
+
+        cache.clear.assert_called_once_with()
+
+    def test_it_clears_the_cache_when_groups_are_updated(
+        self, db_session, group, cache
+    ):
+        group.readable_by = None
+        db_session.commit()
+
+        cache.clear.assert_called_once_with()
+
+    def test_it_clears_the_cache_when_groups_are_deleted(
+        self, db_session, group, cache
+    ):
+        db_session.delete(group)
+        db_session.commit()
+
+        cache.clear.assert_called_once_with()
+
+    def test_it_clears_the_cache_when_scopes_change(
+        self, db_session, factories, group, cache
+    ):
+        group.scopes = [factories.GroupScope(group=group)]
+        db_session.commit()
+
+        cache.clear.assert_called_once_with()
+
+    @pytest.mark.parametrize(
+        "statement",
+        (
+            lambda group: delete(Group).where(Group.id == group.id),
+            lambda group: update(Group).where(Group.id == group.id).values(name="New"),
+            lambda group: delete(GroupScope).where(GroupScope.group_id == group.id),
+        ),
+    )
+    def test_it_clears_the_cache_after_bulk_changes(
+        self, db_session, group, cache, statement
+    ):
+        db_session.execute(statement(group))
+        db_session.commit()
+
+        cache.clear.assert_called_once_with()
+
+    def test_it_ignores_membership_changes(self, db_session, factories, group, cache):
+        group.memberships.append(GroupMembership(user=factories.User()))
+        db_session.commit()
+
+        cache.clear.assert_not_called()
+
+    def test_it_ignores_other_changes(self, db_session, factories, cache):
+        factories.Setting()
+        db_session.execute(update(Setting).values(value="new"))
+        db_session.commit()
+
+        cache.clear.assert_not_called()
+
+    def test_it_does_nothing_until_the_transaction_commits(
+        self, db_session, group, cache
+    ):
+        group.name = "New name"
+        db_session.flush()
+
+        cache.clear.assert_not_called()
+
+    def test_it_forgets_changes_which_are_rolled_back(self, db_session, group, cache):
+        group.name = "New name"
+        db_session.flush()
+        db_session.rollback()
+        db_session.commit()
+
+        cache.clear.assert_not_called()
+
+    @pytest.fixture
+    def group(self, db_session, factories):
+        group = factories.Group()
+        db_session.commit()
+        return group
+
+    @pytest.fixture
+    def cache(self, db_session, group):  # noqa: ARG002
+        cache = create_autospec(GroupListCache, instance=True, spec_set=True)
+        track_changes(db_session, cache)
+        return cache
+
+
+class TestGroupListCacheFactory:
+    def test_it_returns_the_same_cache_every_time(self):
+        cache = group_list_cache_factory(sentinel.context, sentinel.request)
+
+        assert isinstance(cache, GroupListCache)
+        assert group_list_cache_factory(sentinel.context, sentinel.request) is cache
+
+
+@pytest.mark.usefixtures("group_scope_service", "group_list_cache")
 class TestGroupListFactory:
     def test_group_list_factory(self, pyramid_request):
         svc = group_list_factory(None, pyramid_request)
@@ -365,7 +574,7 @@ def sample_groups(factories, other_authority, document_uri, default_authority, u
 @pytest.fixture
 def group_scope_service(pyramid_config, sample_groups):
     service = mock.create_autospec(GroupScopeService, spec_set=True, instance=True)
-    service.fetch_by_scope.return_value = [
+    service.fetch_by_origin.return_value = [
         sample_groups["open"].scopes[0],
         sample_groups["open"].scopes[0],  # This verifies that the groups are de-duped
         sample_groups["restricted"].scopes[0],
@@ -376,11 +585,17 @@ def group_scope_service(pyramid_config, sample_groups):
 
 
 @pytest.fixture
-def svc(pyramid_request, db_session, group_scope_service):
+def cache():
+    return GroupListCache()
+
+
+@pytest.fixture
+def svc(pyramid_request, db_session, group_scope_service, cache):
     return GroupListService(
         session=db_session,
         default_authority=pyramid_request.default_authority,
         group_scope_service=group_scope_service,
+        cache=cache,
     )
 
 
@@ -397,4 +612,5 @@ def svc_no_sample_groups(pyramid_request, pyramid_config, db_session):
         session=db_session,
         default_authority=pyramid_request.default_authority,
         group_scope_service=group_scope_svc,
+        cache=GroupListCache(),
     )
@@ -34,6 +34,17 @@ class TestFetchByScope:
         assert "http://foo.com/bar/" in matching_scope_scopes
 
 
+class TestFetchByOrigin:
+    def test_it_returns_all_the_scopes_for_the_origin(
+        self, svc, sample_scopes, factories
+    ):
+        factories.GroupScope(scope="http://bar.com")
+
+        results = svc.fetch_by_origin("http://foo.com")
+
+        assert sorted(results, key=lambda scope: scope.id) == sample_scopes
+
+
 class TestGroupScopeFactory:
     def test_it_returns_group_scope_service_instance(self, pyramid_request):
         svc = group_scope_factory(None, pyramid_request)
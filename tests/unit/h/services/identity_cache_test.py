@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock, sentinel
+
+import pytest
+
+from h.models import GroupMembership
+from h.security import Identity
+from h.services.identity_cache import IdentityCache, identity_cache_factory
+
+
+class TestIdentityCache:
+    def test_get_returns_None_for_unknown_tokens(self, cache):
+        assert cache.get("unknown", sentinel.fingerprint) is None
+
+    def test_get_returns_a_copy_of_the_cached_identity(self, cache, token, identity):
+        cache.set("token_str", token, sentinel.fingerprint, identity)
+
+        cached_identity = cache.get("token_str", sentinel.fingerprint)
+
+        assert cached_identity == identity
+        assert cached_identity is not identity
+        assert cache.get("token_str", sentinel.fingerprint) is not cached_identity
+
+    def test_the_user_is_shared_between_copies(self, cache, token, identity):
+        cache.set("token_str", token, sentinel.fingerprint, identity)
+
+        assert (
+            cache.get("token_str", sentinel.fingerprint).user
+            is cache.get("token_str", sentinel.fingerprint).user
+            is identity.user
+        )
+
+    def test_replacing_the_user_of_returned_identities_isnt_cached(
+        self, cache, token, identity
+    ):
+        cache.set("token_str", token, sentinel.fingerprint, identity)
+
+        cache.get("token_str", sentinel.fingerprint).user = sentinel.other_user
+        identity.user = sentinel.another_user
+
+        assert cache.get("token_str", sentinel.fingerprint).user == sentinel.user
+
+    def test_it_doesnt_keep_the_token_strings(self, cache, token, identity):
+        cache.set("token_str", token, sentinel.fingerprint, identity)
+
+        assert "token_str" not in cache._entries  # noqa: SLF001
+
+    def test_get_expires_entries_after_the_ttl(self, cache, token, identity, monotonic):
+        cache.set("token_str", token, sentinel.fingerprint, identity)
+
+        monotonic.return_value = 30
+
+        assert cache.get("token_str", sentinel.fingerprint) is None
+        assert not cache._entries  # noqa: SLF001
+
+    def test_get_expires_entries_when_the_token_expires(self, cache, token, identity):
+        cache.set("token_str", token, sentinel.fingerprint, identity)
+
+        token.is_valid.return_value = False
+
+        assert cache.get("token_str", sentinel.fingerprint) is None
+
+    def test_get_expires_entries_when_the_fingerprint_changes(
+        self, cache, token, identity
+    ):
+        cache.set("token_str", token, sentinel.fingerprint, identity)
+
+        assert cache.get("token_str", sentinel.other_fingerprint) is None
+        assert cache.get("token_str", sentinel.fingerprint) is None
+
+    def test_set_replaces_existing_entries(self, cache, token, identity):
+        cache.set("token_str", token, sentinel.fingerprint, identity)
+
+        cache.set("token_str", token, sentinel.fingerprint, Identity())
+
+        assert cache.get("token_str", sentinel.fingerprint) == Identity()
+
+    def test_set_evicts_the_oldest_entries_when_full(self, token, identity):
+        cache = IdentityCache(maxsize=2)
+
+        for token_str in ("first", "second", "third"):
+            cache.set(token_str, token, sentinel.fingerprint, identity)
+
+        assert cache.get("first", sentinel.fingerprint) is None
+        assert cache.get("second", sentinel.fingerprint) == identity
+        assert cache.get("third", sentinel.fingerprint) == identity
+
+    def test_fingerprint_returns_None_for_unknown_tokens(self, db_session):
+        assert IdentityCache.fingerprint(db_session, "unknown") is None
+
+    def test_fingerprint_is_stable(self, db_session, db_token):
+        assert IdentityCache.fingerprint(
+            db_session, db_token.value
+        ) == IdentityCache.fingerprint(db_session, db_token.value)
+
+    @pytest.mark.parametrize(
+        "change",
+        (
+            lambda token, _group: setattr(token.user, "admin", True),
+            lambda token, _group: setattr(token.user, "staff", True),
+            lambda token, _group: setattr(token.user, "username", "renamed"),
+            lambda token, _group: setattr(token.user, "deleted", True),
+            lambda token, _group: setattr(
+                token,
+                "expires",
+                datetime.utcnow() + timedelta(days=1),  # noqa: DTZ003
+            ),
+            lambda token, group: token.user.memberships.append(
+                GroupMembership(group=group, roles=["member"])
+            ),
+            lambda token, _group: setattr(
+                token.user.memberships[0], "roles", ["moderator"]
+            ),
+        ),
+    )
+    def test_fingerprint_changes_when_the_identity_would(
+        self, db_session, factories, db_token, change
+    ):
+        fingerprint = IdentityCache.fingerprint(db_session, db_token.value)
+
+        change(db_token, factories.Group())
+        db_session.flush()
+
+        assert IdentityCache.fingerprint(db_session, db_token.value) != fingerprint
+
+    def test_fingerprint_changes_when_memberships_are_removed(
+        self, db_session, db_token
+    ):
+        fingerprint = IdentityCache.fingerprint(db_session, db_token.value)
+
+        db_session.delete(db_token.user.memberships[0])
+        db_session.flush()
+
+        assert IdentityCache.fingerprint(db_session, db_token.value) != fingerprint
+
+    @pytest.fixture
+    def cache(self):
+        return IdentityCache(ttl=30)
+
+    @pytest.fixture
+    def token(self):
+        token = Mock(spec_set=["is_valid"])
+        token.is_valid.return_value = True
+        return token
+
+    @pytest.fixture
+    def identity(self):
+        return Identity(user=sentinel.user)
+
+    @pytest.fixture
+    def db_token(self, db_session, factories):
+        token = factories.DeveloperToken()
+        token.user.memberships.append(
+            GroupMembership(group=factories.Group(), roles=["member"])
+        )
+        db_session.flush()
+        return token
+
+    @pytest.fixture(autouse=True)
+    def monotonic(self, patch):
+        monotonic = patch("h.services.identity_cache.monotonic")
+        monotonic.return_value = 0
+        return monotonic
+
+
+class TestIdentityCacheFactory:
+    def test_it_returns_the_same_cache_every_time(self):
+        cache = identity_cache_factory(sentinel.context, sentinel.request)
+
+        assert isinstance(cache, IdentityCache)
+        assert identity_cache_factory(sentinel.context, sentinel.request) is cache
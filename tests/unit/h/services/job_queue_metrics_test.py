@@ -1,8 +1,11 @@
 import datetime
+import sys
 from unittest import mock
 
 import pytest
+from freezegun import freeze_time
 
+from h.services import job_queue_metrics as job_queue_metrics_module
 from h.services.job_queue_metrics import JobQueueMetrics, factory
 
 
@@ -22,11 +25,17 @@ class TestJobQueue:
         JobFactory(tag="tag_2")
         JobFactory(priority=2)
         JobFactory(expires_at=now - one_minute)
+        JobFactory(tag="expired_tag", expires_at=now - one_minute)
 
         metrics = job_queue_metrics.metrics()
 
-        assert sorted(metrics) == [
-            ("Custom/JobQueue/Count/Expired", 1),
+        assert sorted(
+            metric
+            for metric in metrics
+            if metric[0].startswith("Custom/JobQueue/Count")
+        ) == [
+            ("Custom/JobQueue/Count/Estimated", 0),
+            ("Custom/JobQueue/Count/Expired", 2),
             ("Custom/JobQueue/Count/Name/name_1/Tag/tag_1", 2),
             ("Custom/JobQueue/Count/Name/name_1/Tag/tag_2", 1),
             ("Custom/JobQueue/Count/Name/name_1/Total", 3),
@@ -37,10 +46,108 @@ class TestJobQueue:
             ("Custom/JobQueue/Count/Total", 4),
         ]
 
+    def test_it_estimates_counts_for_big_queues(self, factories, db_session, patch):
+        estimated_count = patch(
+            "h.services.job_queue_metrics.JobQueueMetrics._estimated_count"
+        )
+        # Big enough that we sample the table, but almost all of it
+        estimated_count.return_value = 100_000
+        factories.Job.create_batch(2, name="name_1", tag="tag_1", priority=1)
+        db_session.flush()
+
+        metrics = dict(JobQueueMetrics(db_session, exact_count_limit=99_999).metrics())
+
+        assert metrics["Custom/JobQueue/Count/Estimated"] == 100_000
+        assert metrics["Custom/JobQueue/Count/Total"] == 2
+        assert metrics["Custom/JobQueue/Count/Name/name_1/Tag/tag_1"] == 2
+        assert metrics["Custom/JobQueue/Count/Priority/1"] == 2
+
+    def test_it_scales_up_sampled_counts(self, factories, db_session, patch):
+        estimated_count = patch(
+            "h.services.job_queue_metrics.JobQueueMetrics._estimated_count"
+        )
+        # The table will only have one page, so it's sampled completely or not
+        # at all, and we can't say which. Either way the counts are scaled up.
+        estimated_count.return_value = 200
+        factories.Job.create_batch(2)
+        db_session.flush()
+
+        metrics = dict(JobQueueMetrics(db_session, exact_count_limit=100).metrics())
+
+        assert metrics["Custom/JobQueue/Count/Total"] in (0, 4)
+
+    def test_metrics_ages(self, factories, job_queue_metrics):
+        now = datetime.datetime.utcnow()  # noqa: DTZ003
+
+        # Priority 0 isn't one of the `Priority` values, but jobs like user
+        # purges are added with it
+        for priority, minutes in ((1, 1), (1, 5), (100, 10), (0, 60)):
+            factories.Job(
+                priority=priority,
+                enqueued_at=now - datetime.timedelta(minutes=minutes),
+                scheduled_at=now - datetime.timedelta(minutes=minutes),
+            )
+        # Jobs that aren't scheduled yet aren't counted
+        for priority in (1, 1000):
+            factories.Job(
+                priority=priority,
+                enqueued_at=now - datetime.timedelta(minutes=30),
+                scheduled_at=now + datetime.timedelta(minutes=1),
+            )
+
+        with freeze_time(now):
+            metrics = dict(job_queue_metrics.metrics())
+
+        assert metrics["Custom/JobQueue/Age/Priority/1"] == 300
+        assert metrics["Custom/JobQueue/Age/Priority/100"] == 600
+        assert metrics["Custom/JobQueue/Age/Priority/0"] == 3600
+        assert "Custom/JobQueue/Age/Priority/1000" not in metrics
+        assert metrics["Custom/JobQueue/Age/Oldest"] == 3600
+
+    def test_metrics_rates(self, factories, db_session, job_queue_metrics, monotonic):
+        monotonic.return_value = 100
+        job_queue_metrics.metrics()
+        factories.Job.create_batch(4)
+        db_session.flush()
+        monotonic.return_value = 102
+
+        metrics = dict(job_queue_metrics.metrics())
+
+        assert metrics["Custom/JobQueue/Rate/Enqueued"] == 2
+        assert metrics["Custom/JobQueue/Rate/Dequeued"] >= 0
+
+    def test_metrics_rates_when_counts_go_backwards(self, job_queue_metrics, monotonic):
+        monotonic.return_value = 100
+        job_queue_metrics.metrics()
+        job_queue_metrics_module._previous_sample = (  # noqa: SLF001
+            job_queue_metrics_module._previous_sample._replace(  # noqa: SLF001
+                enqueued=sys.maxsize, dequeued=sys.maxsize
+            )
+        )
+        monotonic.return_value = 102
+
+        metrics = dict(job_queue_metrics.metrics())
+
+        assert "Custom/JobQueue/Rate/Enqueued" not in metrics
+        assert "Custom/JobQueue/Rate/Dequeued" not in metrics
+
+    def test_metrics_rates_on_the_first_call(self, job_queue_metrics):
+        metrics = dict(job_queue_metrics.metrics())
+
+        assert "Custom/JobQueue/Rate/Enqueued" not in metrics
+
     @pytest.fixture
     def job_queue_metrics(self, db_session):
         return JobQueueMetrics(db_session)
 
+    @pytest.fixture
+    def monotonic(self, patch):
+        return patch("h.services.job_queue_metrics.monotonic")
+
+    @pytest.fixture(autouse=True)
+    def previous_sample(self, monkeypatch):
+        monkeypatch.setattr(job_queue_metrics_module, "_previous_sample", None)
+
 
 class TestFactory:
     def test_it(self, pyramid_request):
@@ -0,0 +1,67 @@
+from time import perf_counter
+
+import pytest
+from sqlalchemy import func, insert, literal, select
+
+from h.models import Annotation, Job
+from h.services.job_queue import JobQueueService
+
+GROUPID = "speed_test_group"
+
+
+@pytest.mark.skip("Only of use during development")
+class TestAddWhereSpeed:  # pragma: no cover
+    """
+    Queue sync jobs for every annotation in a big group, twice.
+
+    This is what happens when a group is reindexed twice before the first
+    batch of jobs has been processed.
+    """
+
+    @pytest.mark.parametrize("count", (200_000, 1_000_000))
+    @pytest.mark.parametrize("deduplicate", (False, True))
+    @pytest.mark.usefixtures("annotations")
+    def test_add_where(self, svc, db_session, count, deduplicate):
+        where = [Annotation.groupid == GROUPID]
+
+        for attempt in ("first", "second"):
+            start = perf_counter()
+            svc.add_where(
+                "sync_annotation",
+                where,
+                tag="speed_test",
+                priority=100,
+                deduplicate=deduplicate,
+            )
+            db_session.flush()
+            seconds = perf_counter() - start
+            print(  # noqa: T201
+                f"deduplicate={deduplicate} x {count}: {attempt} {seconds:.2f}s"
+            )
+
+        jobs = db_session.scalar(
+            select(func.count()).select_from(Job).where(Job.tag == "speed_test")
+        )
+        assert jobs == count if deduplicate else count * 2
+
+    @pytest.fixture
+    def annotations(self, factories, db_session, count):
+        document = factories.Document()
+        db_session.flush()
+
+        db_session.execute(
+            insert(Annotation).from_select(
+                ["userid", "groupid", "target_uri", "document_id", "shared"],
+                select(
+                    literal("acct:speed_test@example.com"),
+                    literal(GROUPID),
+                    literal("http://example.com/speed_test"),
+                    literal(document.id),
+                    literal(True),  # noqa: FBT003
+                ).select_from(func.generate_series(1, count)),
+            )
+        )
+
+    @pytest.fixture
+    def svc(self, db_session):
+        return JobQueueService(db_session)
@@ -100,6 +100,73 @@ class TestQueueService:
 
         assert db_session.query(Job).one().kwargs["force"] == expected_force
 
+    def test_add_where_doesnt_queue_duplicate_jobs(self, factories, db_session, svc):
+        annotations = factories.Annotation.create_batch(2)
+        where = [Annotation.id.in_([annotation.id for annotation in annotations])]
+
+        svc.add_where("sync_annotation", where, "test_tag", 1)
+        svc.add_where("sync_annotation", where, "test_tag", 1)
+
+        jobs = db_session.query(Job).all()
+        assert sorted(job.kwargs["annotation_id"] for job in jobs) == sorted(
+            self.database_id(annotation) for annotation in annotations
+        )
+
+    @freeze_time("2023-01-01")
+    def test_add_where_merges_into_pending_jobs(self, factories, db_session, svc):
+        now = datetime.utcnow()  # noqa: DTZ003
+        annotation = factories.Annotation()
+        where = [Annotation.id == annotation.id]
+        svc.add_where("sync_annotation", where, "first_tag", 100, schedule_in=60)
+
+        svc.add_where("sync_annotation", where, "second_tag", 1, force=True)
+        svc.add_where("sync_annotation", where, "third_tag", 1000, schedule_in=600)
+
+        job = db_session.query(Job).one()
+        assert job.tag == "first_tag"
+        assert job.priority == 1
+        assert job.scheduled_at == now
+        assert job.kwargs["force"] is True
+
+    def test_add_where_extends_the_expiry_of_pending_jobs(
+        self, factories, db_session, svc
+    ):
+        annotation = factories.Annotation()
+        where = [Annotation.id == annotation.id]
+        svc.add_where("sync_annotation", where, "test_tag", 1)
+        job = db_session.query(Job).one()
+        job.expires_at = datetime.utcnow() + timedelta(hours=1)  # noqa: DTZ003
+        db_session.flush()
+
+        svc.add_where("sync_annotation", where, "test_tag", 1)
+
+        db_session.refresh(job)
+        assert job.expires_at > datetime.utcnow() + timedelta(days=29)  # noqa: DTZ003
+
+    def test_add_where_doesnt_merge_into_other_jobs(self, factories, db_session, svc):
+        annotation = factories.Annotation()
+        where = [Annotation.id == annotation.id]
+        factories.SyncAnnotationJob(
+            annotation=annotation,
+            expires_at=datetime.utcnow() - timedelta(hours=1),  # noqa: DTZ003
+        )
+        factories.Job(
+            name="other_job", kwargs={"annotation_id": self.database_id(annotation)}
+        )
+
+        svc.add_where("sync_annotation", where, "test_tag", 1)
+
+        assert db_session.query(Job).count() == 3
+
+    def test_add_where_without_deduplication(self, factories, db_session, svc):
+        annotation = factories.Annotation()
+        where = [Annotation.id == annotation.id]
+
+        svc.add_where("sync_annotation", where, "test_tag", 1)
+        svc.add_where("sync_annotation", where, "test_tag", 1, deduplicate=False)
+
+        assert db_session.query(Job).count() == 2
+
     def test_add_by_id(self, svc, add_where):
         svc.add_by_id(
             sentinel.name,
@@ -213,6 +280,36 @@ class TestQueueService:
 
         assert not db_session.query(Job).all()
 
+    def test_take_latencies(self, factories, svc, db_session):
+        now = datetime.utcnow()  # noqa: DTZ003
+        jobs = [
+            factories.SyncAnnotationJob(
+                tag=tag, enqueued_at=now - timedelta(seconds=seconds)
+            )
+            for tag, seconds in (("tag_1", 10), ("tag_1", 30), ("tag_2", 5))
+        ]
+        db_session.flush()
+
+        with freeze_time(now):
+            svc.delete(jobs)
+
+        assert svc.take_latencies() == {"tag_1": (20, 30), "tag_2": (5, 5)}
+        assert not svc.take_latencies()
+
+    def test_take_latencies_ignores_jobs_without_an_enqueued_time(
+        self, factories, svc, db_session
+    ):
+        job = factories.SyncAnnotationJob()
+        db_session.flush()
+        job.enqueued_at = None
+
+        svc.delete([job])
+
+        assert not svc.take_latencies()
+
+    def test_priority_values(self):
+        assert Priority.values() == {1, 100, 1000}
+
     def test_factory(self, pyramid_request, db_session):
         svc = factory(sentinel.context, pyramid_request)
 
@@ -19,6 +19,31 @@ class TestNipsaService:
     def test_is_flagged_returns_false_for_unknown_users(self, svc):
         assert not svc.is_flagged("acct:not_in_the_db@example.com")
 
+    def test_flagged_userids(self, svc):
+        flagged = svc.flagged_userids(
+            [
+                "acct:flagged_user@example.com",
+                "acct:unflagged_user@example.com",
+                "acct:not_in_the_db@example.com",
+            ]
+        )
+
+        assert flagged == {"acct:flagged_user@example.com"}
+
+    def test_flagged_userids_with_no_userids(self, svc):
+        assert svc.flagged_userids([]) == set()
+
+    def test_flagged_userids_uses_the_cache_if_populated(self, svc, users):
+        svc.fetch_all_flagged_userids()
+        # Not reflected in the cache
+        users["flagged_user_2"].nipsa = False
+
+        flagged = svc.flagged_userids(
+            ["acct:flagged_user_2@example.com", "acct:unflagged_user@example.com"]
+        )
+
+        assert flagged == {"acct:flagged_user_2@example.com"}
+
     def test_flag_sets_nipsa_true(self, svc, users):
         svc.flag(users["unflagged_user"])
 
@@ -32,7 +57,6 @@ class TestNipsaService:
             "sync_annotation",
             "acct:unflagged_user@example.com",
             tag="NipsaService.flag",
-            force=True,
             schedule_in=30,
         )
 
@@ -49,7 +73,6 @@ class TestNipsaService:
             "sync_annotation",
             "acct:flagged_user@example.com",
             tag="NipsaService.unflag",
-            force=True,
             schedule_in=30,
         )
 
@@ -0,0 +1,189 @@
+from unittest.mock import sentinel
+
+import pytest
+from sqlalchemy import select
+
+from h.models import Group, GroupMembership
+from h.services.profile_cache import CachedProfile, ProfileCache, profile_cache_factory
+
+
+class TestProfileCache:
+    def test_get_returns_None_for_unknown_keys(self, cache):
+        assert cache.get(("unknown",), sentinel.fingerprint) is None
+
+    def test_set_returns_the_profile_and_its_etag(self, cache, profile):
+        result = cache.set((1, "example.com"), profile, sentinel.fingerprint)
+
+        assert result == CachedProfile(profile, ProfileCache.etag(profile))
+
+    def test_get_returns_the_cached_profile(self, cache, profile):
+        cached_profile = cache.set((1, "example.com"), profile, sentinel.fingerprint)
+
+        assert cache.get((1, "example.com"), sentinel.fingerprint) == cached_profile
+
+    def test_get_expires_entries_after_the_ttl(self, cache, profile, monotonic):
+        cache.set((1, "example.com"), profile, sentinel.fingerprint)
+
+        monotonic.return_value = 30
+
+        assert cache.get((1, "example.com"), sentinel.fingerprint) is None
+        assert not cache._entries  # noqa: SLF001
+
+    def test_get_expires_entries_when_the_fingerprint_changes(self, cache, profile):
+        cache.set((1, "example.com"), profile, sentinel.fingerprint)
+
+        assert cache.get((1, "example.com"), sentinel.other_fingerprint) is None
+        assert cache.get((1, "example.com"), sentinel.fingerprint) is None
+
+    def test_set_replaces_existing_entries(self, cache, profile):
+        cache.set((1, "example.com"), profile, sentinel.fingerprint)
+
+        cache.set(
+            (1, "example.com"),
+            {"userid": "acct:other@example.com"},
+            sentinel.fingerprint,
+        )
+
+        assert cache.get((1, "example.com"), sentinel.fingerprint).profile == {
+            "userid": "acct:other@example.com"
+        }
+
+    def test_set_evicts_the_oldest_entries_when_full(self, profile):
+        cache = ProfileCache(maxsize=2)
+
+        for user_id in (1, 2, 3):
+            cache.set((user_id,), profile, sentinel.fingerprint)
+
+        assert cache.get((1,), sentinel.fingerprint) is None
+        assert cache.get((2,), sentinel.fingerprint)
+        assert cache.get((3,), sentinel.fingerprint)
+
+    def test_etag_changes_when_the_profile_does(self, profile):
+        etag = ProfileCache.etag(profile)
+
+        assert ProfileCache.etag(dict(profile)) == etag
+        assert ProfileCache.etag(dict(profile, features={"foo": False})) != etag
+
+    def test_fingerprint_is_stable(self, db_session, user, world_group):
+        assert ProfileCache.fingerprint(
+            db_session, user.id, world_group.authority
+        ) == ProfileCache.fingerprint(db_session, user.id, world_group.authority)
+
+    def test_fingerprint_for_logged_out_users(self, db_session, world_group):
+        fingerprint = ProfileCache.fingerprint(db_session, None, world_group.authority)
+
+        world_group.name = "Renamed"
+        db_session.flush()
+
+        assert (
+            ProfileCache.fingerprint(db_session, None, world_group.authority)
+            != fingerprint
+        )
+
+    @pytest.mark.parametrize(
+        "change",
+        (
+            lambda user, _factories, _world_group: setattr(
+                user, "display_name", "Renamed"
+            ),
+            lambda user, _factories, _world_group: setattr(
+                user, "sidebar_tutorial_dismissed", True
+            ),
+            lambda user, _factories, _world_group: setattr(user, "admin", True),
+            lambda user, _factories, _world_group: setattr(user, "staff", True),
+            lambda user, factories, _world_group: user.memberships.append(
+                GroupMembership(group=factories.Group())
+            ),
+            lambda user, _factories, _world_group: setattr(
+                user.memberships[0].group, "name", "Renamed"
+            ),
+            lambda _user, _factories, world_group: setattr(
+                world_group, "name", "Renamed"
+            ),
+            lambda _user, factories, _world_group: factories.Feature(everyone=True),
+            lambda user, factories, _world_group: factories.FeatureCohort(
+                members=[user], features=[factories.Feature()]
+            ),
+        ),
+    )
+    def test_fingerprint_changes_when_the_profile_would(
+        self, db_session, factories, user, world_group, change
+    ):
+        fingerprint = ProfileCache.fingerprint(
+            db_session, user.id, world_group.authority
+        )
+
+        change(user, factories, world_group)
+        db_session.flush()
+
+        assert (
+            ProfileCache.fingerprint(db_session, user.id, world_group.authority)
+            != fingerprint
+        )
+
+    def test_fingerprint_changes_when_memberships_are_removed(
+        self, db_session, user, world_group
+    ):
+        fingerprint = ProfileCache.fingerprint(
+            db_session, user.id, world_group.authority
+        )
+
+        db_session.delete(user.memberships[0])
+        db_session.flush()
+
+        assert (
+            ProfileCache.fingerprint(db_session, user.id, world_group.authority)
+            != fingerprint
+        )
+
+    def test_fingerprint_ignores_other_users(
+        self, db_session, factories, user, world_group
+    ):
+        feature = factories.Feature()
+        db_session.flush()
+        fingerprint = ProfileCache.fingerprint(
+            db_session, user.id, world_group.authority
+        )
+
+        other_user = factories.User()
+        other_user.memberships.append(GroupMembership(group=factories.Group()))
+        factories.FeatureCohort(members=[other_user], features=[feature])
+        db_session.flush()
+
+        assert (
+            ProfileCache.fingerprint(db_session, user.id, world_group.authority)
+            == fingerprint
+        )
+
+    @pytest.fixture
+    def cache(self):
+        return ProfileCache(ttl=30)
+
+    @pytest.fixture
+    def profile(self):
+        return {"userid": "acct:user@example.com", "features": {"foo": True}}
+
+    @pytest.fixture
+    def user(self, db_session, factories):
+        user = factories.User()
+        user.memberships.append(GroupMembership(group=factories.Group()))
+        db_session.flush()
+        return user
+
+    @pytest.fixture
+    def world_group(self, db_session):
+        return db_session.scalars(select(Group).where(Group.pubid == "__world__")).one()
+
+    @pytest.fixture(autouse=True)
+    def monotonic(self, patch):
+        monotonic = patch("h.services.profile_cache.monotonic")
+        monotonic.return_value = 0
+        return monotonic
+
+
+class TestProfileCacheFactory:
+    def test_it_returns_the_same_cache_every_time(self):
+        cache = profile_cache_factory(sentinel.context, sentinel.request)
+
+        assert isinstance(cache, ProfileCache)
+        assert profile_cache_factory(sentinel.context, sentinel.request) is cache
@@ -1,6 +1,7 @@
 from unittest.mock import MagicMock, call, create_autospec, patch, sentinel
 
 import pytest
+from elasticsearch.exceptions import NotFoundError
 from h_matchers import Any
 
 from h.events import AnnotationEvent
@@ -45,7 +46,7 @@ class TestAddAnnotationById:
 
         mock_es_client.conn.index.assert_not_called()
 
-    def test_it_also_adds_the_thread_root(
+    def test_it_also_updates_the_thread_root(
         self,
         search_index,
         reply_annotation,
@@ -53,18 +54,13 @@ class TestAddAnnotationById:
         annotation_read_service,
         add_annotation,
     ):
-        annotation_read_service.get_annotation_by_id.side_effect = (
-            reply_annotation,
-            root_annotation,
-        )
-
-        search_index.add_annotation_by_id(reply_annotation.id)
+        annotation_read_service.get_annotation_by_id.return_value = reply_annotation
 
-        annotation_read_service.get_annotation_by_id.assert_has_calls(
-            [call(reply_annotation.id), call(root_annotation.id)]
-        )
+        with patch.object(search_index, "update_thread_root_by_id") as update:
+            search_index.add_annotation_by_id(reply_annotation.id)
 
-        add_annotation.assert_has_calls([call(reply_annotation), call(root_annotation)])
+        add_annotation.assert_called_once_with(reply_annotation)
+        update.assert_called_once_with(root_annotation.id)
 
     @pytest.fixture
     def root_annotation(self, factories):
@@ -82,6 +78,83 @@ class TestAddAnnotationById:
             yield add_annotation
 
 
+class TestUpdateThreadRootById:
+    def test_it(
+        self,
+        search_index,
+        annotation,
+        annotation_read_service,
+        mock_es_client,
+        AnnotationSearchIndexPresenter,
+        pyramid_request,
+    ):
+        search_index.update_thread_root_by_id(annotation.id)
+
+        annotation_read_service.get_annotation_by_id.assert_called_once_with(
+            annotation.id
+        )
+        AnnotationSearchIndexPresenter.assert_called_once_with(
+            annotation, pyramid_request
+        )
+        mock_es_client.conn.update.assert_called_once_with(
+            index=mock_es_client.index,
+            doc_type=mock_es_client.mapping_type,
+            id=annotation.id,
+            body={
+                "doc": AnnotationSearchIndexPresenter.return_value.thread_fields.return_value
+            },
+        )
+        mock_es_client.conn.index.assert_not_called()
+
+    @pytest.mark.usefixtures("with_reindex_in_progress")
+    def test_it_updates_the_new_index_during_a_reindex(
+        self, search_index, annotation, mock_es_client
+    ):
+        search_index.update_thread_root_by_id(annotation.id)
+
+        assert [
+            update.kwargs["index"]
+            for update in mock_es_client.conn.update.call_args_list
+        ] == [mock_es_client.index, "another_index"]
+
+    def test_it_indexes_the_whole_root_if_it_isnt_indexed(
+        self, search_index, annotation, mock_es_client, AnnotationSearchIndexPresenter
+    ):
+        mock_es_client.conn.update.side_effect = NotFoundError
+
+        search_index.update_thread_root_by_id(annotation.id)
+
+        mock_es_client.conn.index.assert_called_once_with(
+            index=mock_es_client.index,
+            doc_type=mock_es_client.mapping_type,
+            body=AnnotationSearchIndexPresenter.return_value.asdict.return_value,
+            id=annotation.id,
+        )
+
+    @pytest.mark.parametrize("deleted", (True, None))
+    def test_it_does_nothing_if_the_annotation_is_missing_or_deleted(
+        self, search_index, annotation, annotation_read_service, mock_es_client, deleted
+    ):
+        if deleted:
+            annotation.deleted = True
+        else:
+            annotation_read_service.get_annotation_by_id.return_value = None
+
+        search_index.update_thread_root_by_id(annotation.id)
+
+        mock_es_client.conn.update.assert_not_called()
+
+    @pytest.fixture
+    def annotation(self, factories, annotation_read_service):
+        annotation = factories.Annotation.build()
+        annotation_read_service.get_annotation_by_id.return_value = annotation
+        return annotation
+
+    @pytest.fixture(autouse=True)
+    def AnnotationSearchIndexPresenter(self, patch):
+        return patch("h.services.search_index.AnnotationSearchIndexPresenter")
+
+
 class TestAddAnnotation:
     def test_it(
         self,
@@ -200,6 +273,25 @@ class TestHandleAnnotationEvent:
         async_handler.assert_called_once_with(event.annotation_id)
         assert result == async_handler.return_value
 
+    def test_it_accumulates_events_when_batching(
+        self, search_index, pyramid_request, handler_for, action
+    ):
+        search_index._batch_events = True  # noqa: SLF001
+        events = [
+            AnnotationEvent(pyramid_request, annotation_id, action)
+            for annotation_id in ("id_1", "id_2")
+        ]
+
+        results = [search_index.handle_annotation_event(event) for event in events]
+
+        assert results == [True, True]
+        handler_for(action, synchronous=True).assert_not_called()
+        handler_for(action, synchronous=False).assert_not_called()
+        # The events are flushed once, at the end of the request
+        assert list(pyramid_request.finished_callbacks) == [
+            search_index._flush_events_callback  # noqa: SLF001
+        ]
+
     @pytest.fixture(autouse=True)
     def handler_for(self, add_annotation_by_id, delete_annotation_by_id, tasks):
         handler_map = {
@@ -237,6 +329,206 @@ class TestHandleAnnotationEvent:
             yield delete_annotation_by_id
 
 
+class TestFlushEvents:
+    def test_it_indexes_the_events_in_one_bulk_request(
+        self,
+        search_index,
+        factories,
+        annotation_read_service,
+        AnnotationSearchIndexPresenter,
+        es_helpers,
+        mock_es_client,
+        pyramid_request,
+    ):
+        annotations = factories.Annotation.build_batch(2)
+        deleted_annotation = factories.Annotation.build(deleted=True)
+        annotation_read_service.get_annotations_by_id.return_value = [
+            *annotations,
+            deleted_annotation,
+        ]
+        add_events(
+            search_index,
+            pyramid_request,
+            [(annotation.id, "create") for annotation in annotations]
+            + [(deleted_annotation.id, "update"), ("deleted_id", "delete")],
+        )
+
+        search_index.flush_events()
+
+        annotation_read_service.get_annotations_by_id.assert_called_once_with(
+            [annotation.id for annotation in annotations] + [deleted_annotation.id]
+        )
+        AnnotationSearchIndexPresenter.present_all.assert_called_once_with(
+            annotations, pyramid_request
+        )
+        es_helpers.bulk.assert_called_once_with(
+            mock_es_client.conn, Any(), raise_on_error=False
+        )
+        assert actions(es_helpers) == [
+            (mock_es_client.index, annotations[0].id, {"id": annotations[0].id}),
+            (mock_es_client.index, annotations[1].id, {"id": annotations[1].id}),
+            (mock_es_client.index, "deleted_id", {"deleted": True}),
+        ]
+
+    def test_it_partially_updates_thread_roots(
+        self,
+        search_index,
+        factories,
+        annotation_read_service,
+        AnnotationSearchIndexPresenter,
+        es_helpers,
+        pyramid_request,
+    ):
+        root = factories.Annotation.build()
+        reply = factories.Annotation.build(references=[root.id])
+        other_reply = factories.Annotation.build(references=[root.id, reply.id])
+        annotation_read_service.get_annotations_by_id.side_effect = [
+            [reply, other_reply],
+            [root],
+        ]
+        add_events(
+            search_index,
+            pyramid_request,
+            [(reply.id, "create"), (other_reply.id, "create")],
+        )
+
+        search_index.flush_events()
+
+        bulk_actions = list(es_helpers.bulk.call_args[0][1])
+        annotation_read_service.get_annotations_by_id.assert_called_with([root.id])
+        AnnotationSearchIndexPresenter.present_thread_fields_all.assert_called_once_with(
+            [root], pyramid_request
+        )
+        assert [(action["_op_type"], action["_id"]) for action in bulk_actions] == [
+            ("index", reply.id),
+            ("index", other_reply.id),
+            # Only one update for the root, however many replies it has
+            ("update", root.id),
+        ]
+        assert bulk_actions[-1]["doc"] == {"thread_ids": root.thread_ids}
+
+    @pytest.mark.usefixtures("with_reindex_in_progress")
+    def test_it_indexes_into_the_new_index_during_a_reindex(
+        self,
+        search_index,
+        factories,
+        annotation_read_service,
+        es_helpers,
+        mock_es_client,
+        pyramid_request,
+    ):
+        annotation = factories.Annotation.build()
+        annotation_read_service.get_annotations_by_id.return_value = [annotation]
+        add_events(search_index, pyramid_request, [(annotation.id, "update")])
+
+        search_index.flush_events()
+
+        assert [action[0] for action in actions(es_helpers)] == [
+            mock_es_client.index,
+            "another_index",
+        ]
+
+    def test_it_retries_errors_asynchronously(
+        self, search_index, es_helpers, tasks, pyramid_request
+    ):
+        es_helpers.bulk.return_value = (
+            0,
+            [
+                {"index": {"_id": "add_id"}},
+                {"index": {"_id": "delete_id"}},
+                # e.g. a partial update of a root which hasn't been indexed
+                {"update": {"_id": "root_id"}},
+            ],
+        )
+        add_events(
+            search_index,
+            pyramid_request,
+            [("add_id", "create"), ("delete_id", "delete"), ("ok_id", "create")],
+        )
+
+        search_index.flush_events()
+
+        tasks.indexer.add_annotation.delay.assert_has_calls(
+            [call("add_id"), call("root_id")], any_order=True
+        )
+        tasks.indexer.delete_annotation.delay.assert_called_once_with("delete_id")
+
+    def test_it_falls_back_to_async_if_the_bulk_request_fails(
+        self, search_index, es_helpers, tasks, report_exception, pyramid_request
+    ):
+        es_helpers.bulk.side_effect = ValueError
+        add_events(
+            search_index,
+            pyramid_request,
+            [("add_id", "create"), ("delete_id", "delete")],
+        )
+
+        search_index.flush_events()
+
+        report_exception.assert_called_once_with(Any.instance_of(ValueError))
+        tasks.indexer.add_annotation.delay.assert_called_once_with("add_id")
+        tasks.indexer.delete_annotation.delay.assert_called_once_with("delete_id")
+
+    def test_it_does_nothing_with_no_events(self, search_index, es_helpers):
+        search_index.flush_events()
+
+        es_helpers.bulk.assert_not_called()
+
+    def test_the_callback_flushes_in_a_transaction(
+        self, search_index, pyramid_request, es_helpers
+    ):
+        pyramid_request.tm = MagicMock()
+        add_events(search_index, pyramid_request, [("id", "delete")])
+
+        search_index._flush_events_callback(pyramid_request)  # noqa: SLF001
+
+        pyramid_request.tm.__enter__.assert_called_once_with()
+        es_helpers.bulk.assert_called_once()
+
+    @pytest.fixture
+    def search_index(self, search_index):
+        search_index._batch_events = True  # noqa: SLF001
+        return search_index
+
+    @pytest.fixture(autouse=True)
+    def AnnotationSearchIndexPresenter(self, patch):
+        AnnotationSearchIndexPresenter = patch(
+            "h.services.search_index.AnnotationSearchIndexPresenter"
+        )
+        AnnotationSearchIndexPresenter.present_all.side_effect = (
+            lambda annotations, _request: [
+                {"id": annotation.id} for annotation in annotations
+            ]
+        )
+        AnnotationSearchIndexPresenter.present_thread_fields_all.side_effect = (
+            lambda annotations, _request: [
+                {"thread_ids": annotation.thread_ids} for annotation in annotations
+            ]
+        )
+        return AnnotationSearchIndexPresenter
+
+    @pytest.fixture(autouse=True)
+    def es_helpers(self, patch):
+        es_helpers = patch("h.services.search_index.es_helpers")
+        es_helpers.bulk.return_value = (0, [])
+        return es_helpers
+
+
+def add_events(search_index, request, events):
+    for annotation_id, action in events:
+        search_index.handle_annotation_event(
+            AnnotationEvent(request, annotation_id, action)
+        )
+
+
+def actions(es_helpers):
+    """Return the (index, id, body) of the actions sent to `es_helpers.bulk()`."""
+    return [
+        (action["_index"], action["_id"], action["_source"])
+        for action in es_helpers.bulk.call_args[0][1]
+    ]
+
+
 class TestFactory:
     def test_it(
         self, pyramid_request, SearchIndexService, settings, annotation_read_service
@@ -248,9 +540,18 @@ class TestFactory:
             es=pyramid_request.es,
             settings=settings,
             annotation_read_service=annotation_read_service,
+            batch_events=False,
         )
         assert result == SearchIndexService.return_value
 
+    @pytest.mark.usefixtures("settings", "annotation_read_service")
+    def test_it_with_batch_indexing(self, pyramid_request, SearchIndexService):
+        pyramid_request.registry.settings["es.batch_indexing"] = True
+
+        factory(sentinel.context, pyramid_request)
+
+        assert SearchIndexService.call_args.kwargs["batch_events"]
+
     @pytest.fixture
     def settings(self, pyramid_config):
         settings = sentinel.settings
@@ -312,5 +613,6 @@ def report_exception(patch):
 def mock_es_client(mock_es_client):
     # The ES library uses some fancy decorators which confuse autospeccing
     mock_es_client.conn.index = MagicMock()
+    mock_es_client.conn.update = MagicMock()
 
     return mock_es_client
@@ -4,6 +4,7 @@ import pytest
 
 from h import session
 from h.services.group_list import GroupListService
+from h.services.profile_cache import ProfileCache
 
 
 class TestModel:
@@ -256,6 +257,90 @@ class TestProfileWithScopedGroups:
         assert profile["groups"][0]["url"]
 
 
+class TestVersionedProfile:
+    def test_it_returns_the_profile_and_its_etag(self, authenticated_request):
+        profile, etag = session.versioned_profile(authenticated_request)
+
+        assert profile == session.profile(authenticated_request)
+        assert etag == ProfileCache.etag(profile)
+
+    def test_it_caches_the_profile(self, authenticated_request):
+        svc = authenticated_request.find_service(name="group_list")
+
+        first = session.versioned_profile(authenticated_request)
+        second = session.versioned_profile(authenticated_request)
+
+        assert second == first
+        svc.session_groups.assert_called_once()
+
+    def test_it_caches_profiles_for_each_authority(self, unauthenticated_request):
+        svc = unauthenticated_request.find_service(name="group_list")
+
+        session.versioned_profile(unauthenticated_request)
+        profile, _ = session.versioned_profile(unauthenticated_request, "foo.com")
+
+        assert profile["authority"] == "foo.com"
+        assert svc.session_groups.call_count == 2
+
+    def test_it_caches_profiles_for_each_set_of_feature_overrides(
+        self, authenticated_request
+    ):
+        svc = authenticated_request.find_service(name="group_list")
+
+        session.versioned_profile(authenticated_request)
+        authenticated_request.find_service(name="feature").overrides = {"foo": True}
+        session.versioned_profile(authenticated_request)
+
+        assert svc.session_groups.call_count == 2
+
+    def test_model_and_profile_share_the_cache(self, authenticated_request):
+        svc = authenticated_request.find_service(name="group_list")
+
+        session.versioned_profile(authenticated_request)
+        model = session.model(authenticated_request)
+
+        assert model == {
+            key: value
+            for key, value in session.profile(authenticated_request).items()
+            if key in model
+        }
+        svc.session_groups.assert_called_once()
+
+    def test_it_rebuilds_the_profile_if_its_fingerprint_changes(
+        self, authenticated_request
+    ):
+        svc = authenticated_request.find_service(name="group_list")
+        fingerprint = authenticated_request.find_service(
+            name="profile_cache"
+        ).fingerprint
+
+        session.versioned_profile(authenticated_request)
+        fingerprint.return_value = mock.sentinel.new_fingerprint
+        session.versioned_profile(authenticated_request)
+
+        assert svc.session_groups.call_count == 2
+
+    def test_it_fingerprints_the_users_profile(self, authenticated_request):
+        cache = authenticated_request.find_service(name="profile_cache")
+
+        session.versioned_profile(authenticated_request)
+
+        cache.fingerprint.assert_called_once_with(
+            authenticated_request.db,
+            authenticated_request.user.id,
+            authenticated_request.user.authority,
+        )
+
+    def test_it_fingerprints_logged_out_profiles(self, unauthenticated_request):
+        cache = unauthenticated_request.find_service(name="profile_cache")
+
+        session.versioned_profile(unauthenticated_request, "foo.com")
+
+        cache.fingerprint.assert_called_once_with(
+            unauthenticated_request.db, None, "foo.com"
+        )
+
+
 class TestUserInfo:
     def test_returns_user_info_object(self, factories):
         user = factories.User.build(display_name="Jane Doe")
@@ -281,15 +366,24 @@ class FakeRequest:
         if userid is None:
             self.user = None
         else:
-            self.user = mock.Mock(groups=[], authority=user_authority)
+            self.user = mock.Mock(
+                groups=[], authority=user_authority, display_name="Jane Doe"
+            )
 
         self.feature = fake_feature
         self.route_url = mock.Mock(return_value="/group/a")
+        self.application_url = "http://example.com"
         self.session = mock.Mock()
+        self.db = mock.Mock()
 
         self._group_list_service = mock.create_autospec(
             GroupListService, spec_set=True, instance=True
         )
+        self._feature_service = mock.Mock(overrides=None)
+        self._profile_cache = ProfileCache()
+        self._profile_cache.fingerprint = mock.Mock(
+            return_value=mock.sentinel.fingerprint
+        )
 
     def set_features(self, feature_dict):
         self.feature.flags = feature_dict
@@ -298,7 +392,11 @@ class FakeRequest:
         self.user.sidebar_tutorial_dismissed = dismissed
 
     def find_service(self, **kwargs):
-        return {"group_list": self._group_list_service}[kwargs["name"]]
+        return {
+            "feature": self._feature_service,
+            "group_list": self._group_list_service,
+            "profile_cache": self._profile_cache,
+        }[kwargs["name"]]
 
 
 @pytest.fixture
@@ -0,0 +1,40 @@
+from os import environ
+from time import perf_counter
+
+import pytest
+from sqlalchemy import select
+
+from h.models import Annotation
+from h.streamer import db
+from h.streamer.db import get_session, read_only_transaction
+
+
+@pytest.mark.skip("Only of use during development")
+class TestReadOnlyTransactionSpeed:  # pragma: no cover
+    """Compare the cost of handling messages in each isolation level."""
+
+    REPS = 2000
+
+    @pytest.mark.parametrize("isolation_level", tuple(db.ISOLATION_LEVELS))
+    @pytest.mark.parametrize("query", (True, False))
+    def test_speed(self, isolation_level, query):
+        session = get_session(
+            {"sqlalchemy.url": environ["DATABASE_URL"]}, isolation_level
+        )
+
+        start = perf_counter()
+        for _ in range(self.REPS):
+            with read_only_transaction(session):
+                if query:
+                    session.execute(select(Annotation.id).limit(1)).all()
+        millis = (perf_counter() - start) * 1000
+
+        print(  # noqa: T201
+            f"{isolation_level} (query={query}) x {self.REPS}: {millis} ms, "
+            f"{millis / self.REPS} ms/message"
+        )
+
+    @pytest.fixture(autouse=True)
+    def annotations(self, factories, db_session):
+        factories.Annotation.create_batch(10)
+        db_session.commit()
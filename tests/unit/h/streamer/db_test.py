@@ -1,34 +1,106 @@
+from os import environ
 from unittest import mock
 from unittest.mock import sentinel
 
 import pytest
-
-from h.streamer.db import get_session, read_only_transaction
+from sqlalchemy import text
+
+from h.streamer import db as streamer_db
+from h.streamer.db import (
+    ENGINE_OPTIONS,
+    TRANSACTION_STATS,
+    get_session,
+    read_only_transaction,
+    take_transaction_stats,
+)
 from h.streamer.streamer import UnknownMessageType
 
 
-class TestMakeSession:
-    def test_it(self, db):
+class TestGetSession:
+    def test_it(self, create_engine):
         session = get_session({"sqlalchemy.url": sentinel.sqlalchemy_url})
 
-        db.create_engine.assert_called_once_with(sentinel.sqlalchemy_url)
-        db.Session.assert_called_once_with(bind=db.create_engine.return_value)
-        assert session == db.Session.return_value
+        create_engine.assert_called_once_with(sentinel.sqlalchemy_url, **ENGINE_OPTIONS)
+        assert session.bind == create_engine.return_value
+
+    def test_it_shares_the_engine_between_sessions(self, create_engine):
+        sessions = [
+            get_session({"sqlalchemy.url": sentinel.sqlalchemy_url}) for _ in range(3)
+        ]
+
+        create_engine.assert_called_once()
+        assert len({id(session) for session in sessions}) == 3
+
+    def test_it_raises_for_unknown_isolation_levels(self):
+        with pytest.raises(KeyError):
+            get_session({"sqlalchemy.url": sentinel.sqlalchemy_url}, "UNKNOWN")
 
     @pytest.fixture
-    def db(self, patch):
-        return patch("h.streamer.db.db")
+    def create_engine(self, patch):
+        return patch("h.streamer.db.db.create_engine")
+
+
+class TestGetSessionTransactions:
+    @pytest.mark.parametrize(
+        "isolation_level,expected",
+        (("SERIALIZABLE", "serializable"), ("REPEATABLE READ", "repeatable read")),
+    )
+    def test_it_starts_read_only_transactions(self, isolation_level, expected):
+        session = get_session(
+            {"sqlalchemy.url": environ["DATABASE_URL"]}, isolation_level
+        )
+
+        with read_only_transaction(session):
+            result = session.execute(
+                text(
+                    "SELECT current_setting('transaction_isolation'), current_setting('transaction_read_only')"
+                )
+            ).one()
+
+        assert tuple(result) == (expected, "on")
+
+    def test_it_only_starts_transactions_when_the_db_is_used(self):
+        session = get_session({"sqlalchemy.url": environ["DATABASE_URL"]})
+
+        with read_only_transaction(session):
+            ...
+        with read_only_transaction(session):
+            session.execute(text("SELECT 1"))
+
+        assert (TRANSACTION_STATS.count, TRANSACTION_STATS.started) == (2, 1)
+
+    @pytest.fixture(autouse=True)
+    def dispose_engines(self):
+        yield
+
+        for engine in streamer_db._engines.values():  # noqa: SLF001
+            engine.dispose()
+
+
+class TestTakeTransactionStats:
+    def test_it(self):
+        TRANSACTION_STATS.record(2)
+        TRANSACTION_STATS.started += 1
+
+        stats = take_transaction_stats()
+
+        assert (stats.count, stats.started, stats.max) == (1, 1, 2)
+        assert not TRANSACTION_STATS.count
+        assert not TRANSACTION_STATS.started
 
 
 class TestReadOnlyTransaction:
-    def test_it_starts_a_read_only_transaction(self, session, text):
+    def test_it_does_not_start_a_transaction(self, session):
         with read_only_transaction(session):
             ...
 
-        text.assert_called_once_with(
-            "SET TRANSACTION ISOLATION LEVEL SERIALIZABLE READ ONLY DEFERRABLE"
-        )
-        assert session.method_calls[0] == mock.call.execute(text.return_value)
+        session.execute.assert_not_called()
+
+    def test_it_records_how_long_the_transaction_took(self, session):
+        with read_only_transaction(session):
+            ...
+
+        assert TRANSACTION_STATS.count == 1
 
     def test_it_calls_closes_correctly(self, session):
         with read_only_transaction(session):
@@ -62,3 +134,15 @@ class TestReadOnlyTransaction:
     @pytest.fixture
     def text(self, patch):
         return patch("h.streamer.db.text")
+
+
+@pytest.fixture(autouse=True)
+def engines():
+    streamer_db._engines.clear()  # noqa: SLF001
+    yield
+    streamer_db._engines.clear()  # noqa: SLF001
+
+
+@pytest.fixture(autouse=True)
+def transaction_stats():
+    TRANSACTION_STATS.reset()
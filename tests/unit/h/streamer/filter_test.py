@@ -1,17 +1,24 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from random import random
 
 import pytest
 from h_matchers import Any
 from pytest import param  # noqa: PT013
 
-from h.streamer.filter import SocketFilter
+from h import storage
+from h.streamer.filter import SocketFilter, URIExpansionCache
 
 
 class FakeSocket:
     pass
 
 
+@pytest.fixture(autouse=True)
+def clear_uri_cache():
+    # The cache is shared by the whole process, so reset it between tests
+    SocketFilter.uri_cache.clear()
+
+
 class TestFilterHandler:
     @pytest.mark.parametrize(
         "filter_uris,ann_uri,should_match",
@@ -147,6 +154,9 @@ class TestFilterHandler:
             ("/uri", ["same", "same"], [("/uri", "same")]),
             ("/group", ["v1", "v2"], [("/group", "v1"), ("/group", "v2")]),
             ("/group", ["same", "same"], [("/group", "same")]),
+            # Unhashable values
+            ("/id", {"some": "object"}, []),
+            ("/id", ["v1", {"some": "object"}, ["v2"]], [("/id", "v1")]),
             # Mapping
             ("/uri", "http://example.com", [("/uri", "httpx://example.com")]),
             # Ignored
@@ -189,23 +199,131 @@ class TestFilterHandler:
         )
         assert not filter_matches(filter_, ann)
 
+    def test_set_filter_replaces_previous_filter(
+        self, factories, annotation, db_session
+    ):
+        other_annotation = factories.Annotation()
+        socket = FakeSocket()
+
+        SocketFilter.set_filter(socket, self.id_filter(annotation.id))
+        SocketFilter.set_filter(socket, self.id_filter(other_annotation.id))
+
+        assert not tuple(SocketFilter.matching([socket], annotation, db_session))
+        assert tuple(SocketFilter.matching([socket], other_annotation, db_session))
+
+    def test_remove_filter(self, annotation, db_session):
+        socket = FakeSocket()
+        SocketFilter.set_filter(socket, self.id_filter(annotation.id))
+
+        SocketFilter.remove_filter(socket)
+
+        assert not socket.filter_rows
+        assert not tuple(SocketFilter.matching([socket], annotation, db_session))
+
+    def test_remove_filter_leaves_other_sockets(self, annotation, db_session):
+        socket, other_socket = FakeSocket(), FakeSocket()
+        SocketFilter.set_filter(socket, self.id_filter(annotation.id))
+        SocketFilter.set_filter(other_socket, self.id_filter(annotation.id))
+
+        SocketFilter.remove_filter(socket)
+
+        assert tuple(
+            SocketFilter.matching([socket, other_socket], annotation, db_session)
+        ) == (other_socket,)
+
+    def test_remove_filter_with_duplicate_rows(self, annotation, db_session):
+        socket = FakeSocket()
+        filter_ = self.id_filter(annotation.id)
+        filter_["clauses"] *= 2
+        SocketFilter.set_filter(socket, filter_)
+
+        SocketFilter.remove_filter(socket)
+
+        assert not tuple(SocketFilter.matching([socket], annotation, db_session))
+
+    def test_remove_filter_without_filter_rows(self):
+        SocketFilter.remove_filter(FakeSocket())
+
+    def test_it_only_matches_the_given_sockets(self, annotation, db_session):
+        socket, other_socket = FakeSocket(), FakeSocket()
+        SocketFilter.set_filter(socket, self.id_filter(annotation.id))
+        SocketFilter.set_filter(other_socket, self.id_filter(annotation.id))
+
+        result = tuple(SocketFilter.matching([socket], annotation, db_session))
+
+        assert result == (socket,)
+
+    def test_it_caches_uri_expansion(self, annotation, db_session, storage):
+        storage.expand_uri.return_value = ["httpx://example.com"]
+        socket = FakeSocket()
+
+        tuple(SocketFilter.matching([socket], annotation, db_session))
+        tuple(SocketFilter.matching([socket], annotation, db_session))
+
+        storage.expand_uri.assert_called_once_with(
+            db_session, annotation.target_uri, normalized=True
+        )
+
+    def test_it_returns_sockets_in_the_order_given(self, annotation, db_session):
+        sockets = [FakeSocket() for _ in range(10)]
+        for socket in sockets:
+            SocketFilter.set_filter(socket, self.id_filter(annotation.id))
+
+        result = tuple(SocketFilter.matching(sockets[::-1], annotation, db_session))
+
+        assert result == tuple(sockets[::-1])
+
     @pytest.mark.skip(reason="For dev purposes only")
-    def test_speed(self, factories, db_session):  # pragma: no cover
-        # I think the max number connected at once is 4096
-        sockets = [FakeSocket() for _ in range(4096)]
+    @pytest.mark.parametrize("socket_count", (4096, 50000))
+    def test_speed(self, factories, db_session, socket_count):  # pragma: no cover
+        sockets = [FakeSocket() for _ in range(socket_count)]
 
         for socket in sockets:
             SocketFilter.set_filter(socket, self.get_randomized_filter())
 
         ann = factories.Annotation(target_uri="https://example.org")
+        values = {
+            "/id": [ann.id],
+            "/group": [ann.groupid],
+            "/uri": set(
+                storage.expand_uri(db_session, ann.target_uri, normalized=True)
+            ),
+            "/references": set(ann.references),
+        }
 
-        start = datetime.utcnow()  # noqa: DTZ003
-        # This returns a generator, we need to force it to produce answers
-        tuple(SocketFilter.matching(sockets, ann, db_session))
+        def linear_scan():
+            # The approach used before the inverted index: check every filter
+            # row of every socket
+            for socket in sockets:
+                for field, value in socket.filter_rows:
+                    if value in values.get(field, ()):
+                        yield socket
+                        break
+
+        for label, match in (
+            ("before (linear scan)", linear_scan),
+            (
+                "after (inverted index)",
+                lambda: SocketFilter.matching(sockets, ann, db_session),
+            ),
+        ):
+            start = datetime.utcnow()  # noqa: DTZ003
+            # This returns a generator, we need to force it to produce answers
+            tuple(match())
 
-        diff = datetime.utcnow() - start  # noqa: DTZ003
-        ms = diff.seconds * 1000 + diff.microseconds / 1000
-        print(ms, "ms")  # noqa: T201
+            diff = datetime.utcnow() - start  # noqa: DTZ003
+            ms = diff.seconds * 1000 + diff.microseconds / 1000
+            print(f"{socket_count} sockets, {label}: {ms} ms")  # noqa: T201
+
+        for socket in sockets:
+            SocketFilter.remove_filter(socket)
+
+    def id_filter(self, id_):
+        return {
+            "match_policy": "include_any",
+            "actions": {},
+            "clauses": [{"field": "/id", "operator": "equals", "value": id_}],
+        }
 
     def get_randomized_filter(self):  # pragma: no cover
         return {
@@ -261,3 +379,137 @@ class TestFilterHandler:
             return bool(tuple(SocketFilter.matching([socket], annotation, db_session)))
 
         return filter_matches
+
+
+class TestURIExpansionCache:
+    def test_it_expands_uris(self, cache, storage, db_session, document):
+        result = cache.expand_uri(db_session, "http://example.com", document)
+
+        storage.expand_uri.assert_called_once_with(
+            db_session, "http://example.com", normalized=True
+        )
+        assert result == frozenset(storage.expand_uri.return_value)
+        assert (cache.hits, cache.misses) == (0, 1)
+
+    def test_it_returns_cached_values(self, cache, storage, db_session, document):
+        first = cache.expand_uri(db_session, "http://example.com", document)
+        second = cache.expand_uri(db_session, "http://example.com", document)
+
+        assert second == first
+        storage.expand_uri.assert_called_once()
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_it_doesnt_share_values_between_equivalent_uris(
+        self, cache, storage, db_session, document
+    ):
+        cache.expand_uri(db_session, "http://example.com/a", document)
+        cache.expand_uri(db_session, "https://example.com/a/", document)
+        cache.expand_uri(
+            db_session, "https://example.com/a?utm_source=x#frag", document
+        )
+
+        assert storage.expand_uri.call_count == 3
+
+    def test_it_expands_equivalent_uris_like_storage_does(
+        self, cache, db_session, factories
+    ):
+        document = factories.Document()
+        for doc_type, uri in (
+            ("rel-canonical", "https://example.com/a"),
+            ("rel-alternate", "https://example.com/alternate"),
+        ):
+            factories.DocumentURI(
+                document=document, claimant=uri, uri=uri, type=doc_type
+            )
+        db_session.flush()
+
+        for uri in ("https://example.com/a", "http://example.com/a"):
+            assert cache.expand_uri(db_session, uri, document) == frozenset(
+                storage.expand_uri(db_session, uri, normalized=True)
+            )
+
+    def test_it_caches_different_uris_for_the_same_document(
+        self, cache, storage, db_session, document
+    ):
+        cache.expand_uri(db_session, "http://example.com", document)
+        cache.expand_uri(db_session, "urn:x-pdf:1234", document)
+
+        cache.expand_uri(db_session, "http://example.com", document)
+        cache.expand_uri(db_session, "urn:x-pdf:1234", document)
+
+        assert storage.expand_uri.call_count == 2
+
+    def test_it_expires_values(self, cache, storage, db_session, monotonic, document):
+        monotonic.return_value = 0
+        cache.expand_uri(db_session, "http://example.com", document)
+
+        monotonic.return_value = cache.ttl + 1
+        cache.expand_uri(db_session, "http://example.com", document)
+
+        assert storage.expand_uri.call_count == 2
+
+    def test_it_misses_if_the_document_changes(
+        self, cache, storage, db_session, factories, document
+    ):
+        cache.expand_uri(db_session, "http://example.com", document)
+        cache.expand_uri(db_session, "http://example.com", factories.Document())
+
+        assert storage.expand_uri.call_count == 2
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    def test_it_misses_if_the_document_has_been_updated(
+        self, cache, storage, db_session, document
+    ):
+        cache.expand_uri(db_session, "http://example.com", document)
+        document.updated += timedelta(seconds=1)
+
+        cache.expand_uri(db_session, "http://example.com", document)
+
+        assert storage.expand_uri.call_count == 2
+
+    def test_it_works_without_a_document(self, cache, storage, db_session):
+        cache.expand_uri(db_session, "http://example.com")
+        cache.expand_uri(db_session, "http://example.com")
+
+        storage.expand_uri.assert_called_once()
+
+    def test_it_evicts_the_least_recently_used_value(self, cache, storage, db_session):
+        cache.maxsize = 2
+        storage.expand_uri.side_effect = lambda _session, uri, **_kwargs: [uri]
+        cache.expand_uri(db_session, "http://a.example.com")
+        cache.expand_uri(db_session, "http://b.example.com")
+        cache.expand_uri(db_session, "http://a.example.com")
+
+        cache.expand_uri(db_session, "http://c.example.com")
+
+        assert len(cache) == 2
+        cache.expand_uri(db_session, "http://a.example.com")
+        assert storage.expand_uri.call_count == 3
+
+    def test_clear(self, cache, db_session):
+        cache.expand_uri(db_session, "http://example.com")
+
+        cache.clear()
+
+        assert not len(cache)
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    @pytest.fixture
+    def cache(self):
+        return URIExpansionCache()
+
+    @pytest.fixture
+    def document(self, factories, db_session):
+        document = factories.Document()
+        db_session.flush()
+        return document
+
+    @pytest.fixture
+    def storage(self, patch):
+        storage = patch("h.streamer.filter.storage")
+        storage.expand_uri.return_value = ["httpx://example.com"]
+        return storage
+
+    @pytest.fixture
+    def monotonic(self, patch):
+        return patch("h.streamer.filter.monotonic")
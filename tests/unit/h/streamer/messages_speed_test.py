@@ -6,33 +6,52 @@ from pyramid import security
 from h.security import Identity
 from h.streamer.app import create_app
 from h.streamer.contexts import request_context
-from h.streamer.messages import handle_annotation_event
-from h.streamer.websocket import WebSocket
+from h.streamer.messages import handle_annotation_events
+from h.streamer.websocket import WebSocket, encode_json
 from tests.common.fixtures.elasticsearch import ELASTICSEARCH_INDEX, ELASTICSEARCH_URL
 
 
+@pytest.fixture(scope="session")
+def registry():  # pragma: no cover
+    settings = {
+        "es.url": ELASTICSEARCH_URL,
+        "es.index": ELASTICSEARCH_INDEX,
+        "h.app_url": "http://example.com",
+        "h.authority": "example.com",
+        "secret_key": "notasecret",
+    }
+
+    return create_app(None, **settings).registry
+
+
+@pytest.fixture
+def pyramid_request(registry):  # pragma: no cover
+    with request_context(registry) as request:
+        yield request
+
+
 @pytest.mark.skip("Only of use during development")
 class TestHandleAnnotationEventSpeed:  # pragma: no cover
     def test_load_request(self):
         ...
         # This is here just to flush out any first load costs
 
-    @pytest.mark.parametrize("reps", (1, 16, 256, 4096))
+    @pytest.mark.parametrize("reps", (1, 16, 256, 4096, 10000))
     @pytest.mark.parametrize("action", ("create", "delete"))
     def test_speed(self, db_session, pyramid_request, socket, message, action, reps):
         sockets = list(socket for _ in range(reps))  # noqa: C400
         message["action"] = action
 
         start = datetime.utcnow()
-        handle_annotation_event(
-            message=message,
+        handle_annotation_events(
+            messages=[message],
             sockets=sockets,
             request=pyramid_request,
             session=db_session,
         )
         diff = datetime.utcnow() - start
 
-        assert socket.send_json.count == reps
+        assert socket.send_encoded.count == reps
 
         millis = diff.seconds * 1000 + diff.microseconds / 1000
         print(  # noqa: T201
@@ -43,11 +62,6 @@ class TestHandleAnnotationEventSpeed:  # pragma: no cover
     def annotation(self, factories):
         return factories.Annotation(shared=True)
 
-    @pytest.fixture
-    def pyramid_request(self, registry):
-        with request_context(registry) as request:
-            yield request
-
     @pytest.fixture
     def message(self, annotation):
         return {
@@ -56,18 +70,6 @@ class TestHandleAnnotationEventSpeed:  # pragma: no cover
             "src_client_id": "1235",
         }
 
-    @pytest.fixture(scope="session")
-    def registry(self):
-        settings = {
-            "es.url": ELASTICSEARCH_URL,
-            "es.index": ELASTICSEARCH_INDEX,
-            "h.app_url": "http://example.com",
-            "h.authority": "example.com",
-            "secret_key": "notasecret",
-        }
-
-        return create_app(None, **settings).registry
-
     @pytest.fixture(autouse=True)
     def SocketFilter(self, patch):
         # We aren't interested in the speed of the socket filter, as that has
@@ -81,6 +83,7 @@ class TestHandleAnnotationEventSpeed:  # pragma: no cover
         socket = WebSocket(
             sock=None,
             environ={
+                "h.ws.debug": False,
                 "h.ws.identity": Identity(),
                 "h.ws.effective_principals": [security.Everyone, "group:__world__"],
                 "h.ws.streamer_work_queue": None,
@@ -94,6 +97,63 @@ class TestHandleAnnotationEventSpeed:  # pragma: no cover
             fake_send.count += 1
 
         fake_send.count = 0
-        socket.send_json = fake_send
+        socket.send_encoded = fake_send
 
         return socket
+
+
+@pytest.mark.skip("Only of use during development")
+class TestFanOutSpeed:  # pragma: no cover
+    """Compare serializing a reply once per socket with serializing it once."""
+
+    SOCKETS = 10000
+
+    def test_send_json_per_socket(self, sockets, reply):
+        start = datetime.utcnow()
+        for socket in sockets:
+            socket.send_json(reply)
+        self.report("send_json per socket", start)
+
+    def test_send_encoded_once(self, sockets, reply):
+        start = datetime.utcnow()
+        encoded_reply = encode_json(reply)
+        for socket in sockets:
+            socket.send_encoded(encoded_reply)
+        self.report("send_encoded once", start)
+
+    def report(self, label, start):
+        diff = datetime.utcnow() - start
+        millis = diff.seconds * 1000 + diff.microseconds / 1000
+        print(f"{label} x {self.SOCKETS}: {millis} ms")  # noqa: T201
+
+    @pytest.fixture
+    def reply(self, factories, pyramid_request):
+        annotation = factories.Annotation(shared=True)
+
+        return {
+            "type": "annotation-notification",
+            "options": {"action": "create"},
+            "payload": [
+                pyramid_request.find_service(name="annotation_json").present(annotation)
+            ],
+        }
+
+    @pytest.fixture
+    def sockets(self):
+        sockets = [
+            WebSocket(
+                sock=None,
+                environ={
+                    "h.ws.debug": False,
+                    "h.ws.identity": Identity(),
+                    "h.ws.streamer_work_queue": None,
+                },
+            )
+            for _ in range(self.SOCKETS)
+        ]
+
+        for socket in sockets:
+            # Build the websocket frames as normal, but don't write them anywhere
+            socket._write = lambda _data: None  # noqa: SLF001
+
+        return sockets
@@ -1,13 +1,15 @@
+import json
 from unittest import mock
 from unittest.mock import Mock, sentinel
 
+import gevent
 import pytest
 from gevent.queue import Queue
 from h_matchers import Any
 from pyramid.request import Request
 
-from h.security import Permission
-from h.streamer import messages
+from h.models import Annotation
+from h.streamer import messages, websocket
 
 
 class TestProcessMessages:
@@ -33,14 +35,6 @@ class TestProcessMessages:
         assert result.topic == "routing_key"  # Set by _handler fixture
         assert result.payload == {"foo": "bar"}
 
-    def test_it_handles_a_full_queue(self, _handler, work_queue):  # noqa: PT019
-        work_queue.put(messages.Message(topic="queue_is_full", payload={}))
-
-        _handler({"foo": "bar"})
-
-        result = work_queue.get_nowait()  # pragma: nocover
-        assert result.topic == "queue_is_full"  # pragma: nocover
-
     def test_it_raises_if_the_consumer_exits(self, work_queue):
         with pytest.raises(RuntimeError):
             messages.process_messages({}, "routing_key", work_queue)
@@ -63,31 +57,107 @@ class TestProcessMessages:
         return Queue(maxsize=1)
 
 
-class TestHandleMessage:
-    def test_calls_handler_with_list_of_sockets(self, websocket, registry):
+class TestCollectMessages:
+    def test_it_returns_the_message_when_nothing_else_arrives(self, message, queue):
+        assert messages.collect_messages(message, queue, window=0) == [message]
+
+    def test_it_collects_queued_messages_from_the_same_topic(self, message, queue):
+        others = [messages.Message(topic="foo", payload=i) for i in range(2)]
+        for other in others:
+            queue.put(other)
+
+        batch = messages.collect_messages(message, queue, window=0)
+
+        assert batch == [message, *others]
+        assert not queue.qsize()
+
+    def test_it_does_not_wait_if_nothing_is_queued(self, message, queue):
+        gevent.spawn_later(0.01, queue.put, messages.Message(topic="foo", payload=1))
+
+        batch = messages.collect_messages(message, queue, window=1)
+
+        assert batch == [message]
+
+    def test_it_waits_for_more_messages_during_a_burst(self, message, queue):
+        others = [messages.Message(topic="foo", payload=i) for i in range(2)]
+        queue.put(others[0])
+        gevent.spawn_later(0.01, queue.put, others[1])
+
+        batch = messages.collect_messages(message, queue, window=1)
+
+        assert batch == [message, *others]
+
+    def test_it_stops_waiting_at_the_end_of_the_window(self, message, queue):
+        other = messages.Message(topic="foo", payload="other")
+        queue.put(other)
+        gevent.spawn_later(0.2, queue.put, messages.Message(topic="foo", payload=2))
+
+        batch = messages.collect_messages(message, queue, window=0.01)
+
+        assert batch == [message, other]
+
+    @pytest.mark.parametrize(
+        "other",
+        (
+            messages.Message(topic="bar", payload="other"),
+            websocket.Message(socket=sentinel.socket, payload="other"),
+        ),
+    )
+    def test_it_stops_at_messages_from_other_topics(self, message, queue, other):
+        queue.put(other)
+        queue.put(messages.Message(topic="foo", payload="after"))
+
+        batch = messages.collect_messages(message, queue, window=0)
+
+        assert batch == [message]
+        assert queue.peek() == other
+
+    def test_it_limits_the_batch_size(self, message, queue):
+        for i in range(5):
+            queue.put(messages.Message(topic="foo", payload=i))
+
+        batch = messages.collect_messages(message, queue, window=0, max_batch=3)
+
+        assert len(batch) == 3
+        assert queue.qsize() == 3
+
+    @pytest.fixture
+    def message(self):
+        return messages.Message(topic="foo", payload="first")
+
+    @pytest.fixture
+    def queue(self):
+        return Queue()
+
+
+class TestHandleMessages:
+    def test_calls_handler_with_list_of_payloads_and_sockets(self, websocket, registry):
         handler = Mock(return_value=None)
         session = sentinel.db_session
-        message = messages.Message(topic="foo", payload={"foo": "bar"})
+        batch = [
+            messages.Message(topic="foo", payload={"foo": "bar"}),
+            messages.Message(topic="foo", payload={"foo": "baz"}),
+        ]
         websocket.instances = [sentinel.socket_1, sentinel.socket_2]
 
-        messages.handle_message(
-            message, registry, session, topic_handlers={"foo": handler}
+        messages.handle_messages(
+            batch, registry, session, topic_handlers={"foo": handler}
         )
 
         handler.assert_called_once_with(
-            message.payload,
+            [{"foo": "bar"}, {"foo": "baz"}],
             websocket.instances,
             Any.object.of_type(Request).with_attrs({"registry": registry}),
             session,
         )
 
     def test_it_raises_RuntimeError_for_bad_topics(self, registry):
-        message = messages.Message(topic="unknown", payload={})
+        batch = [messages.Message(topic="unknown", payload={})]
         topic_handlers = {"known": sentinel.handler}
 
         with pytest.raises(RuntimeError):
-            messages.handle_message(
-                message,
+            messages.handle_messages(
+                batch,
                 registry,
                 session=sentinel.db_session,
                 topic_handlers=topic_handlers,
@@ -105,132 +175,203 @@ class TestHandleMessage:
 @pytest.mark.usefixtures(
     "annotation_json_service", "annotation_read_service", "nipsa_service"
 )
-class TestHandleAnnotationEvent:
+class TestHandleAnnotationEvents:
     def test_it(
         self,
-        handle_annotation_event,
+        handle_annotation_events,
         message,
         socket,
+        annotation,
         annotation_read_service,
         annotation_json_service,
         SocketFilter,
     ):
-        handle_annotation_event(
-            message=message, sockets=[socket], session=sentinel.session
+        handle_annotation_events(
+            events=[message], sockets=[socket], session=sentinel.session
         )
 
-        annotation_read_service.get_annotation_by_id.assert_called_once_with(
-            message["annotation_id"]
+        annotation_read_service.get_annotations_by_id.assert_called_once_with(
+            [message["annotation_id"]], eager_load=[Annotation.document]
         )
-        annotation = annotation_read_service.get_annotation_by_id.return_value
-
         SocketFilter.matching.assert_called_once_with(
             [socket], annotation, sentinel.session
         )
-
         annotation_json_service.present.assert_called_once_with(annotation)
 
+    def test_it_fetches_all_the_annotations_in_one_query(
+        self,
+        handle_annotation_events,
+        annotation,
+        other_annotation,
+        annotation_read_service,
+        annotation_json_service,
+        socket,
+    ):
+        handle_annotation_events(
+            events=[
+                {"annotation_id": id_, "action": "update", "src_client_id": "other"}
+                for id_ in (annotation.id, other_annotation.id, annotation.id)
+            ],
+            sockets=[socket],
+        )
+
+        annotation_read_service.get_annotations_by_id.assert_called_once_with(
+            Any.list.containing([annotation.id, other_annotation.id]).only(),
+            eager_load=[Annotation.document],
+        )
+        assert annotation_json_service.present.call_args_list == [
+            mock.call(other_annotation),
+            mock.call(annotation),
+        ]
+
+    def test_it_still_sends_the_other_events_if_one_fails(
+        self,
+        handle_annotation_events,
+        annotation,
+        other_annotation,
+        annotation_json_service,
+        socket,
+        caplog,
+    ):
+        annotation_json_service.present.side_effect = [
+            ValueError("Oh no!"),
+            {"id": "presented"},
+        ]
+
+        handle_annotation_events(
+            events=[
+                {"annotation_id": id_, "action": "update", "src_client_id": "other"}
+                for id_ in (annotation.id, other_annotation.id)
+            ],
+            sockets=[socket],
+        )
+
+        socket.send_encoded.assert_called_once()
+        assert caplog.records[-1].getMessage() == (
+            f"failed to send annotation event: {annotation.id}"
+        )
+
     def test_it_skips_notification_when_fetch_failed(
-        self, handle_annotation_event, annotation_read_service
+        self, handle_annotation_events, annotation_read_service, socket
     ):
-        annotation_read_service.get_annotation_by_id.return_value = None
+        annotation_read_service.get_annotations_by_id.return_value = []
 
-        result = handle_annotation_event()
+        handle_annotation_events()
 
-        assert result is None
+        socket.send_encoded.assert_not_called()
 
     @pytest.mark.parametrize("action", ["create", "update", "delete"])
     def test_notification_format(
-        self, handle_annotation_event, action, message, socket, annotation_json_service
+        self, handle_annotation_events, action, message, socket, annotation_json_service
     ):
         message["action"] = action
 
-        handle_annotation_event(sockets=[socket])
+        handle_annotation_events(sockets=[socket])
 
         if action == "delete":
             expected_payload = {"id": message["annotation_id"]}
         else:
             expected_payload = annotation_json_service.present.return_value
 
-        socket.send_json.assert_called_once_with(
-            {
-                "payload": [expected_payload],
-                "type": "annotation-notification",
-                "options": {"action": action},
-            }
+        socket.send_encoded.assert_called_once_with(
+            json.dumps(
+                {
+                    "type": "annotation-notification",
+                    "options": {"action": action},
+                    "payload": [expected_payload],
+                }
+            ).encode("utf-8")
         )
 
-    def test_no_send_for_sender_socket(self, handle_annotation_event, socket, message):
+    def test_it_serializes_the_reply_once(
+        self, handle_annotation_events, socket, encode_json
+    ):
+        handle_annotation_events(sockets=[socket, socket])
+
+        encode_json.assert_called_once()
+        assert socket.send_encoded.call_args_list == [
+            mock.call(encode_json.return_value),
+            mock.call(encode_json.return_value),
+        ]
+
+    def test_no_send_for_sender_socket(self, handle_annotation_events, socket, message):
         message["src_client_id"] = socket.client_id
 
-        handle_annotation_event(message=message, sockets=[socket])
+        handle_annotation_events(events=[message], sockets=[socket])
 
-        socket.send_json.assert_not_called()
+        socket.send_encoded.assert_not_called()
 
     def test_no_send_if_filter_does_not_match(
-        self, handle_annotation_event, socket, SocketFilter
+        self, handle_annotation_events, socket, SocketFilter
     ):
         SocketFilter.matching.side_effect = None
         SocketFilter.matching.return_value = iter(())
-        handle_annotation_event(sockets=[socket])
+        handle_annotation_events(sockets=[socket])
 
-        socket.send_json.assert_not_called()
+        socket.send_encoded.assert_not_called()
 
     @pytest.mark.parametrize("user_is_nipsaed", (True, False))
     def test_nipsaed_content_visibility(
         self,
-        handle_annotation_event,
+        handle_annotation_events,
         user_is_nipsaed,
         socket,
         nipsa_service,
-        annotation_read_service,
+        annotation,
     ):
         """Should return None if the annotation is from a NIPSA'd user."""
         nipsa_service.is_flagged.return_value = True
 
-        annotation_read_service.get_annotation_by_id.return_value.userid = (
+        annotation.userid = (
             socket.identity.user.userid if user_is_nipsaed else "other_user"
         )
-        handle_annotation_event(sockets=[socket])
+        handle_annotation_events(sockets=[socket])
 
-        assert bool(socket.send_json.call_count) == user_is_nipsaed
+        assert bool(socket.send_encoded.call_count) == user_is_nipsaed
 
     @pytest.mark.parametrize("can_see", (True, False))
     def test_visibility_is_based_on_identity(
         self,
-        handle_annotation_event,
+        handle_annotation_events,
         can_see,
-        AnnotationContext,
-        identity_permits,
-        annotation_read_service,
+        RealtimeReaders,
+        annotation,
         socket,
     ):
-        identity_permits.return_value = can_see
-
-        handle_annotation_event(sockets=[socket])
+        readers = RealtimeReaders.for_annotation.return_value
+        readers.permits.return_value = can_see
 
-        AnnotationContext.assert_called_once_with(
-            annotation_read_service.get_annotation_by_id.return_value
-        )
-        identity_permits.assert_called_once_with(
-            socket.identity,
-            AnnotationContext.return_value,
-            Permission.Annotation.READ_REALTIME_UPDATES,
-        )
+        handle_annotation_events(sockets=[socket, socket])
 
-        assert bool(socket.send_json.call_count) == can_see
+        RealtimeReaders.for_annotation.assert_called_once_with(annotation)
+        assert readers.permits.call_args_list == [
+            mock.call(socket.identity),
+            mock.call(socket.identity),
+        ]
+        assert socket.send_encoded.call_count == (2 if can_see else 0)
 
     @pytest.fixture
-    def handle_annotation_event(self, message, socket, pyramid_request, session):
-        def handle_annotation_event(
-            message=message, sockets=None, request=pyramid_request, session=session
+    def handle_annotation_events(self, message, socket, pyramid_request, session):
+        def handle_annotation_events(
+            events=None, sockets=None, request=pyramid_request, session=session
         ):
+            if events is None:
+                events = [message]
             if sockets is None:
                 sockets = [socket]
 
-            return messages.handle_annotation_event(message, sockets, request, session)
+            return messages.handle_annotation_events(events, sockets, request, session)
 
-        return handle_annotation_event
+        return handle_annotation_events
+
+    @pytest.fixture
+    def encode_json(self, patch):
+        return patch("h.streamer.messages.websocket.encode_json")
+
+    @pytest.fixture(autouse=True)
+    def annotation_json_service(self, annotation_json_service):
+        annotation_json_service.present.return_value = {"id": "presented"}
+        return annotation_json_service
 
     @pytest.fixture
     def pyramid_request(self, pyramid_request):
@@ -246,24 +387,36 @@ class TestHandleAnnotationEvent:
         return sentinel.db_session
 
     @pytest.fixture
-    def message(self, annotation_read_service):
+    def annotation(self):
+        return Mock(id="ANNOTATION_ID")
+
+    @pytest.fixture
+    def other_annotation(self):
+        return Mock(id="OTHER_ANNOTATION_ID")
+
+    @pytest.fixture(autouse=True)
+    def annotation_read_service(
+        self, annotation_read_service, annotation, other_annotation
+    ):
+        annotation_read_service.get_annotations_by_id.return_value = [
+            annotation,
+            other_annotation,
+        ]
+        return annotation_read_service
+
+    @pytest.fixture
+    def message(self, annotation):
         return {
-            # This is a bit backward from how things really work, but it
-            # ensures the id we look up gives us an annotation that matches
-            "annotation_id": annotation_read_service.return_value.id,
+            "annotation_id": annotation.id,
             "action": "update",
             "src_client_id": "source_socket",
         }
 
-    @pytest.fixture
-    def AnnotationContext(self, patch):
-        return patch("h.streamer.messages.AnnotationContext")
-
     @pytest.fixture(autouse=True)
-    def identity_permits(self, patch):
-        identity_permits = patch("h.streamer.messages.identity_permits")
-        identity_permits.return_value = True
-        return identity_permits
+    def RealtimeReaders(self, patch):
+        RealtimeReaders = patch("h.streamer.messages.RealtimeReaders")
+        RealtimeReaders.for_annotation.return_value.permits.return_value = True
+        return RealtimeReaders
 
     @pytest.fixture(autouse=True)
     def SocketFilter(self, patch):
@@ -274,31 +427,93 @@ class TestHandleAnnotationEvent:
         return SocketFilter
 
 
-class TestHandleUserEvent:
+class TestCoalesceAnnotationEvents:
+    @pytest.mark.parametrize(
+        "actions,expected_action",
+        (
+            (["update"], "update"),
+            (["update", "update"], "update"),
+            (["create", "update", "update"], "create"),
+            (["create", "update", "delete"], "delete"),
+            (["update", "delete"], "delete"),
+        ),
+    )
+    def test_it_collapses_events_for_the_same_annotation(
+        self, actions, expected_action
+    ):
+        events = [self.event("id", action) for action in actions]
+
+        assert messages.coalesce_annotation_events(events) == [
+            self.event("id", expected_action)
+        ]
+
+    def test_it_keeps_events_from_different_clients_separate(self):
+        events = [
+            self.event("id", "update", src_client_id="client_1"),
+            self.event("id", "update", src_client_id="client_2"),
+        ]
+
+        assert messages.coalesce_annotation_events(events) == events
+
+    def test_it_orders_events_by_when_they_last_happened(self):
+        events = [
+            self.event("id_1", "update"),
+            self.event("id_2", "update"),
+            self.event("id_1", "delete"),
+        ]
+
+        assert messages.coalesce_annotation_events(events) == [
+            self.event("id_2", "update"),
+            self.event("id_1", "delete"),
+        ]
+
+    def event(self, annotation_id, action, src_client_id="client"):
+        return {
+            "annotation_id": annotation_id,
+            "action": action,
+            "src_client_id": src_client_id,
+        }
+
+
+class TestHandleUserEvents:
     def test_sends_session_change_when_joining_or_leaving_group(self, socket, message):
         message["userid"] = socket.identity.user.userid
 
-        messages.handle_user_event(message, [socket, socket], None, None)
+        messages.handle_user_events([message], [socket, socket], None, None)
 
-        reply = {
-            "type": "session-change",
-            "action": "group-join",
-            "model": message["session_model"],
-        }
+        reply = json.dumps(
+            {
+                "type": "session-change",
+                "action": "group-join",
+                "model": message["session_model"],
+            }
+        ).encode("utf-8")
 
-        assert socket.send_json.call_args_list == [
+        assert socket.send_encoded.call_args_list == [
             mock.call(reply),
             mock.call(reply),
         ]
 
+    def test_it_handles_each_event(self, socket, message):
+        message["userid"] = socket.identity.user.userid
+
+        messages.handle_user_events(
+            [message, {**message, "type": "group-leave"}], [socket], None, None
+        )
+
+        assert [
+            json.loads(call.args[0])["action"]
+            for call in socket.send_encoded.call_args_list
+        ] == ["group-join", "group-leave"]
+
     def test_no_send_when_socket_is_not_event_users(self, socket, message):
         """Don't send session-change events if the event user is not the socket user."""
         message["userid"] = "amy"
         socket.identity.user.username = "bob"
 
-        messages.handle_user_event(message, [socket], None, None)
+        messages.handle_user_events([message], [socket], None, None)
 
-        socket.send_json.assert_not_called()
+        socket.send_encoded.assert_not_called()
 
     @pytest.fixture
     def message(self):
@@ -306,5 +521,5 @@ class TestHandleUserEvent:
             "type": "group-join",
             "userid": "amy",
             "group": "groupid",
-            "session_model": sentinel.session_model,
+            "session_model": {"groups": []},
         }
@@ -2,12 +2,14 @@ from unittest.mock import create_autospec
 
 import pytest
 from gevent.pool import Pool
-from gevent.queue import Queue
 from h_matchers import Any
 
 from h.security import Identity
+from h.streamer import messages
+from h.streamer.filter import URIExpansionCache
 from h.streamer.metrics import websocket_metrics
 from h.streamer.websocket import WebSocket
+from h.streamer.work_queue import WorkQueue
 
 
 class TestWebsocketMetrics:
@@ -26,12 +28,75 @@ class TestWebsocketMetrics:
 
     @pytest.mark.parametrize("size", (1, 5))
     def test_it_records_work_queue_metric(self, generate_metrics, queue, size):
-        queue.qsize.return_value = size
+        for _ in range(size):
+            queue.put(messages.Message(topic="annotation", payload={}))
 
         metrics = generate_metrics()
 
         assert list(metrics) == Any.list.containing(
-            [("Custom/WebSocket/WorkQueueSize", size)]
+            [
+                ("Custom/WebSocket/WorkQueueSize", size),
+                ("Custom/WebSocket/WorkQueue/Realtime/Size", size),
+                ("Custom/WebSocket/WorkQueue/WebSocket/Size", 0),
+            ]
+        )
+
+    def test_it_records_dropped_messages(self, generate_metrics, queue):
+        queue.dropped = 3
+
+        metrics = generate_metrics()
+
+        assert list(metrics) == Any.list.containing(
+            [("Custom/WebSocket/WorkQueue/Dropped", 3)]
+        )
+
+    def test_it_records_work_queue_latency(self, generate_metrics, queue):
+        latency = queue.lanes[WorkQueue.WEBSOCKET_LANE][0].latency
+        latency.record(0.002)
+        latency.record(0.004)
+
+        metrics = generate_metrics()
+
+        assert list(metrics) == Any.list.containing(
+            [
+                ("Custom/WebSocket/WorkQueue/WebSocket/Processed", 2),
+                ("Custom/WebSocket/WorkQueue/WebSocket/Latency/Mean", Any()),
+                ("Custom/WebSocket/WorkQueue/WebSocket/Latency/Max", 4),
+                ("Custom/WebSocket/WorkQueue/Realtime/Processed", 0),
+            ]
+        )
+
+    def test_it_records_transaction_metrics(self, generate_metrics, db):
+        stats = db.take_transaction_stats.return_value
+        stats.count = 3
+        stats.started = 1
+        stats.mean = 0.002
+        stats.max = 0.004
+
+        metrics = generate_metrics()
+
+        assert list(metrics) == Any.list.containing(
+            [
+                ("Custom/WebSocket/Transactions/Count", 3),
+                ("Custom/WebSocket/Transactions/Started", 1),
+                ("Custom/WebSocket/Transactions/Duration/Mean", 2),
+                ("Custom/WebSocket/Transactions/Duration/Max", 4),
+            ]
+        )
+
+    def test_it_records_uri_expansion_cache_metrics(self, generate_metrics, uri_cache):
+        uri_cache.hits = 12
+        uri_cache.misses = 3
+        uri_cache.__len__.return_value = 2
+
+        metrics = generate_metrics()
+
+        assert list(metrics) == Any.list.containing(
+            [
+                ("Custom/WebSocket/URIExpansionCache/Size", 2),
+                ("Custom/WebSocket/URIExpansionCache/Hits", 12),
+                ("Custom/WebSocket/URIExpansionCache/Misses", 3),
+            ]
         )
 
     def test_it_records_alive_metric(self, generate_metrics):
@@ -59,7 +124,7 @@ class TestWebsocketMetrics:
 
     @pytest.fixture
     def queue(self):
-        return create_autospec(Queue, instance=True, spec_set=True)
+        return WorkQueue(shards=2)
 
     @pytest.fixture
     def sockets(self):
@@ -76,6 +141,19 @@ class TestWebsocketMetrics:
 
         return WebSocket
 
+    @pytest.fixture(autouse=True)
+    def db(self, patch):
+        return patch("h.streamer.metrics.db")
+
+    @pytest.fixture(autouse=True)
+    def uri_cache(self, patch):
+        SocketFilter = patch("h.streamer.metrics.SocketFilter")
+        SocketFilter.uri_cache = create_autospec(
+            URIExpansionCache, instance=True, hits=0, misses=0
+        )
+
+        return SocketFilter.uri_cache
+
     @pytest.fixture
     def server_instance(self, patch):
         WSGIServer = patch("h.streamer.metrics.WSGIServer")
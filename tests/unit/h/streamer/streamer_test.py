@@ -7,13 +7,16 @@ from h.streamer.streamer import TOPIC_HANDLERS, UnknownMessageType
 
 
 class TestProcessWorkQueue:
-    def test_it_sends_realtime_messages_to_messages_handle_message(
+    def test_it_sends_batches_of_realtime_messages_to_messages_handle_messages(
         self, process_work_queue, message, session, registry
     ):
-        process_work_queue(queue=[message])
+        queue = [message]
 
-        messages.handle_message.assert_called_once_with(
-            message,
+        process_work_queue(queue=queue)
+
+        messages.collect_messages.assert_called_once_with(message, queue)
+        messages.handle_messages.assert_called_once_with(
+            messages.collect_messages.return_value,
             registry,
             session,
             topic_handlers=TOPIC_HANDLERS,
@@ -79,5 +82,9 @@ class TestProcessWorkQueue:
         return patch("h.streamer.websocket.handle_message")
 
     @pytest.fixture(autouse=True)
-    def messages_handle_message(self, patch):
-        return patch("h.streamer.messages.handle_message")
+    def messages_collect_messages(self, patch):
+        return patch("h.streamer.messages.collect_messages")
+
+    @pytest.fixture(autouse=True)
+    def messages_handle_messages(self, patch):
+        return patch("h.streamer.messages.handle_messages")
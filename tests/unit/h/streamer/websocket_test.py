@@ -80,6 +80,11 @@ class TestWebSocket:
         # A second closure (however unusual) should not raise
         client1.closed(1000)
 
+    def test_removes_filter_when_closed(self, client, SocketFilter):
+        client.closed(1000)
+
+        SocketFilter.remove_filter.assert_called_once_with(client)
+
     def test_enqueues_incoming_messages(self, client, queue):
         """Valid messages are pushed onto the queue."""
         message = FakeMessage('{"foo":"bar"}')
@@ -148,6 +153,20 @@ class TestWebSocket:
 
         assert not fake_socket_send.called
 
+    def test_socket_send_encoded(self, client, fake_socket_send):
+        client.send_encoded(b'{"foo": "bar"}')
+
+        fake_socket_send.assert_called_once_with(client, b'{"foo": "bar"}')
+
+    def test_socket_send_encoded_skips_when_terminated(
+        self, client, fake_socket_send, fake_socket_terminated
+    ):
+        fake_socket_terminated.return_value = True
+
+        client.send_encoded(b'{"foo": "bar"}')
+
+        assert not fake_socket_send.called
+
     def test_debug_mode(self, fake_environ, log):
         sock = mock.Mock(spec_set=["sendall"])
         fake_environ["h.ws.debug"] = True
@@ -158,9 +177,10 @@ class TestWebSocket:
 
         client.received_message(message)
         client.send_json({"type": "whoyouare", "ok": True, "reply_to": 1})
+        client.send_encoded(b'{"type": "pong"}')
         client.closed(code=1006, reason="Client went away")
 
-        assert len(log.info.mock_calls) == 3
+        assert len(log.info.mock_calls) == 4
 
     @pytest.fixture(autouse=True)
     def with_no_socket_instances(self):
@@ -198,6 +218,14 @@ class TestWebSocket:
     def fake_socket_terminated(self, patch):
         return patch("h.streamer.websocket.WebSocket.terminated")
 
+    @pytest.fixture
+    def SocketFilter(self, patch):
+        return patch("h.streamer.websocket.SocketFilter")
+
+
+def test_encode_json():
+    assert websocket.encode_json({"foo": "bär"}) == b'{"foo": "b\\u00e4r"}'
+
 
 @pytest.mark.usefixtures("handlers")
 class TestHandleMessage:
@@ -0,0 +1,157 @@
+from unittest.mock import sentinel
+
+import pytest
+
+from h.streamer import messages, websocket
+from h.streamer.work_queue import LatencyStats, TimedQueue, WorkQueue
+
+
+class TestTimedQueue:
+    def test_it_queues_items(self):
+        queue = TimedQueue()
+
+        queue.put(sentinel.item_1)
+        queue.put(sentinel.item_2)
+
+        assert queue.peek() == sentinel.item_1
+        assert [queue.get() for _ in range(2)] == [
+            sentinel.item_1,
+            sentinel.item_2,
+        ]
+
+    def test_it_records_latency(self, monotonic):
+        queue = TimedQueue()
+        monotonic.return_value = 10
+        queue.put(sentinel.item)
+
+        monotonic.return_value = 12
+        queue.get()
+
+        assert (queue.latency.count, queue.latency.max) == (1, 2)
+
+    @pytest.fixture
+    def monotonic(self, patch):
+        return patch("h.streamer.work_queue.monotonic")
+
+
+class TestLatencyStats:
+    def test_it(self):
+        stats = LatencyStats()
+
+        stats.record(1)
+        stats.record(3)
+
+        assert (stats.count, stats.total, stats.max, stats.mean) == (2, 4, 3, 2)
+
+    def test_mean_with_no_items(self):
+        assert not LatencyStats().mean
+
+    def test_merge(self):
+        stats, other = LatencyStats(), LatencyStats()
+        stats.record(1)
+        other.record(5)
+
+        stats.merge(other)
+
+        assert (stats.count, stats.total, stats.max) == (2, 6, 5)
+
+    def test_reset(self):
+        stats = LatencyStats()
+        stats.record(1)
+
+        stats.reset()
+
+        assert (stats.count, stats.total, stats.max) == (0, 0, 0)
+
+
+class TestWorkQueue:
+    def test_it_routes_websocket_messages_to_the_websocket_lane(self, work_queue):
+        message = websocket.Message(socket=sentinel.socket, payload={})
+
+        assert work_queue.put(message)
+
+        assert work_queue.qsize(WorkQueue.WEBSOCKET_LANE) == 1
+        assert not work_queue.qsize(WorkQueue.REALTIME_LANE)
+
+    @pytest.mark.parametrize(
+        "payload", ({"annotation_id": "id"}, {"userid": "acct:user@example.com"})
+    )
+    def test_it_routes_realtime_messages_to_the_realtime_lane(
+        self, work_queue, payload
+    ):
+        message = messages.Message(topic="annotation", payload=payload)
+
+        assert work_queue.put(message)
+
+        assert work_queue.qsize(WorkQueue.REALTIME_LANE) == 1
+        assert not work_queue.qsize(WorkQueue.WEBSOCKET_LANE)
+
+    def test_it_routes_unknown_messages_to_the_realtime_lane(self, work_queue):
+        assert work_queue.put("not a message")
+
+        assert work_queue.qsize(WorkQueue.REALTIME_LANE) == 1
+
+    def test_it_keeps_messages_from_the_same_socket_in_order(self, work_queue):
+        socket = sentinel.socket
+        sent = [websocket.Message(socket=socket, payload={"id": i}) for i in range(10)]
+
+        for message in sent:
+            work_queue.put(message)
+
+        queues = [queue for queue in work_queue.queues if queue.qsize()]
+        assert len(queues) == 1
+        assert [queues[0].get() for _ in range(10)] == sent
+
+    def test_it_keeps_messages_for_the_same_annotation_in_order(self, work_queue):
+        sent = [
+            messages.Message(
+                topic="annotation", payload={"annotation_id": "id", "action": action}
+            )
+            for action in ("create", "update", "delete")
+        ]
+
+        for message in sent:
+            work_queue.put(message)
+
+        queues = [queue for queue in work_queue.queues if queue.qsize()]
+        assert len(queues) == 1
+        assert [queues[0].get() for _ in range(3)] == sent
+
+    def test_it_spreads_messages_across_shards(self, work_queue):
+        for i in range(100):
+            work_queue.put(
+                messages.Message(topic="annotation", payload={"annotation_id": i})
+            )
+
+        assert all(queue.qsize() for queue in work_queue.lanes[WorkQueue.REALTIME_LANE])
+
+    def test_it_drops_messages_when_full(self, log):
+        work_queue = WorkQueue(shards=1, maxsize=1, timeout=0)
+        work_queue.put("message")
+
+        assert not work_queue.put("dropped")
+
+        assert work_queue.dropped == 1
+        assert work_queue.qsize() == 1
+        log.warning.assert_called_once()
+
+    def test_queues(self, work_queue):
+        assert len(work_queue.queues) == 8
+
+    def test_take_latency(self, work_queue):
+        queue_1, queue_2 = work_queue.lanes[WorkQueue.REALTIME_LANE][:2]
+        queue_1.latency.record(1)
+        queue_2.latency.record(3)
+
+        latency = work_queue.take_latency(WorkQueue.REALTIME_LANE)
+
+        assert (latency.count, latency.max) == (2, 3)
+        assert not work_queue.take_latency(WorkQueue.REALTIME_LANE).count
+
+    @pytest.fixture
+    def work_queue(self):
+        return WorkQueue(shards=4)
+
+    @pytest.fixture
+    def log(self, patch):
+        return patch("h.streamer.work_queue.log")
@@ -3,6 +3,7 @@ from unittest import mock
 from unittest.mock import sentinel
 
 import pytest
+from h_matchers import Any
 
 from h.services.job_queue_metrics import JobQueueMetrics
 from h.tasks import indexer
@@ -32,7 +33,9 @@ class TestSyncAnnotations:
     def test_it(self, newrelic, log, annotation_sync_service):
         indexer.sync_annotations("test_queue")
 
-        annotation_sync_service.sync.assert_called_once_with("test_queue")
+        annotation_sync_service.sync.assert_called_once_with(
+            "test_queue", on_full_batch=None
+        )
         log.info.assert_called_once_with(annotation_sync_service.sync.return_value)
         newrelic.agent.record_custom_metrics.assert_called_once_with(
             [
@@ -41,15 +44,54 @@ class TestSyncAnnotations:
             ]
         )
 
+    @pytest.mark.usefixtures("annotation_sync_service")
+    def test_it_reports_job_latencies(self, newrelic, queue_service):
+        queue_service.take_latencies.return_value = {"tag_1": (1.5, 2.0)}
+
+        indexer.sync_annotations()
+
+        metrics = newrelic.agent.record_custom_metrics.call_args[0][0]
+        assert metrics[-2:] == [
+            ("Custom/SyncAnnotations/Latency/tag_1/Mean", 1.5),
+            ("Custom/SyncAnnotations/Latency/tag_1/Max", 2.0),
+        ]
+
+    def test_it_defaults_to_an_adaptive_limit(self, annotation_sync_service):
+        indexer.sync_annotations()
+
+        annotation_sync_service.sync.assert_called_once_with(None, on_full_batch=None)
+
+    def test_it_syncs_batches_in_parallel_if_the_batch_is_full(
+        self, annotation_sync_service, delay
+    ):
+        indexer.sync_annotations(sentinel.limit, max_batches=3)
+
+        annotation_sync_service.sync.assert_called_once_with(
+            sentinel.limit, on_full_batch=Any.function()
+        )
+        delay.assert_not_called()
+        on_full_batch = annotation_sync_service.sync.call_args[1]["on_full_batch"]
+        on_full_batch()
+        assert delay.call_args_list == [mock.call(sentinel.limit)] * 2
+
     @pytest.fixture
     def log(self, patch):
         return patch("h.tasks.indexer.log")
 
+    @pytest.fixture
+    def delay(self, patch):
+        return patch("h.tasks.indexer.sync_annotations.delay")
+
     @pytest.fixture
     def annotation_sync_service(self, annotation_sync_service):
         annotation_sync_service.sync.return_value = Counter({"foo": 2, "bar": 3})
         return annotation_sync_service
 
+    @pytest.fixture(autouse=True)
+    def queue_service(self, queue_service):
+        queue_service.take_latencies.return_value = {}
+        return queue_service
+
 
 class TestReportJobQueueMetrics:
     def test_it(self, job_queue_metrics, newrelic):
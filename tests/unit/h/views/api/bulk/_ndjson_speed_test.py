@@ -0,0 +1,47 @@
+import json
+from time import perf_counter
+
+import pytest
+
+from h.views.api.bulk._ndjson import ndjson_chunks
+
+
+@pytest.mark.skip("Only of use during development")
+class TestNDJSONSpeed:  # pragma: no cover
+    """Compare encoding rows one at a time with encoding them in chunks."""
+
+    ROWS = 100000
+
+    def test_one_chunk_per_row(self, rows):
+        start = perf_counter()
+        chunks = [(json.dumps(row) + "\n").encode("utf-8") for row in rows]
+        self.report("One chunk per row", start, chunks)
+
+    def test_buffered_chunks(self, rows):
+        start = perf_counter()
+        chunks = list(ndjson_chunks(rows))
+        self.report("Buffered chunks", start, chunks)
+
+    def report(self, label, start, chunks):
+        millis = (perf_counter() - start) * 1000
+        print(  # noqa: T201
+            f"{label} x {self.ROWS}: {millis} ms, {len(chunks)} chunks, "
+            f"{sum(len(chunk) for chunk in chunks)} bytes"
+        )
+
+    @pytest.fixture
+    def rows(self):
+        # Rows shaped like the ones from the bulk annotation end-point
+        return [
+            {
+                "author": {"username": f"username_{i}"},
+                "group": {"authority_provided_id": f"authority_provided_id_{i}"},
+                "metadata": {
+                    "lms": {
+                        "guid": f"guid_{i}",
+                        "assignment": {"resource_link_id": f"resource_{i}"},
+                    }
+                },
+            }
+            for i in range(self.ROWS)
+        ]
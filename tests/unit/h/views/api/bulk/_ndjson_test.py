@@ -3,7 +3,7 @@ import json
 import pytest
 from pyramid.response import Response
 
-from h.views.api.bulk._ndjson import get_ndjson_response
+from h.views.api.bulk._ndjson import dumps, get_ndjson_response, ndjson_chunks
 
 
 class TestGetNDJSONResponse:
@@ -39,3 +39,30 @@ class TestGetNDJSONResponse:
 
         with pytest.raises(ValueError):  # noqa: PT011
             get_ndjson_response(failing_method())
+
+
+class TestNDJSONChunks:
+    def test_it_serializes_one_row_per_line(self):
+        chunks = ndjson_chunks([{"id": 1}, {"id": "ü"}])
+
+        assert b"".join(chunks).decode("utf-8").splitlines() == [
+            '{"id":1}',
+            '{"id":"ü"}',
+        ]
+
+    def test_it_batches_rows_into_chunks(self):
+        rows = [{"id": id_} for id_ in range(10)]
+
+        chunks = list(ndjson_chunks(rows, chunk_size=20))
+
+        # Each row is 9 bytes, so we get chunks of 3 rows and the remainder
+        assert [len(chunk) for chunk in chunks] == [27, 27, 27, 9]
+        assert [json.loads(line) for line in b"".join(chunks).splitlines()] == rows
+
+    def test_it_with_no_rows(self):
+        assert not list(ndjson_chunks([]))
+
+
+class TestDumps:
+    def test_it(self):
+        assert json.loads(dumps({"a": [1, "ü", None]})) == {"a": [1, "ü", None]}
@@ -1,3 +1,4 @@
+from datetime import datetime
 from unittest.mock import Mock, create_autospec
 
 import pytest
@@ -16,43 +17,105 @@ class TestGroupAnnotations:
         self,
         context,
         pyramid_request,
-        AnnotationReadService,
         Pagination,
-        factories,
+        annotations,
         annotation_json_service,
-        db_session,
     ):
-        factories.Annotation.create_batch(3)
-        db_session.flush()
-        AnnotationReadService.annotation_search_query.return_value = select(Annotation)
-        AnnotationReadService.count_query.return_value = select(
-            func.count(Annotation.id)
+        Pagination.from_params.return_value = Mock(offset=1, limit=2)
+
+        response = list_annotations(context, pyramid_request)
+
+        Pagination.from_params.assert_called_once_with(pyramid_request.params)
+        # The newest annotations come first
+        annotation_json_service.present_all_for_user.assert_called_once_with(
+            [annotations[2].id, annotations[1].id], pyramid_request.user
         )
+        assert response == {
+            "meta": {"page": {"total": 4}},
+            "data": annotation_json_service.present_all_for_user.return_value,
+        }
+
+    def test_it_with_keyset_pagination(
+        self,
+        context,
+        pyramid_request,
+        Pagination,
+        annotations,
+        annotation_json_service,
+    ):
         Pagination.from_params.return_value = Mock(offset=0, limit=2)
+        pyramid_request.params["page[after]"] = annotations[2].id
 
         response = list_annotations(context, pyramid_request)
 
-        Pagination.from_params.assert_called_once_with(pyramid_request.params)
+        annotation_json_service.present_all_for_user.assert_called_once_with(
+            [annotations[1].id, annotations[0].id], pyramid_request.user
+        )
+        # Keyset pages don't count the annotations in the group
         assert response == {
-            "meta": {"page": {"total": 3}},
-            "data": [
-                annotation_json_service.present_for_user.return_value,
-                annotation_json_service.present_for_user.return_value,
-            ],
+            "meta": {"page": {}},
+            "data": annotation_json_service.present_all_for_user.return_value,
         }
 
+    @pytest.mark.usefixtures("annotation_json_service")
+    def test_it_with_keyset_pagination_after_an_unknown_annotation(
+        self, context, pyramid_request
+    ):
+        pyramid_request.params["page[after]"] = "AAAAAAAAAAAAAAAAAAAAAA"
+
+        with pytest.raises(ValidationError, match="No annotation"):
+            list_annotations(context, pyramid_request)
+
+    @pytest.mark.usefixtures("annotation_json_service")
+    def test_it_with_keyset_pagination_after_an_annotation_in_another_group(
+        self, context, pyramid_request, factories, db_session
+    ):
+        annotation = factories.Annotation(groupid=factories.Group().pubid)
+        db_session.flush()
+        pyramid_request.params["page[after]"] = annotation.id
+
+        with pytest.raises(ValidationError, match="No annotation"):
+            list_annotations(context, pyramid_request)
+
+    @pytest.mark.usefixtures("annotation_json_service")
+    def test_it_with_an_invalid_page_after(self, context, pyramid_request):
+        pyramid_request.params["page[after]"] = "invalid"
+
+        with pytest.raises(ValidationError):
+            list_annotations(context, pyramid_request)
+
     def test_it_with_wrong_filter(self, context, pyramid_request):
         pyramid_request.params["moderation_status"] = "wrong"
 
         with pytest.raises(ValidationError):
             list_annotations(context, pyramid_request)
 
+    @pytest.fixture
+    def annotations(self, factories, db_session, context):
+        annotations = [
+            factories.Annotation(
+                groupid=context.group.pubid,
+                created=datetime(2025, 1, day),  # noqa: DTZ001
+            )
+            for day in range(1, 5)
+        ]
+        db_session.flush()
+        return annotations
+
     @pytest.fixture
     def context(self, factories):
         return create_autospec(
             GroupContext, instance=True, spec_set=True, group=factories.Group()
         )
 
+    @pytest.fixture(autouse=True)
+    def AnnotationReadService(self, AnnotationReadService):
+        AnnotationReadService.annotation_search_query.return_value = select(Annotation)
+        AnnotationReadService.count_query.return_value = select(
+            func.count(Annotation.id)
+        )
+        return AnnotationReadService
+
 
 @pytest.fixture(autouse=True)
 def Pagination(mocker):
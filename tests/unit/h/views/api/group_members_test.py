@@ -9,7 +9,12 @@ from h import presenters
 from h.models import GroupMembership
 from h.schemas.base import ValidationError
 from h.security import Permission
-from h.security.identity import Identity, LongLivedGroup, LongLivedMembership
+from h.security.identity import (
+    Identity,
+    LongLivedGroup,
+    LongLivedMembership,
+    LongLivedUser,
+)
 from h.services.group_members import ConflictError
 from h.traversal import (
     AddGroupMembershipContext,
@@ -286,28 +291,42 @@ class TestEditMember:
 
         assert not caplog.messages
 
-    def test_user_changing_own_role(self, context, pyramid_request, pyramid_config):
-        context.user = pyramid_request.user
-        identity = create_autospec(Identity, instance=True, spec_set=True)
-        identity.user.memberships = [
-            create_autospec(
-                LongLivedMembership,
-                instance=True,
-                group=create_autospec(LongLivedGroup, instance=True, id="other"),
-            ),
-            create_autospec(
-                LongLivedMembership,
-                instance=True,
-                group=create_autospec(
-                    LongLivedGroup, instance=True, id=context.group.id
-                ),
-            ),
+    def test_user_changing_own_role(
+        self, context, pyramid_request, pyramid_config, EditGroupMembershipAPISchema
+    ):
+        EditGroupMembershipAPISchema.return_value.validate.return_value["roles"] = [
+            "moderator"
         ]
+        context.user = pyramid_request.user
+        user = LongLivedUser(
+            id=1,
+            userid="acct:user@example.com",
+            authority="example.com",
+            staff=False,
+            admin=False,
+        )
+        other_membership = LongLivedMembership(
+            group=LongLivedGroup(id=-1, pubid="other"), user=user, roles=["member"]
+        )
+        membership = LongLivedMembership(
+            group=LongLivedGroup(id=context.group.id, pubid=context.group.pubid),
+            user=user,
+            roles=["member"],
+        )
+        user.memberships = [other_membership, membership]
+        user.index_memberships()
+        identity = Identity(user=user)
         pyramid_config.testing_securitypolicy(permissive=True, identity=identity)
 
         views.edit_member(context, pyramid_request)
 
-        assert identity.user.memberships[1].roles == sentinel.new_roles
+        assert identity.user.memberships[0] is other_membership
+        assert identity.user.memberships[1].roles == ["moderator"]
+        assert identity.user.group_roles[context.group.id] == ("moderator",)
+        # The original user may be shared with other requests so it's unchanged
+        assert identity.user is not user
+        assert membership.roles == ["member"]
+        assert user.group_roles[context.group.id] == ("member",)
 
     def test_it_errors_if_the_user_doesnt_have_permission(
         self, context, pyramid_request, pyramid_config
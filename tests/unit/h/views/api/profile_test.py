@@ -1,26 +1,44 @@
 from unittest import mock
+from unittest.mock import sentinel
 
 import pytest
 from pyramid.httpexceptions import HTTPBadRequest
 
 from h.services.group_list import GroupListService
+from h.services.profile_cache import CachedProfile
 from h.views.api import profile as views
 
 
 class TestProfile:
-    def test_profile_view_proxies_to_session(self, session_profile, pyramid_request):
+    def test_it_returns_the_profile(self, versioned_profile, pyramid_request):
         result = views.profile(pyramid_request)
 
-        session_profile.assert_called_once_with(pyramid_request, None)
-        assert result == session_profile.return_value
+        versioned_profile.assert_called_once_with(pyramid_request, None)
+        assert result == sentinel.profile
 
-    def test_profile_passes_authority_parameter(self, session_profile, pyramid_request):
+    def test_it_passes_authority_parameter(self, versioned_profile, pyramid_request):
         pyramid_request.params = {"authority": "foo.com"}
 
-        result = views.profile(pyramid_request)
+        views.profile(pyramid_request)
 
-        session_profile.assert_called_once_with(pyramid_request, "foo.com")
-        assert result == session_profile.return_value
+        versioned_profile.assert_called_once_with(pyramid_request, "foo.com")
+
+    @pytest.mark.usefixtures("versioned_profile")
+    def test_it_makes_the_response_conditional(self, pyramid_request):
+        views.profile(pyramid_request)
+
+        response = pyramid_request.response
+        assert response.etag == "etag"
+        assert response.conditional_response
+        assert response.cache_control.private
+        assert response.cache_control.no_cache
+        assert response.vary == ("Authorization",)
+
+    @pytest.fixture
+    def versioned_profile(self, patch):
+        versioned_profile = patch("h.session.versioned_profile")
+        versioned_profile.return_value = CachedProfile(sentinel.profile, "etag")
+        return versioned_profile
 
 
 @pytest.mark.usefixtures("user_service", "session_profile")